@@ -10,20 +10,26 @@ load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 # Import Config
 from backend.config import Config
 from backend.db.database import db, init_db
+from backend.services.blockchain_client import init_blockchain_client
+from backend.services.transaction_confirmer import init_transaction_confirmer
+from backend.services.ledger_projection import init_ledger_projection
+from backend.services.contract_scheduler import init_contract_scheduler
+from backend.services.user_cache import init_user_cache
+from backend.services.cpu_pool import init_cpu_pool
+from backend.services.key_pool import init_wallet_key_pool
+from backend.cli import init_cli
 
 # Import Route: Đảm bảo TẤT CẢ các blueprint đều được import
 from backend.routes import auth_bp, wallet_bp, transaction_bp, smart_contract_bp, user_bp
 
+from blockchain_core.log_config import setup_logging
+from blockchain_core.metrics import install_flask_metrics
+from blockchain_core.profiling import install_profiling
+
 # --- Cấu hình Logging cho Backend App ---
-LOG_FILE_BACKEND = "backend.log"
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_FILE_BACKEND, mode='a', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+LOG_FILE_BACKEND = os.environ.get('BACKEND_LOG_FILE', "backend.log")
+# Ghi log qua hàng đợi + luồng nền, file xoay vòng theo dung lượng (xem blockchain_core/log_config.py)
+setup_logging(LOG_FILE_BACKEND)
 
 app_logger = logging.getLogger(__name__)
 app_logger.info("Khởi động Backend Bank App...")
@@ -35,6 +41,26 @@ def create_app():
     init_db(app) # Khởi tạo SQLAlchemy và tạo bảng
 
     migrate = Migrate(app, db)
+    # Một BlockchainClient dùng chung cho mọi blueprint (tạo lười ở request đầu tiên cần Node)
+    init_blockchain_client(app)
+    # Cache User theo id cho get_current_user_from_session (xoá khi User bị sửa)
+    init_user_cache(app)
+    # Pool tiến trình có giới hạn cho hash mật khẩu và sinh khoá (quá tải thì trả 503 ngay)
+    init_cpu_pool(app)
+    # Kho cặp khoá ví sinh sẵn trong tiến trình con cho đăng ký user (khởi động ở request đầu tiên)
+    init_wallet_key_pool(app)
+    # Lệnh CLI: flask --app backend.app users import ...
+    init_cli(app)
+    # Luồng nền đào block và chốt trạng thái các giao dịch chuyển tiền (khởi động ở request đầu tiên)
+    init_transaction_confirmer(app)
+    # Luồng nền chiếu các block của Node vào các bảng ledger_* (khởi động ở request đầu tiên)
+    init_ledger_projection(app)
+    # Luồng nền tự hoàn lại / thực thi các hợp đồng thông minh tới hạn (khởi động ở request đầu tiên)
+    init_contract_scheduler(app)
+    # Độ trễ theo route + GET /metrics (Prometheus)
+    install_flask_metrics(app)
+    # Profiling theo yêu cầu tại /debug/profile, chỉ bật khi có PROFILING_TOKEN
+    install_profiling(app)
 
     # Đăng ký các Blueprint: Đảm bảo TẤT CẢ các blueprint đều được đăng ký
     app.register_blueprint(auth_bp)
@@ -0,0 +1,93 @@
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from backend.db.database import db
+from backend.models.user import User
+from backend.services.key_pool import WalletKeyPool, get_wallet_key_pool
+
+users_cli = AppGroup('users', help='Quản lý người dùng của backend.')
+
+# SQLite giới hạn số tham số trong một câu lệnh
+LOOKUP_CHUNK = 500
+
+
+def _existing_usernames(usernames):
+    existing = set()
+    for start in range(0, len(usernames), LOOKUP_CHUNK):
+        chunk = usernames[start:start + LOOKUP_CHUNK]
+        existing.update(username for (username,) in
+                        db.session.query(User.username).filter(User.username.in_(chunk)))
+    return existing
+
+
+def _read_users(path):
+    """Đọc file CSV có header username,password; trả về (danh sách (username, password), số dòng trùng tên)"""
+    users, seen, duplicates = [], set(), 0
+    with open(path, newline='', encoding='utf-8') as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            username, password = (row.get('username') or '').strip(), row.get('password') or ''
+            if not username or not password:
+                raise click.ClickException(f"Dòng {line}: thiếu username hoặc password.")
+            if username in seen:
+                duplicates += 1
+                continue
+            seen.add(username)
+            users.append((username, password))
+    return users, duplicates
+
+
+@users_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--workers', type=int, default=os.cpu_count(), show_default=True,
+              help='Số tiến trình hash mật khẩu và sinh khoá ví')
+@click.option('--batch-size', type=int, default=1000, show_default=True, help='Số user ghi vào DB mỗi lần commit')
+def import_users(path, workers, batch_size):
+    """
+    Nhập user hàng loạt từ file CSV (header: username,password).
+
+    Mật khẩu được hash và khoá ví được sinh song song trong các tiến trình con (khoá lấy từ kho khoá
+    ví trước nếu còn); user đã tồn tại hoặc trùng tên trong file bị bỏ qua.
+    """
+    started = time.perf_counter()
+    users, duplicates = _read_users(path)
+    existing = _existing_usernames([username for username, _ in users])
+    users = [(username, password) for username, password in users if username not in existing]
+    key_pool = get_wallet_key_pool() or WalletKeyPool(size=0, low_water=0)
+
+    imported = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(users), batch_size):
+            batch = users[start:start + batch_size]
+            chunksize = max(1, len(batch) // (workers * 4))
+            password_hashes = list(executor.map(generate_password_hash, [password for _, password in batch],
+                                                chunksize=chunksize))
+            keypairs = key_pool.take_many(len(batch), executor)
+            rows = []
+            for (username, _), password_hash, (public_key, private_key) in zip(batch, password_hashes, keypairs):
+                user = User(username=username, password_hash=password_hash)
+                user.set_blockchain_keys(public_key, private_key)
+                rows.append({
+                    'username': username,
+                    'password_hash': password_hash,
+                    'blockchain_public_key': user.blockchain_public_key,
+                    'blockchain_private_key_encrypted': user.blockchain_private_key_encrypted,
+                })
+            db.session.execute(insert(User), rows)
+            db.session.commit()
+            imported += len(rows)
+            click.echo(f"Đã nhập {imported}/{len(users)} user...")
+
+    elapsed = time.perf_counter() - started
+    click.echo(f"Hoàn tất: nhập {imported} user, bỏ qua {len(existing)} user đã tồn tại và {duplicates} dòng trùng tên "
+               f"trong {elapsed:.1f}s ({imported / elapsed if elapsed else 0:.0f} user/s).")
+
+
+def init_cli(app):
+    app.cli.add_command(users_cli)
@@ -13,5 +13,18 @@ class Config:
     SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(BASE_DIR, db_filename)}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Tinh chỉnh SQLite (áp dụng cho mỗi kết nối mới, xem backend/db/database.py)
+    # WAL: đọc không bị chặn bởi ghi; synchronous=NORMAL là đủ an toàn với WAL và nhanh hơn FULL nhiều
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 65536))
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': 30,
+        'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000, 'check_same_thread': False},
+    }
+
     # Địa chỉ của Blockchain Node
     BLOCKCHAIN_NODE_URL = os.environ.get('BLOCKCHAIN_NODE_URL') or 'http://127.0.0.1:5000'
\ No newline at end of file
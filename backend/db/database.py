@@ -1,8 +1,41 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 
 db = SQLAlchemy()
 
+
+def sqlite_pragmas(journal_mode='WAL', synchronous='NORMAL', busy_timeout_ms=5000, cache_size_kb=65536):
+    """Các câu PRAGMA chạy trên mỗi kết nối SQLite mới"""
+    return [
+        f"PRAGMA journal_mode={journal_mode}",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA busy_timeout={int(busy_timeout_ms)}",
+        # Số âm: kích thước tính theo KiB thay vì số trang
+        f"PRAGMA cache_size=-{int(cache_size_kb)}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def configure_sqlite(engine, pragmas):
+    """Gắn PRAGMA vào mọi kết nối mới của engine (chỉ với SQLite)"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
 def init_db(app):
     db.init_app(app)
     with app.app_context():
-        db.create_all() # Tạo bảng nếu chưa tồn tại
\ No newline at end of file
+        configure_sqlite(db.engine, sqlite_pragmas(
+            app.config.get('SQLITE_JOURNAL_MODE', 'WAL'),
+            app.config.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+            app.config.get('SQLITE_BUSY_TIMEOUT_MS', 5000),
+            app.config.get('SQLITE_CACHE_SIZE_KB', 65536),
+        ))
+        db.create_all() # Tạo bảng nếu chưa tồn tại
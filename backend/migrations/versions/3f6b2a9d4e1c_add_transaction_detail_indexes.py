@@ -0,0 +1,37 @@
+"""Add indexes to transaction_detail
+
+Revision ID: 3f6b2a9d4e1c
+Revises: c8e1c74b35c0
+Create Date: 2026-10-19 09:12:40.118532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6b2a9d4e1c'
+down_revision = 'c8e1c74b35c0'
+branch_labels = None
+depends_on = None
+
+# DB tạo bằng db.create_all() sau khi model có index thì đã có sẵn: dùng if_not_exists/if_exists
+INDEXES = [
+    ('ix_transaction_detail_sender_id', ['sender_username', 'id']),
+    ('ix_transaction_detail_receiver_id', ['receiver_username', 'id']),
+    ('ix_transaction_detail_sender_status', ['sender_username', 'status', 'amount']),
+    ('ix_transaction_detail_status_created', ['status', 'created_at']),
+    ('ix_transaction_detail_blockchain_tx_id', ['blockchain_tx_id']),
+]
+
+
+def upgrade():
+    for name, columns in INDEXES:
+        op.create_index(name, 'transaction_detail', columns, unique=False, if_not_exists=True)
+    # Cập nhật thống kê để query planner chọn đúng index
+    op.execute(sa.text('ANALYZE transaction_detail'))
+
+
+def downgrade():
+    for name, _ in reversed(INDEXES):
+        op.drop_index(name, table_name='transaction_detail', if_exists=True)
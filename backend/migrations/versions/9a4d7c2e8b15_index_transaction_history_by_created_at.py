@@ -0,0 +1,36 @@
+"""Index transaction history by created_at
+
+Revision ID: 9a4d7c2e8b15
+Revises: 3f6b2a9d4e1c
+Create Date: 2026-10-19 13:05:12.407391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4d7c2e8b15'
+down_revision = '3f6b2a9d4e1c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # GET /transaction/history phân trang theo (created_at, id) nên index lịch sử cần created_at sau username
+    op.create_index('ix_transaction_detail_sender_created', 'transaction_detail',
+                    ['sender_username', 'created_at', 'id'], unique=False, if_not_exists=True)
+    op.create_index('ix_transaction_detail_receiver_created', 'transaction_detail',
+                    ['receiver_username', 'created_at', 'id'], unique=False, if_not_exists=True)
+    op.drop_index('ix_transaction_detail_sender_id', table_name='transaction_detail', if_exists=True)
+    op.drop_index('ix_transaction_detail_receiver_id', table_name='transaction_detail', if_exists=True)
+    op.execute(sa.text('ANALYZE transaction_detail'))
+
+
+def downgrade():
+    op.create_index('ix_transaction_detail_receiver_id', 'transaction_detail',
+                    ['receiver_username', 'id'], unique=False, if_not_exists=True)
+    op.create_index('ix_transaction_detail_sender_id', 'transaction_detail',
+                    ['sender_username', 'id'], unique=False, if_not_exists=True)
+    op.drop_index('ix_transaction_detail_receiver_created', table_name='transaction_detail', if_exists=True)
+    op.drop_index('ix_transaction_detail_sender_created', table_name='transaction_detail', if_exists=True)
@@ -0,0 +1,58 @@
+from backend.db.database import db
+from datetime import datetime
+
+
+# Bản chiếu (projection) các block đã xác nhận trên Node vào DB của backend, do
+# services/ledger_projection.py ghi. Không sửa tay: dựng lại bằng cách xoá các bảng ledger_*.
+
+class LedgerBlock(db.Model):
+    height = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    hash = db.Column(db.String(64), unique=True, nullable=False)
+    prev_hash = db.Column(db.String(64), nullable=False)
+    timestamp = db.Column(db.Float, nullable=False)
+    tx_count = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'<LedgerBlock {self.height} {self.hash[:10]}>'
+
+
+class LedgerTransaction(db.Model):
+    __table_args__ = (
+        # (block, vị trí trong block) là khoá tự nhiên: ghi lại cùng một block không tạo dòng trùng
+        db.UniqueConstraint('block_height', 'position', name='uq_ledger_transaction_block_position'),
+        db.Index('ix_ledger_transaction_sender', 'sender', 'block_height', 'position'),
+        db.Index('ix_ledger_transaction_recipient', 'recipient', 'block_height', 'position'),
+        db.Index('ix_ledger_transaction_transaction_id', 'transaction_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    block_height = db.Column(db.Integer, nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    transaction_id = db.Column(db.String(256), nullable=True)
+    sender = db.Column(db.String(256), nullable=False)
+    recipient = db.Column(db.String(256), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    transaction_type = db.Column(db.String(50), nullable=True)
+    timestamp = db.Column(db.Float, nullable=True)
+
+    def __repr__(self):
+        return f'<LedgerTx {self.block_height}:{self.position} {self.sender[:10]} -> {self.recipient[:10]}>'
+
+
+class LedgerBalance(db.Model):
+    address = db.Column(db.String(256), primary_key=True)
+    balance = db.Column(db.Float, nullable=False, default=0)
+    height = db.Column(db.Integer, nullable=False) # Block gần nhất làm thay đổi số dư
+
+    def __repr__(self):
+        return f'<LedgerBalance {self.address[:10]} {self.balance}>'
+
+
+class LedgerCursor(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    height = db.Column(db.Integer, nullable=False, default=-1) # Block cuối cùng đã chiếu (-1: chưa có)
+    tip_hash = db.Column(db.String(64), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<LedgerCursor {self.name} {self.height}>'
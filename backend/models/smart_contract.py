@@ -0,0 +1,44 @@
+from backend.db.database import db
+from datetime import datetime
+
+
+ACTIVE = 'active'
+EXECUTED = 'executed'
+REFUNDED = 'refunded'
+FAILED = 'failed'
+
+# Việc cần làm khi tới hạn chót mà hợp đồng chưa được thực thi
+ON_DEADLINE_REFUND = 'refund'
+ON_DEADLINE_EXECUTE = 'execute'
+
+
+class SmartContract(db.Model):
+    __table_args__ = (
+        # Bộ lập lịch chỉ đọc lô hợp đồng đang hoạt động có due_at sớm nhất
+        db.Index('ix_smart_contract_status_due', 'status', 'due_at'),
+        db.Index('ix_smart_contract_sender', 'sender_username', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    contract_id = db.Column(db.String(128), unique=True, nullable=False)
+    sender_username = db.Column(db.String(80), nullable=False)
+    receiver_username = db.Column(db.String(80), nullable=False)
+    sender_pubkey = db.Column(db.String(256), nullable=False)
+    receiver_pubkey = db.Column(db.String(256), nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    description = db.Column(db.String(256), nullable=True)
+    deadline = db.Column(db.Float, nullable=False) # Unix timestamp
+    on_deadline = db.Column(db.String(20), nullable=False, default=ON_DEADLINE_REFUND) # refund, execute
+    # Lúc bộ lập lịch xử lý hợp đồng: bằng deadline, lùi lại khi gửi giao dịch tới Node bị lỗi tạm thời
+    due_at = db.Column(db.Float, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    # Timestamp gửi kèm giao dịch, cố định từ lúc triển khai: transaction_id biết trước và không đổi giữa các lần gửi lại
+    tx_timestamp = db.Column(db.Float, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default=ACTIVE) # active, executed, refunded, failed
+    blockchain_tx_id = db.Column(db.String(256), nullable=True)
+    error = db.Column(db.String(256), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    settled_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<SmartContract {self.contract_id} {self.status}>'
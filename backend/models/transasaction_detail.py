@@ -3,6 +3,17 @@ from datetime import datetime
 
 
 class TransactionDetail(db.Model):
+    __table_args__ = (
+        # Lịch sử giao dịch của một user (gửi hoặc nhận), mới nhất trước, phân trang theo (created_at, id)
+        db.Index('ix_transaction_detail_sender_created', 'sender_username', 'created_at', 'id'),
+        db.Index('ix_transaction_detail_receiver_created', 'receiver_username', 'created_at', 'id'),
+        # Tổng tiền đang chờ của người gửi: có 'amount' trong index nên không cần đọc bảng
+        db.Index('ix_transaction_detail_sender_status', 'sender_username', 'status', 'amount'),
+        # Luồng xác nhận: tìm giao dịch đang chờ / quá hạn và cập nhật theo blockchain_tx_id
+        db.Index('ix_transaction_detail_status_created', 'status', 'created_at'),
+        db.Index('ix_transaction_detail_blockchain_tx_id', 'blockchain_tx_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     blockchain_tx_id = db.Column(db.String(256), unique=False, nullable=True) # Hash của transaction nếu có
     sender_username = db.Column(db.String(80), nullable=False)
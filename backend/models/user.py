@@ -1,6 +1,6 @@
 from backend.db.database import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from backend.services.cpu_pool import hash_password, verify_password
 import base64
 
 
@@ -24,11 +24,12 @@ class User(db.Model):
     daily_credit_count = db.Column(db.Integer, default=0, nullable=False)
     last_credit_date = db.Column(db.Date, nullable=True)
 
+    # Hash mật khẩu cố ý chậm: chạy trong pool tiến trình của app nếu có (services/cpu_pool.py)
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
     def set_blockchain_keys(self, public_key, private_key_str):
         self.blockchain_public_key = public_key
@@ -1,18 +1,31 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, current_app, g, request, jsonify, session
 from backend.services.auth_service import AuthService
 from backend.models.user import User
-from backend.services.blockchain_client import BlockchainClient
+from backend.services.blockchain_client import get_blockchain_client
+from backend.services.user_cache import load_user
+from blockchain_core.metrics import record_cache_lookup
 import logging
 from . import auth_bp
 
 auth_logger = logging.getLogger(__name__)
 
 # Flask session sẽ lưu user_id (là số nguyên)
-def get_current_user_from_session():
+def get_current_user_from_session(fresh=False):
+    """
+    User đang đăng nhập. Trong một request chỉ tra một lần (nhớ trong flask.g); giữa các request
+    dùng cache User theo id (services/user_cache.py). fresh=True đọc lại từ DB, dùng cho các luồng
+    sửa bản ghi User (vd. thẻ tín dụng) để không ghi đè lên dữ liệu cũ.
+    """
     user_id = session.get('user_id')
-    if user_id:
-        return User.query.get(user_id)  # Truy vấn User bằng ID
-    return None
+    if not user_id:
+        return None
+    memo = g.get('session_user')
+    if not fresh and memo is not None and memo.id == user_id:
+        record_cache_lookup('session_user_request', True)
+        return memo
+    record_cache_lookup('session_user_request', False)
+    g.session_user = load_user(current_app, user_id, fresh=fresh)
+    return g.session_user
 
 
 @auth_bp.route('/register', methods=['POST'])
@@ -62,8 +75,8 @@ def get_user_profile():
     if not user:
         return jsonify({"message": "Chưa đăng nhập. Yêu cầu xác thực"}), 401
 
-    blockchain_client = BlockchainClient()  # Khởi tạo client
-    balance = blockchain_client.get_balance(user.blockchain_public_key)
+    blockchain_client = get_blockchain_client()
+    balance, _ = blockchain_client.get_balance(user.blockchain_public_key)
 
     if balance is None:
         balance_msg = "Không thể truy vấn số dư blockchain. Node có thể không hoạt động."
@@ -1,11 +1,7 @@
 from flask import request, jsonify
 from . import smart_contract_bp
-from backend.services.smart_contract_service import SmartContractService
-from backend.services.blockchain_client import BlockchainClient
-
-# Khởi tạo dịch vụ hợp đồng thông minh
-blockchain_client_sc = BlockchainClient()
-smart_contract_service = SmartContractService(blockchain_client_sc)
+from backend.models.smart_contract import ON_DEADLINE_EXECUTE, ON_DEADLINE_REFUND
+from backend.services.smart_contract_service import get_smart_contract_service
 
 @smart_contract_bp.route('/deploy', methods=['POST'])
 def deploy_contract():
@@ -14,12 +10,15 @@ def deploy_contract():
     receiver_username = data.get('receiver_username')
     amount = float(data.get('amount'))
     deadline_seconds = int(data.get('deadline_seconds', 300)) # Mặc định 5 phút
+    description = data.get('description', '')
+    on_deadline = data.get('on_deadline', ON_DEADLINE_REFUND) # Tới hạn mà chưa thực thi: 'refund' hoặc 'execute'
 
-    if not sender_username or not receiver_username or not amount or amount <= 0 or deadline_seconds <= 0:
+    if not sender_username or not receiver_username or not amount or amount <= 0 or deadline_seconds <= 0 \
+            or on_deadline not in (ON_DEADLINE_REFUND, ON_DEADLINE_EXECUTE):
         return jsonify({"message": "Thiếu thông tin hoặc giá trị không hợp lệ để triển khai hợp đồng."}), 400
 
-    success, result = smart_contract_service.deploy_contract(
-        sender_username, receiver_username, amount, deadline_seconds
+    success, result = get_smart_contract_service().deploy_contract(
+        sender_username, receiver_username, amount, deadline_seconds, description, on_deadline
     )
     if success:
         return jsonify(result), 201
@@ -34,7 +33,7 @@ def execute_contract():
     if not contract_id:
         return jsonify({"message": "Thiếu ID hợp đồng."}), 400
 
-    success, message = smart_contract_service.execute_contract(contract_id)
+    success, message = get_smart_contract_service().execute_contract(contract_id)
     if success:
         return jsonify({"message": message}), 200
     else:
@@ -42,7 +41,7 @@ def execute_contract():
 
 @smart_contract_bp.route('/status/<contract_id>', methods=['GET'])
 def get_contract_status(contract_id):
-    status = smart_contract_service.get_contract_status(contract_id)
+    status = get_smart_contract_service().get_contract_status(contract_id)
     if status:
         return jsonify(status), 200
     else:
@@ -1,23 +1,54 @@
+import base64
 import json
-from datetime import datetime, time
+import os
+from datetime import datetime, time, timezone
 from decimal import Decimal
 
-from flask import request, jsonify
+from flask import current_app, request, jsonify, url_for
+from sqlalchemy import func, select, tuple_, union, update
+from sqlalchemy.orm import aliased
 from sqlalchemy.exc import SQLAlchemyError
 
 from . import transaction_bp
 from backend.db.database import db
 from backend.models.user import User
 from backend.models.transasaction_detail import TransactionDetail
-from backend.services.blockchain_client import BlockchainClient
+from backend.services.blockchain_client import NodeTimeout, get_blockchain_client
+from backend.services.transaction_confirmer import notify_transaction_confirmer
 from decimal import Decimal, InvalidOperation
 import logging
 
+from blockchain_core.transaction import Transaction
 from .auth import get_current_user_from_session
 
 tx_logger = logging.getLogger(__name__)
 
-blockchain_client = BlockchainClient()
+IN_FLIGHT_STATUSES = ('db_pending', 'blockchain_pending')
+
+
+HISTORY_DEFAULT_LIMIT = 50
+HISTORY_MAX_LIMIT = 200
+HISTORY_DIRECTIONS = ('all', 'sent', 'received')
+
+
+def _lock_sender(user_id):
+    """
+    Giữ khoá ghi trên dòng User của người gửi tới hết transaction, để hai request cùng người gửi không cùng đọc
+    tổng tiền đang chờ rồi cùng ghi giao dịch (kiểm tra rồi mới ghi). Với SQLite, UPDATE mở transaction mới và lấy
+    khoá ghi của cả DB (request khác chờ theo busy_timeout); CSDL khác khoá dòng như SELECT ... FOR UPDATE.
+    """
+    # Kết thúc transaction đọc đang mở: nâng snapshot cũ lên ghi trong chế độ WAL sẽ lỗi thay vì chờ khoá
+    db.session.commit()
+    db.session.execute(update(User).where(User.id == user_id).values(id=User.id))
+
+
+def _in_flight_outgoing(username):
+    """Tổng tiền người dùng đã gửi nhưng chưa được xác nhận trên chuỗi (chưa phản ánh trong số dư của Node)"""
+    return db.session.query(func.coalesce(func.sum(TransactionDetail.amount), 0.0)).filter(
+        TransactionDetail.sender_username == username,
+        TransactionDetail.status.in_(IN_FLIGHT_STATUSES)
+    ).scalar()
+
 
 # b1
 # Thêm endpoint test
@@ -37,7 +68,10 @@ def test_session():
 def test_blockchain():
     try:
         # Test connection
-        balance = blockchain_client.get_balance("test_key")
+        blockchain_client = get_blockchain_client()
+        balance, error = blockchain_client.get_balance("test_key")
+        if error:
+            return jsonify({"blockchain_error": error}), 503
         return jsonify({"blockchain_status": "OK", "test_balance": balance})
     except Exception as e:
         return jsonify({"blockchain_error": str(e)}), 500
@@ -50,11 +84,13 @@ def transfer_money():
     API để xử lý việc chuyển tiền giữa hai người dùng.
     1. Lấy thông tin người gửi từ session.
     2. Xác thực và kiểm tra dữ liệu đầu vào (người nhận, số tiền).
-    3. Kiểm tra số dư hiện tại của người gửi trên blockchain.
-    4. Ghi lại giao dịch vào cơ sở dữ liệu với trạng thái 'pending'.
-    5. Gửi giao dịch đến Blockchain Node.
-    6. Cập nhật trạng thái giao dịch trong cơ sở dữ liệu.
-    7. Trả về kết quả cho người dùng.
+    3. Kiểm tra số dư hiện tại của người gửi trên blockchain (trừ phần đang chờ, giữ khoá theo người gửi).
+    4. Ghi lại giao dịch vào cơ sở dữ liệu với trạng thái 'pending' và transaction_id biết trước.
+    5. Gửi giao dịch đến Blockchain Node (kèm timestamp để Node tạo đúng transaction_id đó).
+    6. Cập nhật trạng thái giao dịch trong cơ sở dữ liệu; Node không trả lời kịp thì vẫn để
+       'blockchain_pending' cho luồng xác nhận đối chiếu, vì Node có thể đã nhận giao dịch.
+    7. Trả về ngay 202 kèm URL trạng thái; việc đào block và chốt trạng thái
+       'confirmed'/'failed' do luồng xác nhận nền đảm nhận (services/transaction_confirmer.py).
     """
     try:
         # Bước 1: Lấy thông tin người gửi từ session
@@ -97,27 +133,37 @@ def transfer_money():
             return jsonify({"error": "Người nhận chưa có ví blockchain."}), 400
 
         # Bước 3: Kiểm tra số dư người gửi trên blockchain
+        blockchain_client = get_blockchain_client()
         sender_balance, error = blockchain_client.get_balance(sender_user.blockchain_public_key)
 
         if error:
             tx_logger.error(f"Failed to get balance for user {sender_user.id}: {error}")
             return jsonify({"error": f"Không thể kiểm tra số dư. Lỗi: {error}"}), 500
 
-        if sender_balance < float(amount):
+        # Giao dịch được xác nhận bất đồng bộ: trừ phần đang chờ để không chi tiêu hai lần
+        _lock_sender(sender_user.id)
+        in_flight = _in_flight_outgoing(sender_user.username)
+        if sender_balance - in_flight < float(amount):
+            db.session.rollback()
             return jsonify({
                 "error": "Số dư không đủ để thực hiện giao dịch.",
                 "current_balance": sender_balance,
+                "pending_amount": in_flight,
                 "required_amount": float(amount)
             }), 400
 
-        # Bước 4: Ghi lại giao dịch vào DB với trạng thái pending
+        # Bước 4: Ghi lại giao dịch vào DB với trạng thái pending (commit cũng nhả khoá người gửi)
+        created_at = datetime.utcnow()
+        submitted_at = created_at.replace(tzinfo=timezone.utc).timestamp()
         transaction = TransactionDetail(
             sender_username=sender_user.username,
             receiver_username=recipient_user.username,
             amount=amount,
             description="Transfer",
             status='db_pending',
-            created_at=datetime.utcnow()
+            blockchain_tx_id=Transaction(sender_user.blockchain_public_key, recipient_user.blockchain_public_key,
+                                         float(amount), timestamp=submitted_at).transaction_id,
+            created_at=created_at
         )
         db.session.add(transaction)
         db.session.commit()
@@ -128,9 +174,16 @@ def transfer_money():
                 sender_pubkey=sender_user.blockchain_public_key,
                 receiver_pubkey=recipient_user.blockchain_public_key,
                 amount=float(amount),
-                signature="DUMMY_SIGNATURE"
+                signature="DUMMY_SIGNATURE",
+                timestamp=submitted_at
             )
 
+            if isinstance(tx_error_message, NodeTimeout):
+                # Không rõ Node đã nhận hay chưa: luồng xác nhận đối chiếu theo blockchain_tx_id biết trước
+                tx_logger.warning(f"Giao dịch {transaction.id} của {sender_user.username}: {tx_error_message}, "
+                                  f"để luồng xác nhận đối chiếu.")
+                tx_response_data, tx_error_message = {'transaction_id': transaction.blockchain_tx_id}, None
+
             if tx_error_message:
                 # Nếu có lỗi, xử lý lỗi và trả về thông báo lỗi
                 db.session.rollback()
@@ -143,26 +196,20 @@ def transfer_money():
                 }), 500
 
 
+            transaction.blockchain_tx_id = tx_response_data.get('transaction_id', transaction.blockchain_tx_id)
             transaction.status = 'blockchain_pending'
             db.session.commit()
+            notify_transaction_confirmer(current_app)
 
-            # Kích hoạt đào block để xác nhận giao dịch
-            mine_response, mine_error = blockchain_client.mine_block()
-
-            if mine_error:
-                return jsonify({
-                    "success": True,
-                    "message": "Giao dịch đã được gửi thành công, nhưng không thể kích hoạt đào block.",
-                    "status": "blockchain_pending",
-                    "mine_error": mine_error
-                }), 201
-
+            status_url = url_for('transaction_bp.get_transaction_status', transaction_id=transaction.id)
             return jsonify({
                 "success": True,
                 "message": "Giao dịch đã được gửi và đang chờ xác nhận trên blockchain.",
                 "status": "blockchain_pending",
-                "mine_response": mine_response
-            }), 201
+                "transaction_id": transaction.id,
+                "blockchain_tx_id": transaction.blockchain_tx_id,
+                "status_url": status_url
+            }), 202, {'Location': status_url}
 
         except Exception as e:
             # Xử lý các lỗi bất ngờ khác
@@ -175,3 +222,324 @@ def transfer_money():
     except Exception as e:
         # Xử lý lỗi ở cấp độ cao nhất
         return jsonify({"error": f"Lỗi không mong muốn: {str(e)}"}), 500
+
+
+MAX_BULK_TRANSFERS = 5000
+# Node giữ khoá chuỗi và ghi lại file chuỗi trước khi trả lời lô, nên cần chờ lâu hơn các lời gọi khác
+BULK_TRANSFER_TIMEOUT = float(os.environ.get('BULK_TRANSFER_TIMEOUT', 60))
+
+
+@transaction_bp.route('/transfer/bulk', methods=['POST'])
+def bulk_transfer():
+    """
+    Chuyển tiền hàng loạt (vd. trả lương) từ người dùng hiện tại:
+        {"transfers": [{"recipient_id": 2, "amount": "10.5"}, ...]}
+    1. Kiểm tra toàn bộ lô trước (một truy vấn cho tất cả người nhận); lỗi ở bất kỳ phần tử nào thì từ chối cả lô.
+    2. Một lần kiểm tra số dư cho tổng số tiền của người gửi.
+    3. Ghi hàng loạt TransactionDetail, gửi cả lô trong một lời gọi POST /transactions/batch tới Node.
+    4. Cập nhật hàng loạt blockchain_tx_id/trạng thái theo kết quả từng phần tử, trả 202;
+       luồng xác nhận nền chốt 'confirmed' như với /transfer.
+    Mỗi giao dịch được gửi kèm timestamp nên transaction_id biết trước: Node không trả lời kịp (hoặc thiếu
+    kết quả cho một phần tử) thì giao dịch được để 'blockchain_pending' với id đó cho luồng xác nhận đối chiếu,
+    thay vì bị đánh dấu 'failed' trong khi Node có thể đã nhận.
+    """
+    sender_user = get_current_user_from_session()
+    if not sender_user:
+        return jsonify({"error": "Chưa đăng nhập. Yêu cầu xác thực"}), 401
+    if not sender_user.blockchain_public_key:
+        return jsonify({"error": "Người gửi chưa có ví blockchain."}), 400
+
+    data = request.get_json(silent=True) or {}
+    transfers = data.get('transfers')
+    if not isinstance(transfers, list) or not transfers:
+        return jsonify({"error": "Thiếu 'transfers' (danh sách giao dịch)."}), 400
+    if len(transfers) > MAX_BULK_TRANSFERS:
+        return jsonify({"error": f"Tối đa {MAX_BULK_TRANSFERS} giao dịch mỗi lô."}), 413
+
+    recipient_ids = {item.get('recipient_id') for item in transfers if isinstance(item, dict)}
+    recipients = {user.id: user for user in User.query.filter(User.id.in_(
+        [recipient_id for recipient_id in recipient_ids if isinstance(recipient_id, int)]))}
+
+    errors = []
+    amounts = []
+    for index, item in enumerate(transfers):
+        if not isinstance(item, dict):
+            errors.append({"index": index, "error": "Phần tử không hợp lệ."})
+            continue
+        try:
+            amount = Decimal(str(item.get('amount')))
+            if not amount.is_finite() or amount <= 0:
+                raise InvalidOperation
+        except (InvalidOperation, TypeError):
+            errors.append({"index": index, "error": "Số tiền không hợp lệ."})
+            continue
+        recipient = recipients.get(item.get('recipient_id'))
+        if recipient is None:
+            errors.append({"index": index, "error": "Người nhận không tồn tại."})
+        elif recipient.id == sender_user.id:
+            errors.append({"index": index, "error": "Không thể tự chuyển tiền cho mình."})
+        elif not recipient.blockchain_public_key:
+            errors.append({"index": index, "error": "Người nhận chưa có ví blockchain."})
+        amounts.append(amount)
+    if errors:
+        return jsonify({"error": "Lô giao dịch không hợp lệ.", "items": errors}), 400
+
+    blockchain_client = get_blockchain_client()
+    sender_balance, error = blockchain_client.get_balance(sender_user.blockchain_public_key)
+    if error:
+        tx_logger.error(f"Failed to get balance for user {sender_user.id}: {error}")
+        return jsonify({"error": f"Không thể kiểm tra số dư. Lỗi: {error}"}), 500
+    total = sum(amounts)
+    _lock_sender(sender_user.id)
+    in_flight = _in_flight_outgoing(sender_user.username)
+    if sender_balance - in_flight < float(total):
+        db.session.rollback()
+        return jsonify({
+            "error": "Số dư không đủ để thực hiện lô giao dịch.",
+            "current_balance": sender_balance,
+            "pending_amount": in_flight,
+            "required_amount": float(total)
+        }), 400
+
+    now = datetime.utcnow()
+    details = [TransactionDetail(
+        sender_username=sender_user.username,
+        receiver_username=recipients[item['recipient_id']].username,
+        amount=amount,
+        description=item.get('description') or "Bulk transfer",
+        status='db_pending',
+        created_at=now
+    ) for item, amount in zip(transfers, amounts)]
+    db.session.add_all(details)
+    db.session.commit()
+    detail_ids = [detail.id for detail in details]
+
+    submitted_at = now.replace(tzinfo=timezone.utc).timestamp()
+    payloads = [{
+        "sender": sender_user.blockchain_public_key,
+        "receiver": recipients[item['recipient_id']].blockchain_public_key,
+        "amount": float(amount),
+        "signature": "DUMMY_SIGNATURE",
+        # Khác nhau giữa các phần tử để hai giao dịch giống hệt nhau trong lô không trùng id
+        "timestamp": submitted_at + index * 1e-6,
+    } for index, (item, amount) in enumerate(zip(transfers, amounts))]
+    expected_ids = [Transaction(payload['sender'], payload['receiver'], payload['amount'],
+                                timestamp=payload['timestamp']).transaction_id for payload in payloads]
+
+    batch_response, batch_error = blockchain_client.send_transactions_batch(payloads, timeout=BULK_TRANSFER_TIMEOUT)
+
+    if batch_error and not isinstance(batch_error, NodeTimeout):
+        db.session.execute(update(TransactionDetail), [{"id": detail_id, "status": 'failed'} for detail_id in detail_ids])
+        db.session.commit()
+        return jsonify({"error": "Gửi lô giao dịch lên blockchain thất bại.", "details": batch_error}), 500
+
+    results = {}
+    if batch_response:
+        for position, result in enumerate(batch_response.get('results', [])):
+            results[result.get('index', position)] = result
+
+    items = []
+    updates = []
+    unconfirmed = 0
+    for index, (detail_id, expected_id) in enumerate(zip(detail_ids, expected_ids)):
+        result = results.get(index)
+        item = {"index": index, "transaction_id": detail_id,
+                "status_url": url_for('transaction_bp.get_transaction_status', transaction_id=detail_id)}
+        if result is None:
+            # Không rõ Node đã nhận hay chưa: luồng xác nhận đối chiếu theo id biết trước
+            unconfirmed += 1
+            status, tx_id = 'blockchain_pending', expected_id
+        elif result.get('status') in ('accepted', 'duplicate'):
+            # 'duplicate': Node đã có giao dịch này (trong pool hoặc trong chuỗi), luồng xác nhận sẽ chốt
+            status, tx_id = 'blockchain_pending', result.get('transaction_id')
+        else:
+            status, tx_id = 'failed', None
+            item["error"] = result.get('error')
+        item["status"] = status
+        updates.append({"id": detail_id, "blockchain_tx_id": tx_id, "status": status})
+        items.append(item)
+    db.session.execute(update(TransactionDetail), updates)
+    db.session.commit()
+    notify_transaction_confirmer(current_app)
+
+    response = {
+        "success": True,
+        "accepted": batch_response.get('accepted') if batch_response else None,
+        "rejected": batch_response.get('rejected') if batch_response else None,
+        "total_amount": float(total),
+        "items": items
+    }
+    if unconfirmed:
+        tx_logger.warning(f"Bulk transfer của {sender_user.username}: {unconfirmed}/{len(transfers)} giao dịch "
+                          f"không có kết quả từ Node ({batch_error or 'thiếu kết quả'}), để luồng xác nhận đối chiếu.")
+        response["unconfirmed"] = unconfirmed
+    else:
+        tx_logger.info(f"Bulk transfer của {sender_user.username}: {batch_response.get('accepted')}/{len(transfers)} "
+                       f"giao dịch được Node chấp nhận.")
+    return jsonify(response), 202
+
+
+@transaction_bp.route('/status/<int:transaction_id>', methods=['GET'])
+def get_transaction_status(transaction_id):
+    """Trạng thái hiện tại của một giao dịch chuyển tiền (chỉ người gửi hoặc người nhận được xem)"""
+    user = get_current_user_from_session()
+    if not user:
+        return jsonify({"error": "Chưa đăng nhập. Yêu cầu xác thực"}), 401
+
+    transaction = TransactionDetail.query.get(transaction_id)
+    if not transaction or user.username not in (transaction.sender_username, transaction.receiver_username):
+        return jsonify({"error": "Không tìm thấy giao dịch."}), 404
+
+    return jsonify(_transaction_to_dict(transaction)), 200
+
+
+def _transaction_to_dict(transaction):
+    return {
+        "transaction_id": transaction.id,
+        "blockchain_tx_id": transaction.blockchain_tx_id,
+        "sender_username": transaction.sender_username,
+        "receiver_username": transaction.receiver_username,
+        "amount": transaction.amount,
+        "description": transaction.description,
+        "status": transaction.status,
+        "created_at": transaction.created_at.isoformat()
+    }
+
+
+def _encode_history_cursor(transaction):
+    raw = json.dumps([transaction.created_at.isoformat(), transaction.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode_history_cursor(cursor):
+    """Trả về (created_at, id) của dòng cuối trang trước; ValueError nếu cursor không hợp lệ"""
+    try:
+        created_at, transaction_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), int(transaction_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError("cursor không hợp lệ.") from e
+
+
+def _parse_history_date(value, end_of_day=False):
+    """
+    Ngày (YYYY-MM-DD) hoặc thời điểm ISO 8601; không có múi giờ thì hiểu là UTC, có thì đổi sang UTC
+    (created_at lưu UTC không kèm múi giờ). 'to' chỉ có ngày thì tính hết ngày đó.
+    """
+    if len(value) > 10 and value[-6] == ' ':
+        # '+07:00' không được mã hoá trong query string thành ' 07:00'
+        value = f"{value[:-6]}+{value[-5:]}"
+    parsed = datetime.fromisoformat(value)
+    if end_of_day and len(value) == 10:
+        parsed = datetime.combine(parsed.date(), time.max)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.replace(tzinfo=None)
+
+
+def _history_filters(statuses, date_from, date_to):
+    filters = []
+    if statuses:
+        filters.append(TransactionDetail.status.in_(statuses))
+    if date_from:
+        filters.append(TransactionDetail.created_at >= date_from)
+    if date_to:
+        filters.append(TransactionDetail.created_at <= date_to)
+    return filters
+
+
+def _history_branch(column, username, filters, after, limit):
+    """Một nhánh (gửi hoặc nhận) đọc theo index (người dùng, created_at, id), tối đa `limit` dòng"""
+    query = select(TransactionDetail).where(column == username, *filters)
+    if after:
+        query = query.where(tuple_(TransactionDetail.created_at, TransactionDetail.id) < tuple_(*after))
+    return query.order_by(TransactionDetail.created_at.desc(), TransactionDetail.id.desc()).limit(limit)
+
+
+def _history_columns(direction):
+    return {
+        'all': (TransactionDetail.sender_username, TransactionDetail.receiver_username),
+        'sent': (TransactionDetail.sender_username,),
+        'received': (TransactionDetail.receiver_username,),
+    }[direction]
+
+
+def _history_page(username, direction, filters, after, limit):
+    """
+    Lấy `limit` giao dịch mới nhất sau cursor. Với direction='all' mỗi nhánh lấy tối đa `limit` dòng theo
+    index rồi gộp (UNION) thay vì OR, vì OR buộc SQLite đọc và sắp xếp toàn bộ giao dịch của người dùng.
+    """
+    branches = [_history_branch(column, username, filters, after, limit) for column in _history_columns(direction)]
+    if len(branches) == 1:
+        return db.session.scalars(branches[0]).all()
+    merged = aliased(TransactionDetail, union(*(select(branch.subquery()) for branch in branches)).subquery())
+    return db.session.scalars(select(merged).order_by(merged.created_at.desc(), merged.id.desc()).limit(limit)).all()
+
+
+def _history_total(username, direction, filters):
+    """Tổng số dòng khớp bộ lọc: mỗi nhánh là một COUNT trên index, không sắp xếp"""
+    def count(*conditions):
+        return db.session.query(func.count(TransactionDetail.id)).filter(*conditions, *filters).scalar()
+
+    columns = _history_columns(direction)
+    total = sum(count(column == username) for column in columns)
+    if len(columns) == 2:
+        # Giao dịch tự chuyển cho chính mình (nếu có) được đếm ở cả hai nhánh
+        total -= count(TransactionDetail.sender_username == username, TransactionDetail.receiver_username == username)
+    return total
+
+
+@transaction_bp.route('/history', methods=['GET'])
+def get_transaction_history():
+    """
+    Lịch sử giao dịch của người dùng hiện tại, mới nhất trước, phân trang theo keyset (created_at, id).
+    Tham số: limit (mặc định 50, tối đa 200), cursor (next_cursor của trang trước),
+    direction (all | sent | received), status (một hoặc nhiều, cách nhau bởi dấu phẩy),
+    from / to (YYYY-MM-DD hoặc ISO 8601, UTC), include_total=1 để kèm tổng số dòng.
+    Chỉ đọc từ DB của backend, không gọi Node.
+    """
+    user = get_current_user_from_session()
+    if not user:
+        return jsonify({"error": "Chưa đăng nhập. Yêu cầu xác thực"}), 401
+
+    limit = request.args.get('limit', default=HISTORY_DEFAULT_LIMIT, type=int)
+    if not 1 <= limit <= HISTORY_MAX_LIMIT:
+        return jsonify({"error": f"'limit' phải trong khoảng 1..{HISTORY_MAX_LIMIT}."}), 400
+
+    direction = request.args.get('direction', 'all')
+    if direction not in HISTORY_DIRECTIONS:
+        return jsonify({"error": f"'direction' phải là một trong {', '.join(HISTORY_DIRECTIONS)}."}), 400
+
+    statuses = [status.strip() for status in request.args.get('status', '').split(',') if status.strip()]
+    try:
+        date_from = _parse_history_date(request.args['from']) if request.args.get('from') else None
+        date_to = _parse_history_date(request.args['to'], end_of_day=True) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({"error": "'from'/'to' phải có dạng YYYY-MM-DD hoặc ISO 8601."}), 400
+
+    cursor = request.args.get('cursor')
+    try:
+        after = _decode_history_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    filters = _history_filters(statuses, date_from, date_to)
+    # Lấy thêm một dòng để biết còn trang sau hay không
+    rows = _history_page(user.username, direction, filters, after, limit + 1)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    transactions = []
+    for transaction in rows:
+        item = _transaction_to_dict(transaction)
+        item["direction"] = 'sent' if transaction.sender_username == user.username else 'received'
+        transactions.append(item)
+
+    response = {
+        "transactions": transactions,
+        "limit": limit,
+        "has_more": has_more,
+        "next_cursor": _encode_history_cursor(rows[-1]) if has_more else None
+    }
+    if request.args.get('include_total') in ('1', 'true'):
+        response["total"] = _history_total(user.username, direction, filters)
+    return jsonify(response), 200
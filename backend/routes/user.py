@@ -1,6 +1,7 @@
-from flask import Blueprint, jsonify, abort, session
+from flask import Blueprint, current_app, jsonify, abort, request, session
 from backend.models.user import User
-from backend.services.blockchain_client import BlockchainClient
+from backend.services.blockchain_client import get_blockchain_client
+from backend.services.ledger_projection import get_ledger_projection
 import logging
 from . import user_bp
 user_logger = logging.getLogger(__name__)
@@ -13,28 +14,41 @@ def is_admin_user():
     return True
 
 
+MAX_USERS_PER_PAGE = 200
+
+
 @user_bp.route('/', methods=['GET'])
 def get_all_users():
+    """
+    Danh sách người dùng theo trang (?page=1&per_page=50).
+    Mỗi trang tốn một truy vấn DB và một lời gọi POST /balances tới Node cho cả trang.
+    """
     if not is_admin_user():
         user_logger.warning("Truy cập trái phép API danh sách người dùng.")
         abort(403)
 
-    users = User.query.all()
-    user_list = []
-    blockchain_client = BlockchainClient()
+    page = request.args.get('page', default=1, type=int)
+    per_page = request.args.get('per_page', default=50, type=int)
+    if page < 1 or not 1 <= per_page <= MAX_USERS_PER_PAGE:
+        return jsonify({"message": f"'page' phải >= 1 và 'per_page' trong khoảng 1..{MAX_USERS_PER_PAGE}."}), 400
+
+    pagination = User.query.order_by(User.id).paginate(page=page, per_page=per_page, error_out=False)
+    users = pagination.items
 
+    blockchain_client = get_blockchain_client()
+    addresses = [user.blockchain_public_key for user in users if user.blockchain_public_key]
+    balances, balance_error = blockchain_client.get_balances(addresses) if addresses else ({}, None)
+    if balance_error:
+        user_logger.error(f"Lỗi khi lấy số dư blockchain cho trang {page} danh sách người dùng: {balance_error}")
+
+    user_list = []
     for user in users:
         balance = "N/A"
         if user.blockchain_public_key:
-            try:
-                b = blockchain_client.get_balance(user.blockchain_public_key)
-                if b is not None:
-                    balance = f"{b} ETH"
-                else:
-                    balance = "Không thể truy vấn số dư."
-            except Exception as e:
-                user_logger.error(f"Lỗi khi lấy số dư blockchain cho user {user.username} (ID: {user.id}): {e}")
-                balance = "Lỗi truy vấn số dư."
+            if balance_error:
+                balance = "Không thể truy vấn số dư."
+            else:
+                balance = f"{balances[user.blockchain_public_key]} ETH"
 
         user_list.append({
             "id": user.id,  # Đảm bảo ID có trong response
@@ -43,8 +57,39 @@ def get_all_users():
             "balance": balance,
             "created_at": user.created_at.isoformat()
         })
-    user_logger.info(f"Đã trả về danh sách {len(user_list)} người dùng.")
-    return jsonify(user_list), 200
+    user_logger.info(f"Đã trả về trang {page} danh sách người dùng ({len(user_list)}/{pagination.total}).")
+    return jsonify({
+        "users": user_list,
+        "page": page,
+        "per_page": per_page,
+        "total": pagination.total,
+        "pages": pagination.pages
+    }), 200
+
+
+@user_bp.route('/ledger', methods=['GET'])
+def get_ledger_status():
+    """
+    Trạng thái sổ cái chiếu từ Node (block cuối đã chiếu, đã bắt kịp Node chưa).
+    ?reconcile=1 đối chiếu thêm số dư với Node và trạng thái TransactionDetail với sổ cái.
+    """
+    if not is_admin_user():
+        user_logger.warning("Truy cập trái phép API sổ cái.")
+        abort(403)
+
+    projection = get_ledger_projection(current_app)
+    if projection is None:
+        return jsonify({"message": "Luồng chiếu sổ cái không được bật (LEDGER_PROJECTION=0)."}), 404
+
+    if request.args.get('reconcile') in ('1', 'true'):
+        report, error = projection.reconcile()
+        if error:
+            return jsonify({"message": f"Không thể đối chiếu với Node: {error}"}), 502
+        report["fresh"] = projection.is_fresh()
+        return jsonify(report), 200
+
+    height, tip_hash = projection.cursor()
+    return jsonify({"height": height, "tip_hash": tip_hash, "fresh": projection.is_fresh()}), 200
 
 
 # Thay đổi từ <username> sang <int:user_id>
@@ -56,8 +101,8 @@ def get_user_by_id(user_id):
         user_logger.warning(f"Truy vấn thông tin người dùng với ID '{user_id}' không tìm thấy.")
         return jsonify({"message": "Người dùng không tồn tại"}), 404
 
-    blockchain_client = BlockchainClient()
-    balance = blockchain_client.get_balance(user.blockchain_public_key)
+    blockchain_client = get_blockchain_client()
+    balance, _ = blockchain_client.get_balance(user.blockchain_public_key)
 
     if balance is None:
         balance_msg = "Không thể truy vấn số dư blockchain. Node có thể không hoạt động."
@@ -1,13 +1,38 @@
-from flask import request, jsonify
+from flask import current_app, request, jsonify
 from . import wallet_bp
 from backend.db.database import db
 from backend.models.user import User
-from backend.services.blockchain_client import BlockchainClient
+from backend.services.blockchain_client import get_blockchain_client
+from backend.services.ledger_projection import get_ledger_projection
 from .auth import get_current_user_from_session
 from datetime import date
-
-# Khởi tạo client để giao tiếp với Blockchain Node
-blockchain_client = BlockchainClient()
+import logging
+
+wallet_logger = logging.getLogger(__name__)
+
+
+def _ledger_wallet_info(user, stale=False):
+    """
+    Thông tin ví với số dư từ sổ cái trong DB của backend (services/ledger_projection.py).
+    stale=False: chỉ dùng khi sổ cái đã bắt kịp Node; stale=True: dùng khi không gọi được Node.
+    Trả về None nếu không có luồng chiếu hoặc sổ cái chưa có block nào.
+    """
+    projection = get_ledger_projection(current_app)
+    if projection is None or (not stale and not projection.is_fresh()):
+        return None
+    balance, height = projection.balance_of(user.blockchain_public_key)
+    if height < 0:
+        return None
+    info = {
+        "username": user.username,
+        "public_key": user.blockchain_public_key,
+        "balance": balance,
+        "height": height,
+        "source": "ledger"
+    }
+    if stale:
+        info["stale"] = True
+    return info
 
 
 @wallet_bp.route('/debug-user', methods=['GET'])
@@ -34,15 +59,24 @@ def get_wallet_info_current_user():
 
     public_key = user.blockchain_public_key
 
+    # Sổ cái đã bắt kịp Node: trả lời từ DB, không gọi Node
+    ledger_info = _ledger_wallet_info(user)
+    if ledger_info:
+        return jsonify(ledger_info), 200
+
     # Thêm logging
-    print(f"Trying to get balance for address: {public_key}")
-    print(f"Blockchain node URL: {blockchain_client.node_url}")
+    blockchain_client = get_blockchain_client()
+    wallet_logger.debug("Trying to get balance for address: %s (node: %s)", public_key, blockchain_client.node_url)
 
     balance, error_message = blockchain_client.get_balance(public_key)
 
     if error_message:
+        # Node không trả lời (vd. đang bận đào block): dùng sổ cái dù có thể chậm vài block
+        ledger_info = _ledger_wallet_info(user, stale=True)
+        if ledger_info:
+            return jsonify(ledger_info), 200
         # Log chi tiết lỗi
-        print(f"Error getting balance: {error_message}")
+        wallet_logger.error("Error getting balance: %s", error_message)
         return jsonify({
             "message": f"Không thể lấy số dư ví lúc này. {error_message}",
             "debug_info": {
@@ -54,7 +88,8 @@ def get_wallet_info_current_user():
     return jsonify({
         "username": user.username,
         "public_key": public_key,
-        "balance": balance
+        "balance": balance,
+        "source": "node"
     }), 200
 
 
@@ -68,10 +103,18 @@ def get_wallet_info(id):
 
     public_key = user.blockchain_public_key
 
+    ledger_info = _ledger_wallet_info(user)
+    if ledger_info:
+        return jsonify(ledger_info), 200
+
     # Sửa đổi: Nhận cả balance và error_message
+    blockchain_client = get_blockchain_client()
     balance, error_message = blockchain_client.get_balance(public_key)
 
     if error_message:
+        ledger_info = _ledger_wallet_info(user, stale=True)
+        if ledger_info:
+            return jsonify(ledger_info), 200
         return jsonify({
             "message": f"Không thể lấy số dư ví lúc này. {error_message}"
         }), 500
@@ -79,7 +122,8 @@ def get_wallet_info(id):
     return jsonify({
         "username": user.username,
         "public_key": public_key,
-        "balance": balance
+        "balance": balance,
+        "source": "node"
     }), 200
 
 
@@ -109,6 +153,7 @@ def lend_money():
     signature_for_system = "SYSTEM_SIGNATURE_N/A"
 
     # Sửa đổi
+    blockchain_client = get_blockchain_client()
     tx_response, tx_error = blockchain_client.send_transaction(
         sender_pubkey="SYSTEM_INITIAL_FUND",  # Địa chỉ đặc biệt
         receiver_pubkey=user.blockchain_public_key,
@@ -138,8 +183,8 @@ def lend_money():
 # API mới: Mở thẻ tín dụng và nhận tiền
 @wallet_bp.route('/credit-card/issue', methods=['POST'])
 def issue_credit_card():
-    # Lấy thông tin user từ session (đã đăng nhập)
-    user = get_current_user_from_session()
+    # Lấy thông tin user từ session (đã đăng nhập); đọc lại từ DB vì các trường tín dụng sẽ bị sửa
+    user = get_current_user_from_session(fresh=True)
     if not user:
         return jsonify({"message": "Chưa đăng nhập. Yêu cầu xác thực"}), 401
 
@@ -163,6 +208,7 @@ def issue_credit_card():
     # Cộng tiền vào số dư blockchain của người dùng
     try:
         # Sửa đổi
+        blockchain_client = get_blockchain_client()
         tx_response, tx_error = blockchain_client.send_transaction(
             sender_pubkey="SYSTEM_INITIAL_FUND",
             receiver_pubkey=user.blockchain_public_key,
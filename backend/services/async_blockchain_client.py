@@ -0,0 +1,125 @@
+import asyncio
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.services.blockchain_client import BlockchainClient
+
+# Mỗi Node một executor, số luồng bằng kích thước pool kết nối của session dùng chung:
+# không bao giờ có nhiều request đồng thời hơn số kết nối keep-alive
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _executor_for(client):
+    with _executors_lock:
+        executor = _executors.get(client.node_url)
+        if executor is None:
+            executor = _executors[client.node_url] = ThreadPoolExecutor(
+                max_workers=client.connection.pool_size, thread_name_prefix="node-call")
+        return executor
+
+
+async def gather_limited(awaitables, limit):
+    """
+    Chạy các awaitable đồng thời nhưng không quá `limit` cái cùng lúc; kết quả giữ đúng thứ tự đầu vào.
+    Lỗi của từng awaitable được trả về như kết quả (return_exceptions) để một lời gọi hỏng không huỷ các lời gọi khác.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(awaitable):
+        async with semaphore:
+            return await awaitable
+
+    return await asyncio.gather(*(run(awaitable) for awaitable in awaitables), return_exceptions=True)
+
+
+class AsyncBlockchainClient:
+    """
+    Phiên bản asyncio của BlockchainClient với cùng các phương thức (trả về (data, error) như bản đồng bộ).
+
+    Mỗi lời gọi chạy phương thức của BlockchainClient trong executor dùng chung của Node, nên vẫn dùng
+    session keep-alive, timeout, thử lại, circuit breaker và cache số dư của bản đồng bộ.
+    `max_concurrency` giới hạn số lời gọi đang chạy của client này (mặc định bằng kích thước pool).
+
+        client = AsyncBlockchainClient()
+        (tip, _), (balances, _) = await client.gather(client.get_tip(), client.get_balances(addresses))
+    """
+
+    def __init__(self, node_url=None, max_concurrency=None, client=None):
+        self.client = client or BlockchainClient(node_url)
+        self.node_url = self.client.node_url
+        self.max_concurrency = max_concurrency or self.client.connection.pool_size
+        self._executor = _executor_for(self.client)
+        # Semaphore gắn với event loop: mỗi loop (vd. mỗi asyncio.run) có semaphore riêng
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    async def _call(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        async with semaphore:
+            return await loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+    async def gather(self, *awaitables, limit=None):
+        """Chạy nhiều lời gọi tới Node đồng thời (tối đa `limit`, mặc định max_concurrency)"""
+        return await gather_limited(awaitables, limit or self.max_concurrency)
+
+    async def map(self, method_name, arguments, limit=None):
+        """
+        Gọi cùng một phương thức cho từng phần tử của `arguments`, đồng thời, giữ thứ tự.
+
+            results = await client.map('get_balance', addresses)
+        """
+        method = getattr(self, method_name)
+        return await self.gather(*(method(argument) for argument in arguments), limit=limit)
+
+    # Ký/xác minh là CPU-bound nhưng vẫn đưa vào executor để không chặn event loop
+    async def sign_transaction_with_private_key(self, private_key_pem, message):
+        return await self._call(self.client.sign_transaction_with_private_key, private_key_pem, message)
+
+    async def verify_signature(self, public_key_pem, message, signature_b64):
+        return await self._call(self.client.verify_signature, public_key_pem, message, signature_b64)
+
+    def sign_transaction_message(self, sender_pubkey, receiver_pubkey, amount, timestamp=None):
+        return self.client.sign_transaction_message(sender_pubkey, receiver_pubkey, amount, timestamp)
+
+    async def send_transaction(self, sender_pubkey, receiver_pubkey, amount, signature, timestamp=None):
+        return await self._call(self.client.send_transaction, sender_pubkey, receiver_pubkey, amount, signature,
+                                timestamp)
+
+    async def send_transactions_batch(self, transactions):
+        return await self._call(self.client.send_transactions_batch, transactions)
+
+    async def get_balance(self, address):
+        return await self._call(self.client.get_balance, address)
+
+    async def get_balances(self, addresses):
+        return await self._call(self.client.get_balances, addresses)
+
+    async def get_tip(self):
+        return await self._call(self.client.get_tip)
+
+    async def get_pending_transactions(self):
+        return await self._call(self.client.get_pending_transactions)
+
+    async def get_chain(self):
+        return await self._call(self.client.get_chain)
+
+    async def get_headers(self, since=-1, limit=None):
+        return await self._call(self.client.get_headers, since, limit)
+
+    async def get_blocks_since(self, since=-1, limit=None):
+        return await self._call(self.client.get_blocks_since, since, limit)
+
+    async def sync_local_chain(self):
+        return await self._call(self.client.sync_local_chain)
+
+    @property
+    def local_chain(self):
+        return self.client.local_chain
+
+    async def mine_block(self):
+        return await self._call(self.client.mine_block)
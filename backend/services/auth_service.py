@@ -1,6 +1,6 @@
 from backend.models.user import User
 from backend.db.database import db
-from blockchain_core.wallet import Wallet # Import Wallet để tạo ví mới
+from backend.services.key_pool import take_wallet_keys
 
 import logging
 auth_logger = logging.getLogger(__name__)
@@ -12,10 +12,8 @@ class AuthService:
             auth_logger.warning(f"Đăng ký thất bại: Tên người dùng '{username}' đã tồn tại.")
             return False, "Tên người dùng đã tồn tại."
 
-        # Tạo ví blockchain mới cho người dùng
-        new_wallet = Wallet()
-        public_key = new_wallet.get_public_key()
-        private_key_str = new_wallet.get_private_key()
+        # Ví blockchain mới cho người dùng: lấy cặp khoá sinh sẵn từ kho (services/key_pool.py)
+        public_key, private_key_str = take_wallet_keys()
 
         new_user = User(username=username)
         new_user.set_password(password)
@@ -1,23 +1,262 @@
+import functools
 import hashlib
 import json
 import logging
 import os
+import threading
+import time
+from urllib.parse import quote
 import requests
+from requests.adapters import HTTPAdapter
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.backends import default_backend
 import base64
 
+from blockchain_core.metrics import REGISTRY, record_cache_lookup
+
 client_logger = logging.getLogger(__name__)
 
+NODE_CALL_SECONDS = REGISTRY.histogram('blockchain_client_call_seconds', 'Độ trễ các lời gọi tới Blockchain Node',
+                                       ('call',))
+NODE_CALL_ERRORS = REGISTRY.counter('blockchain_client_errors_total', 'Số lời gọi tới Blockchain Node bị lỗi',
+                                    ('call',))
+NODE_CALL_RETRIES = REGISTRY.counter('blockchain_client_retries_total', 'Số lần thử lại lời gọi đọc tới Blockchain Node',
+                                     ('call',))
+NODE_CIRCUIT_REJECTED = REGISTRY.counter('blockchain_client_circuit_rejected_total',
+                                         'Số lời gọi bị từ chối ngay vì circuit breaker đang mở', ('call',))
+
+# Mã lỗi tạm thời của Node/proxy: lời gọi đọc được thử lại, và được tính là Node lỗi cho circuit breaker
+RETRYABLE_STATUSES = (502, 503, 504)
+# Không vượt quá NODE_MAX_BALANCE_BATCH mặc định của Node
+BALANCE_BATCH_SIZE = 1000
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Circuit breaker đang mở: không gửi request tới Node mà báo lỗi ngay"""
+
+
+class NodeTimeout(str):
+    """Thông báo lỗi khi Node không trả lời kịp: request có thể đã được Node xử lý (không nên coi là thất bại)"""
+
+
+def _node_call(call):
+    """Đo độ trễ và đếm lỗi cho một lời gọi trả về (data, error) tới Node"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            NODE_CALL_SECONDS.labels(call).observe(time.perf_counter() - start)
+            if result[1]:
+                NODE_CALL_ERRORS.labels(call).inc()
+            return result
+        return wrapper
+    return decorator
+
+
+class TipAwareBalanceCache:
+    """
+    Cache số dư theo (địa chỉ, tip hash): toàn bộ cache bị xoá khi đỉnh chuỗi thay đổi.
+    Đỉnh chuỗi được coi là còn mới trong `tip_ttl` giây; hết hạn thì client hỏi lại GET /tip (rất nhỏ).
+    """
+
+    def __init__(self, tip_ttl=1.0, max_entries=100000):
+        self.tip_ttl = tip_ttl
+        self.max_entries = max_entries
+        self.tip_hash = None
+        self._tip_checked_at = 0.0
+        self._balances = {}
+        self._lock = threading.Lock()
+
+    def tip_is_fresh(self):
+        return self.tip_hash is not None and time.monotonic() - self._tip_checked_at < self.tip_ttl
+
+    def observe_tip(self, tip_hash):
+        """Ghi nhận đỉnh chuỗi mới nhất từ Node; xoá cache nếu đỉnh đã đổi"""
+        with self._lock:
+            if tip_hash != self.tip_hash:
+                self._balances.clear()
+                self.tip_hash = tip_hash
+            self._tip_checked_at = time.monotonic()
+
+    def invalidate(self):
+        """Buộc lần đọc sau phải hỏi lại đỉnh chuỗi (vd. ngay sau khi chính client kích hoạt đào block)"""
+        with self._lock:
+            self._tip_checked_at = 0.0
+
+    def get(self, address):
+        with self._lock:
+            return self._balances.get((address, self.tip_hash))
+
+    def put(self, address, tip_hash, balance):
+        with self._lock:
+            if tip_hash != self.tip_hash:
+                return
+            if len(self._balances) >= self.max_entries:
+                self._balances.clear()
+            self._balances[(address, tip_hash)] = balance
+
+
+class CircuitBreaker:
+    """
+    Sau `failure_threshold` lỗi liên tiếp (lỗi kết nối, timeout, 5xx), mọi lời gọi bị từ chối ngay trong
+    `reset_timeout` giây. Hết thời gian đó chỉ một lời gọi thử được đi qua: thành công thì đóng lại,
+    thất bại thì mở tiếp; lời gọi thử không báo kết quả trong `reset_timeout` giây thì cho thử lại.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                # OPEN đã hết hạn, hoặc HALF_OPEN mà lời gọi thử trước không báo kết quả
+                self.state = self.HALF_OPEN
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                client_logger.warning("Circuit breaker mở lại: lời gọi thử tới Blockchain Node thất bại.")
+            elif self.state == self.CLOSED and self.failures >= self.failure_threshold:
+                client_logger.warning(f"Circuit breaker mở sau {self.failures} lỗi liên tiếp tới Blockchain Node.")
+            else:
+                return
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+class _NodeConnection:
+    """Tài nguyên dùng chung cho một Node: session HTTP có pool keep-alive, circuit breaker và cache số dư"""
+
+    def __init__(self):
+        self.pool_size = int(os.environ.get('NODE_POOL_SIZE', 10))
+        self.connect_timeout = float(os.environ.get('NODE_CONNECT_TIMEOUT', 3.05))
+        self.read_timeout = float(os.environ.get('NODE_READ_TIMEOUT', 10))
+        # Đào block có thể lâu hơn nhiều so với các lời gọi khác
+        self.mine_timeout = float(os.environ.get('NODE_MINE_TIMEOUT', 120))
+        self.read_retries = int(os.environ.get('NODE_READ_RETRIES', 2))
+        self.retry_backoff = float(os.environ.get('NODE_RETRY_BACKOFF', 0.2))
+
+        self.session = requests.Session()
+        # Không dùng Retry của urllib3: chỉ các lời gọi đọc mới được thử lại (GET /mine không idempotent)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.breaker = CircuitBreaker(int(os.environ.get('NODE_BREAKER_THRESHOLD', 5)),
+                                      float(os.environ.get('NODE_BREAKER_RESET', 10)))
+        self.balance_cache = TipAwareBalanceCache(tip_ttl=float(os.environ.get('BALANCE_CACHE_TIP_TTL', 1.0)))
+
+
+# Dùng chung giữa mọi BlockchainClient trỏ tới cùng một Node (nhiều route vẫn tạo client theo từng request)
+_node_connections = {}
+_node_connections_lock = threading.Lock()
+
+
+def _node_connection_for(node_url):
+    with _node_connections_lock:
+        connection = _node_connections.get(node_url)
+        if connection is None:
+            connection = _node_connections[node_url] = _NodeConnection()
+        return connection
+
+
+_app_client_lock = threading.Lock()
+
+
+def init_blockchain_client(app):
+    """
+    Đăng ký BlockchainClient dùng chung cho app. Client chỉ được tạo ở lần dùng đầu tiên
+    (get_blockchain_client), nên import/khởi tạo backend không cần Node.
+    """
+    app.extensions.setdefault('blockchain_client', None)
+
+
+def get_blockchain_client(app=None):
+    """BlockchainClient dùng chung của app hiện tại (tạo lười, an toàn giữa các luồng)"""
+    from flask import current_app
+
+    app = app or current_app._get_current_object()
+    client = app.extensions.get('blockchain_client')
+    if client is None:
+        with _app_client_lock:
+            client = app.extensions.get('blockchain_client')
+            if client is None:
+                client = app.extensions['blockchain_client'] = BlockchainClient(app.config.get('BLOCKCHAIN_NODE_URL'))
+    return client
+
+
 class BlockchainClient:
     def __init__(self, node_url=None):
         self.node_url = node_url or os.getenv("BLOCKCHAIN_NODE_URL")
         if not self.node_url:
             raise ValueError("BLOCKCHAIN_NODE_URL không được cấu hình.")
 
+        # Bản sao cục bộ của chuỗi, được cập nhật bằng sync_local_chain()
+        self.local_chain = []
+        self.connection = _node_connection_for(self.node_url)
+        self.balance_cache = self.connection.balance_cache
+
         client_logger.info(f"Blockchain Client được khởi tạo, kết nối tới Node: {self.node_url}")
 
+    def _request(self, call, method, path, idempotent=False, timeout=None, **kwargs):
+        """
+        Gửi request tới Node qua session dùng chung, có timeout và circuit breaker.
+        Lời gọi idempotent được thử lại với backoff lũy thừa khi lỗi kết nối/timeout hoặc gặp 502/503/504.
+
+        Returns:
+            requests.Response - phản hồi cuối cùng (kể cả mã lỗi HTTP; người gọi tự raise_for_status)
+        Raises:
+            requests.exceptions.RequestException - lỗi kết nối/timeout, hoặc CircuitOpenError
+        """
+        connection = self.connection
+        timeout = timeout or (connection.connect_timeout, connection.read_timeout)
+        attempts = 1 + (connection.read_retries if idempotent else 0)
+        for attempt in range(attempts):
+            if not connection.breaker.allow():
+                NODE_CIRCUIT_REJECTED.labels(call).inc()
+                raise CircuitOpenError(f"Blockchain Node tạm thời không khả dụng (circuit breaker mở): {self.node_url}")
+            if attempt:
+                NODE_CALL_RETRIES.labels(call).inc()
+                time.sleep(connection.retry_backoff * 2 ** (attempt - 1))
+            try:
+                response = connection.session.request(method, f'{self.node_url}{path}', timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                connection.breaker.record_failure()
+                if attempt == attempts - 1:
+                    raise
+                continue
+            except Exception:
+                # Lỗi khác (ChunkedEncodingError, InvalidURL...) không thử lại, nhưng vẫn phải báo kết quả
+                # để lời gọi thử ở HALF_OPEN không giữ breaker đóng mãi
+                connection.breaker.record_failure()
+                raise
+            if response.status_code >= 500:
+                connection.breaker.record_failure()
+                if response.status_code in RETRYABLE_STATUSES and attempt < attempts - 1:
+                    continue
+            else:
+                connection.breaker.record_success()
+            return response
+
     def sign_transaction_with_private_key(self, private_key_pem, message):
         """
         Ký giao dịch với private key
@@ -131,6 +370,7 @@ class BlockchainClient:
         # Sắp xếp keys để đảm bảo message luôn consistent
         return json.dumps(message_data, sort_keys=True)
 
+    @_node_call('transactions_new')
     def send_transaction(self, sender_pubkey, receiver_pubkey, amount, signature, timestamp=None):
         """
         Gửi giao dịch đến blockchain node (tương thích với API hiện tại)
@@ -143,7 +383,8 @@ class BlockchainClient:
             timestamp (int, optional): Timestamp (optional)
 
         Returns:
-            tuple: (response_data, error_message)
+            tuple: (response_data, error_message) - error_message là NodeTimeout nếu Node không trả lời kịp
+                   (giao dịch có thể đã vào pool; gửi kèm timestamp thì đối chiếu được bằng get_transaction)
         """
         tx_data = {
             "sender": sender_pubkey,
@@ -157,16 +398,16 @@ class BlockchainClient:
             tx_data["timestamp"] = timestamp
 
         try:
-            response = requests.post(f'{self.node_url}/transactions/new', json=tx_data)
+            response = self._request('transactions_new', 'POST', '/transactions/new', json=tx_data)
 
             # Log phản hồi từ Node để dễ debug
-            client_logger.info(f"Phản hồi từ Node: Status Code={response.status_code}, Body={response.text}")
+            client_logger.debug("Phản hồi từ Node: Status Code=%s, Body=%s", response.status_code, response.text)
 
             response.raise_for_status()  # Ném lỗi HTTP nếu có
 
             # Nếu thành công
             response_data = response.json()
-            client_logger.info(f"Đã gửi giao dịch tới Node: {response_data.get('message')}")
+            client_logger.info("Đã gửi giao dịch tới Node: %s", response_data.get('message'))
             return response_data, None
 
         except requests.exceptions.HTTPError as http_err:
@@ -179,58 +420,277 @@ class BlockchainClient:
             client_logger.error(f"Lỗi HTTP khi gửi giao dịch tới Node ({http_err}): {error_details}")
             return None, f"Lỗi HTTP từ Node: {error_details}"
 
+        except requests.exceptions.ReadTimeout as e:
+            client_logger.error(f"Blockchain Node không trả lời kịp giao dịch: {e}")
+            return None, NodeTimeout(f"Node không trả lời kịp: {e}")
+
         except requests.exceptions.RequestException as e:
             # Bắt các lỗi khác như lỗi kết nối
             client_logger.error(f"Lỗi kết nối tới Blockchain Node: {e}")
             return None, f"Lỗi kết nối: {e}"
 
-    def get_balance(self, address):
+    @_node_call('transactions_batch')
+    def send_transactions_batch(self, transactions, timeout=None):
         """
-        Lấy số dư của một địa chỉ (sử dụng logic hiện tại)
+        Gửi nhiều giao dịch tới Node trong một lần gọi POST /transactions/batch
+
+        Args:
+            transactions (list): các dict gồm 'sender', 'receiver', 'amount', 'signature' (và 'timestamp' nếu có)
+            timeout (float, optional): thời gian chờ Node trả lời (giây), mặc định như các lời gọi khác
+
+        Returns:
+            tuple: (response_data, error_message) - response_data gồm 'accepted', 'rejected' và
+                   'results' (theo thứ tự đầu vào, mỗi phần tử có 'status' - 'accepted', 'duplicate' hoặc
+                   'rejected' - và 'transaction_id' hoặc 'error');
+                   error_message là NodeTimeout nếu Node không trả lời kịp (lô có thể đã vào pool)
         """
         try:
-            # Lấy toàn bộ chain
-            chain_data, chain_error = self.get_chain()
-            if chain_error:
-                return None, chain_error
-
-            balance = 0
-
-            # Duyệt qua tất cả các block trong chain
-            for block in chain_data.get('chain', []):
-                for transaction in block.get('transactions', []):
-                    # Nếu là người nhận
-                    if transaction.get('recipient') == address:
-                        balance += transaction.get('amount', 0)
-                    # Nếu là người gửi (trừ SYSTEM_INITIAL_FUND)
-                    elif transaction.get('sender') == address and transaction.get('sender') != 'SYSTEM_INITIAL_FUND':
-                        balance -= transaction.get('amount', 0)
-
-            client_logger.info(f"Calculated balance for {address}: {balance}")
+            response = self._request('transactions_batch', 'POST', '/transactions/batch',
+                                     timeout=timeout and (self.connection.connect_timeout, timeout),
+                                     json={'transactions': transactions})
+            response.raise_for_status()
+            response_data = response.json()
+            client_logger.info("Đã gửi lô %s giao dịch tới Node: %s được chấp nhận.",
+                               len(transactions), response_data.get('accepted'))
+            return response_data, None
+        except requests.exceptions.ReadTimeout as e:
+            client_logger.error(f"Blockchain Node không trả lời kịp lô giao dịch: {e}")
+            return None, NodeTimeout(f"Node không trả lời kịp: {e}")
+        except requests.exceptions.RequestException as e:
+            client_logger.error(f"Lỗi khi gửi lô giao dịch tới Blockchain Node: {e}")
+            return None, f"Lỗi kết nối hoặc phản hồi không hợp lệ: {e}"
+
+    def get_balance(self, address):
+        """
+        Lấy số dư đã xác nhận của một địa chỉ qua GET /balance của Node.
+        Kết quả được cache theo (địa chỉ, tip hash) nên khi đỉnh chuỗi chưa đổi thì không cần hỏi lại Node.
+
+        Returns:
+            tuple: (balance, error_message)
+        """
+        cache = self.balance_cache
+        if not cache.tip_is_fresh():
+            tip_data, tip_error = self.get_tip()
+            if not tip_error:
+                cache.observe_tip(tip_data.get('tip_hash'))
+
+        balance = cache.get(address)
+        record_cache_lookup('balance', balance is not None)
+        if balance is not None:
             return balance, None
 
-        except Exception as e:
-            client_logger.error(f"Lỗi khi tính balance cho địa chỉ {address}: {e}")
-            return None, f"Lỗi khi tính balance: {str(e)}"
+        data, error = self._fetch_balance(address)
+        if error:
+            return None, error
+        cache.observe_tip(data.get('tip_hash'))
+        cache.put(address, data.get('tip_hash'), data.get('balance'))
+        client_logger.debug("Balance for %s: %s (tip %.10s)", address, data.get('balance'), data.get('tip_hash'))
+        return data.get('balance'), None
+
+    def get_balances(self, addresses):
+        """
+        Lấy số dư của nhiều địa chỉ: địa chỉ đã có trong cache (cùng tip hash) không cần hỏi lại,
+        phần còn lại được lấy trong một lời gọi POST /balances.
+
+        Returns:
+            tuple: (balances, error_message) - balances là dict địa chỉ -> số dư
+        """
+        cache = self.balance_cache
+        if not cache.tip_is_fresh():
+            tip_data, tip_error = self.get_tip()
+            if not tip_error:
+                cache.observe_tip(tip_data.get('tip_hash'))
+
+        balances, missing = {}, []
+        for address in dict.fromkeys(addresses):
+            balance = cache.get(address)
+            record_cache_lookup('balance', balance is not None)
+            if balance is None:
+                missing.append(address)
+            else:
+                balances[address] = balance
+        if not missing:
+            return balances, None
+
+        for start in range(0, len(missing), BALANCE_BATCH_SIZE):
+            data, error = self._fetch_balances(missing[start:start + BALANCE_BATCH_SIZE])
+            if error:
+                return None, error
+            tip_hash = data.get('tip_hash')
+            cache.observe_tip(tip_hash)
+            for address, balance in data.get('balances', {}).items():
+                cache.put(address, tip_hash, balance)
+                balances[address] = balance
+        return balances, None
+
+    @_node_call('balances')
+    def _fetch_balances(self, addresses):
+        try:
+            # Chỉ đọc nên an toàn để thử lại dù là POST
+            response = self._request('balances', 'POST', '/balances', idempotent=True, json={'addresses': addresses})
+            response.raise_for_status()
+            return response.json(), None
+        except requests.exceptions.RequestException as e:
+            client_logger.error(f"Lỗi khi lấy số dư cho {len(addresses)} địa chỉ: {e}")
+            return None, f"Lỗi kết nối hoặc phản hồi không hợp lệ: {e}"
+
+    @_node_call('balance')
+    def _fetch_balance(self, address):
+        try:
+            # Địa chỉ base64 chứa '/' và '+' nên phải mã hoá toàn bộ
+            response = self._request('balance', 'GET', f"/balance/{quote(address, safe='')}", idempotent=True)
+            response.raise_for_status()
+            return response.json(), None
+        except requests.exceptions.RequestException as e:
+            client_logger.error(f"Lỗi khi lấy số dư cho địa chỉ {address}: {e}")
+            return None, f"Lỗi kết nối hoặc phản hồi không hợp lệ: {e}"
+
+    @_node_call('tip')
+    def get_tip(self):
+        """
+        Lấy đỉnh chuỗi hiện tại của Node
+
+        Returns:
+            tuple: (response_data, error_message) - response_data gồm 'length', 'height', 'tip_hash'
+        """
+        try:
+            response = self._request('tip', 'GET', '/tip', idempotent=True)
+            response.raise_for_status()
+            return response.json(), None
+        except requests.exceptions.RequestException as e:
+            client_logger.error(f"Lỗi khi lấy đỉnh chuỗi từ Blockchain Node: {e}")
+            return None, f"Lỗi kết nối hoặc phản hồi không hợp lệ: {e}"
+
+    @_node_call('transactions_pending')
+    def get_pending_transactions(self):
+        """
+        Lấy các giao dịch đang chờ trong pool của Node
+
+        Returns:
+            tuple: (transactions, error_message) - danh sách dict giao dịch
+        """
+        try:
+            response = self._request('transactions_pending', 'GET', '/transactions/pending', idempotent=True)
+            response.raise_for_status()
+            return response.json(), None
+        except requests.exceptions.RequestException as e:
+            client_logger.error(f"Lỗi khi lấy giao dịch chờ từ Blockchain Node: {e}")
+            return None, f"Lỗi kết nối hoặc phản hồi không hợp lệ: {e}"
+
+    @_node_call('transaction')
+    def get_transaction(self, transaction_id):
+        """
+        Trạng thái một giao dịch trên Node
+
+        Returns:
+            tuple: (response_data, error_message) - response_data gồm 'status' ('confirmed' kèm
+                   'block_index'/'block_hash', 'pending' hoặc 'unknown' nếu Node không biết giao dịch)
+        """
+        try:
+            response = self._request('transaction', 'GET', f"/transactions/{quote(transaction_id, safe='')}",
+                                     idempotent=True)
+            if response.status_code == 404:
+                return response.json(), None
+            response.raise_for_status()
+            return response.json(), None
+        except requests.exceptions.RequestException as e:
+            client_logger.error(f"Lỗi khi lấy trạng thái giao dịch {transaction_id} từ Blockchain Node: {e}")
+            return None, f"Lỗi kết nối hoặc phản hồi không hợp lệ: {e}"
 
+    @_node_call('chain')
     def get_chain(self):
         """
         Lấy toàn bộ blockchain chain (method hiện tại)
         """
         try:
-            response = requests.get(f'{self.node_url}/chain')
+            response = self._request('chain', 'GET', '/chain', idempotent=True)
             response.raise_for_status()
             return response.json(), None
         except requests.exceptions.RequestException as e:
             client_logger.error(f"Lỗi khi lấy chuỗi từ Blockchain Node: {e}")
             return None, f"Lỗi kết nối hoặc phản hồi không hợp lệ: {e}"
 
+    @_node_call('headers')
+    def get_headers(self, since=-1, limit=None):
+        """
+        Lấy header gọn của các block có index > since
+
+        Returns:
+            tuple: (response_data, error_message) - response_data gồm 'length', 'tip_hash', 'headers'
+        """
+        params = {'since': since}
+        if limit:
+            params['limit'] = limit
+        try:
+            response = self._request('headers', 'GET', '/headers', idempotent=True, params=params)
+            response.raise_for_status()
+            return response.json(), None
+        except requests.exceptions.RequestException as e:
+            client_logger.error(f"Lỗi khi lấy headers từ Blockchain Node: {e}")
+            return None, f"Lỗi kết nối hoặc phản hồi không hợp lệ: {e}"
+
+    @_node_call('blocks')
+    def get_blocks_since(self, since=-1, limit=None):
+        """
+        Lấy đầy đủ các block có index > since
+
+        Returns:
+            tuple: (response_data, error_message) - response_data gồm 'length', 'tip_hash', 'blocks'
+        """
+        params = {'since': since}
+        if limit:
+            params['limit'] = limit
+        try:
+            response = self._request('blocks', 'GET', '/blocks', idempotent=True, params=params)
+            response.raise_for_status()
+            return response.json(), None
+        except requests.exceptions.RequestException as e:
+            client_logger.error(f"Lỗi khi lấy blocks từ Blockchain Node: {e}")
+            return None, f"Lỗi kết nối hoặc phản hồi không hợp lệ: {e}"
+
+    def sync_local_chain(self):
+        """
+        Đồng bộ bản sao chuỗi cục bộ (self.local_chain) bằng cách chỉ kéo các block mới.
+        Nếu phát hiện chuỗi trên Node đã thay đổi (fork/reorg) thì tải lại từ đầu.
+
+        Returns:
+            tuple: (new_blocks, error_message) - danh sách block mới được thêm vào bản sao cục bộ
+        """
+        local_chain = self.local_chain
+        data, error = self.get_blocks_since(len(local_chain) - 1)
+        if error:
+            return None, error
+
+        blocks = data.get('blocks', [])
+        tip_hash = data.get('tip_hash')
+        if blocks:
+            diverged = bool(local_chain) and blocks[0].get('prev_hash') != local_chain[-1].get('hash')
+        else:
+            diverged = bool(local_chain) and (data.get('length') != len(local_chain)
+                                              or tip_hash != local_chain[-1].get('hash'))
+
+        if diverged:
+            client_logger.warning("Chuỗi trên Node đã thay đổi so với bản sao cục bộ, tải lại toàn bộ.")
+            data, error = self.get_blocks_since(-1)
+            if error:
+                return None, error
+            local_chain = []
+            blocks = data.get('blocks', [])
+
+        self.local_chain = local_chain + blocks
+        client_logger.info(f"Đồng bộ chuỗi cục bộ: +{len(blocks)} block, chiều dài {len(self.local_chain)}.")
+        return blocks, None
+
+    @_node_call('mine')
     def mine_block(self):
         """
         Kích hoạt đào block (method hiện tại)
         """
         try:
-            response = requests.get(f'{self.node_url}/mine')
+            response = self._request('mine', 'GET', '/mine',
+                                     timeout=(self.connection.connect_timeout, self.connection.mine_timeout))
+            # Đỉnh chuỗi có thể đã đổi: lần đọc số dư sau phải hỏi lại /tip
+            self.balance_cache.invalidate()
             response.raise_for_status()
             client_logger.info(f"Đã kích hoạt đào block trên Node: {response.json().get('message')}")
             return response.json(), None
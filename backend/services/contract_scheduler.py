@@ -0,0 +1,226 @@
+import heapq
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import select, update
+
+from backend.db.database import db
+from backend.models.smart_contract import ACTIVE, FAILED, ON_DEADLINE_EXECUTE, SmartContract
+from backend.services.smart_contract_service import get_smart_contract_service
+from blockchain_core.metrics import REGISTRY
+
+scheduler_logger = logging.getLogger(__name__)
+
+CONTRACTS_SETTLED = REGISTRY.counter('smart_contracts_settled_total',
+                                     'Số hợp đồng thông minh được bộ lập lịch xử lý khi tới hạn', ('result',))
+CONTRACTS_SCHEDULED = REGISTRY.gauge('smart_contract_scheduler_heap_size',
+                                     'Số hợp đồng tới hạn sớm nhất đang giữ trong heap của bộ lập lịch')
+
+# SQLite giới hạn số tham số trong một câu lệnh
+SETTLE_CHUNK = 500
+
+
+class ContractScheduler:
+    """
+    Luồng nền tự xử lý các hợp đồng thông minh tới hạn (SmartContract.due_at, ban đầu bằng deadline):
+    - giữ trong bộ nhớ một min-heap (due_at, id) chỉ gồm lô `batch_size` hợp đồng 'active' tới hạn sớm nhất,
+      đọc qua index (status, due_at) nên không quét cả bảng dù có hàng trăm nghìn hợp đồng đang chờ
+    - heap hết mà lô vừa đọc đầy thì đọc lô kế tiếp; hợp đồng mới tới hạn trước hợp đồng cuối của lô
+      được thêm thẳng vào heap, nếu nó tới hạn sớm nhất thì đánh thức luồng
+    - ngủ tới hạn sớm nhất trong heap, và đọc lại lô sau mỗi `reload_interval` giây để thấy hợp đồng do
+      tiến trình khác tạo
+    - tới hạn: hợp đồng 'refund' được hoàn lại hàng loạt bằng một UPDATE, hợp đồng 'execute' được gửi tới Node;
+      gửi lỗi thì lùi due_at với thời gian chờ tăng dần, sau `max_attempts` lần thì chuyển 'failed' nếu Node
+      không biết giao dịch (transaction_id cố định theo hợp đồng nên lần gửi hết thời gian chờ vẫn đối chiếu được)
+    Hợp đồng chỉ được xử lý khi còn 'active' nên đọc trùng, nhiều tiến trình cùng chạy hay gọi /execute
+    cùng lúc đều an toàn. Luồng chỉ được khởi động ở request đầu tiên nên import backend không chạy gì.
+    """
+
+    def __init__(self, batch_size=1000, reload_interval=60.0, retry_delay=5.0, max_attempts=5):
+        self.batch_size = batch_size
+        self.reload_interval = reload_interval
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.app = None
+        self._heap = []
+        # due_at của hợp đồng cuối trong lô khi lô đầy (có thể còn hợp đồng muộn hơn trong DB); None nếu đã đọc hết
+        self._horizon = None
+        self._loaded_at = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['contract_scheduler'] = self
+
+        @app.before_request
+        def _start_contract_scheduler():
+            if self._thread is None:
+                self.start()
+        return self
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="contract-scheduler", daemon=True)
+            self._thread.start()
+        scheduler_logger.info("Bộ lập lịch hợp đồng thông minh đã khởi động.")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, id, due_at):
+        """Thêm hợp đồng vừa tạo (đã commit) vào heap nếu nó thuộc lô đang giữ"""
+        with self._lock:
+            if self._loaded_at is None or (self._horizon is not None and due_at > self._horizon):
+                # Chưa đọc lô nào, hoặc muộn hơn cả lô: sẽ được đọc từ DB khi tới lượt
+                return
+            earliest = not self._heap or due_at < self._heap[0][0]
+            heapq.heappush(self._heap, (due_at, id))
+            CONTRACTS_SCHEDULED.set(len(self._heap))
+        if earliest:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    timeout = self.run_once()
+                except Exception as e:
+                    scheduler_logger.error(f"Lỗi trong bộ lập lịch hợp đồng: {e}")
+                    db.session.rollback()
+                    timeout = self.retry_delay
+                finally:
+                    db.session.remove()
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def run_once(self):
+        """Xử lý mọi hợp đồng đã tới hạn; trả về số giây tới lần cần chạy kế tiếp"""
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.reload_interval:
+            self.reload()
+        while True:
+            now = time.time()
+            due = self._pop_due(now)
+            if not due:
+                if self._heap or self._horizon is None:
+                    break
+                # Đã xử lý hết lô nhưng trong DB còn hợp đồng muộn hơn
+                self.reload()
+                continue
+            self._settle(due, now)
+
+        wait = self.reload_interval - (time.monotonic() - self._loaded_at)
+        with self._lock:
+            if self._heap:
+                wait = min(wait, self._heap[0][0] - time.time())
+        return max(wait, 0.0)
+
+    def reload(self):
+        """Đọc lại lô `batch_size` hợp đồng 'active' tới hạn sớm nhất vào heap"""
+        # Giữ khoá trong lúc đọc: hợp đồng commit sau câu truy vấn sẽ được schedule() thêm vào heap mới
+        with self._lock:
+            rows = db.session.execute(
+                select(SmartContract.due_at, SmartContract.id)
+                .where(SmartContract.status == ACTIVE)
+                .order_by(SmartContract.due_at)
+                .limit(self.batch_size)
+            ).all()
+            self._heap = [(due_at, id) for due_at, id in rows]
+            heapq.heapify(self._heap)
+            self._horizon = rows[-1][0] if len(rows) == self.batch_size else None
+            self._loaded_at = time.monotonic()
+            CONTRACTS_SCHEDULED.set(len(self._heap))
+        db.session.commit()
+
+    def _pop_due(self, now):
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now and len(due) < SETTLE_CHUNK:
+                due.append(heapq.heappop(self._heap)[1])
+            CONTRACTS_SCHEDULED.set(len(self._heap))
+        return due
+
+    def _settle(self, ids, now):
+        service = get_smart_contract_service(self.app)
+        refunded = service.refund_due(ids, now)
+        if refunded:
+            CONTRACTS_SETTLED.labels('refunded').inc(refunded)
+            scheduler_logger.info(f"Đã hoàn lại {refunded} hợp đồng quá hạn.")
+
+        # Còn lại: hợp đồng tự thực thi khi tới hạn, hoặc due_at đã bị lùi (tiến trình khác gửi lỗi)
+        for contract in SmartContract.query.filter(SmartContract.id.in_(ids), SmartContract.status == ACTIVE).all():
+            if contract.due_at > now:
+                self.schedule(contract.id, contract.due_at)
+            elif contract.on_deadline == ON_DEADLINE_EXECUTE:
+                self._execute(service, contract)
+
+    def _execute(self, service, contract):
+        data, error = service.transfer(contract)
+        if data is not None:
+            CONTRACTS_SETTLED.labels('executed').inc()
+            return
+        if error is None:
+            # Đã được xử lý ở nơi khác (vd. /execute)
+            return
+        db.session.refresh(contract)
+        if contract.status != ACTIVE:
+            CONTRACTS_SETTLED.labels('failed').inc()
+            return
+        if contract.attempts >= self.max_attempts:
+            # Lần gửi cuối có thể đã tới Node dù không nhận được phản hồi: chỉ chốt 'failed' khi Node không biết
+            # giao dịch; không hỏi được Node thì để lần sau hỏi lại
+            data, error = service.find_sent_transfer(contract)
+            if data is not None:
+                CONTRACTS_SETTLED.labels('executed').inc()
+                return
+            if error is not None:
+                self._retry_later(contract)
+                return
+            db.session.execute(update(SmartContract)
+                               .where(SmartContract.id == contract.id, SmartContract.status == ACTIVE)
+                               .values(status=FAILED))
+            db.session.commit()
+            CONTRACTS_SETTLED.labels('failed').inc()
+            scheduler_logger.error(f"Hợp đồng '{contract.contract_id}' thất bại sau {contract.attempts} lần gửi.")
+            return
+        self._retry_later(contract)
+
+    def _retry_later(self, contract):
+        due_at = time.time() + self.retry_delay * 2 ** (contract.attempts - 1)
+        db.session.execute(update(SmartContract)
+                           .where(SmartContract.id == contract.id, SmartContract.status == ACTIVE)
+                           .values(due_at=due_at))
+        db.session.commit()
+        self.schedule(contract.id, due_at)
+        scheduler_logger.warning(f"Gửi hợp đồng '{contract.contract_id}' lỗi (lần {contract.attempts}), "
+                                 f"thử lại lúc {time.ctime(due_at)}.")
+
+
+def init_contract_scheduler(app):
+    """Gắn bộ lập lịch hợp đồng thông minh vào app (tắt bằng CONTRACT_SCHEDULER=0)"""
+    if os.environ.get('CONTRACT_SCHEDULER', '1') == '0':
+        return None
+    return ContractScheduler(
+        batch_size=int(os.environ.get('CONTRACT_SCHEDULER_BATCH', 1000)),
+        reload_interval=float(os.environ.get('CONTRACT_SCHEDULER_RELOAD', 60)),
+        retry_delay=float(os.environ.get('CONTRACT_SCHEDULER_RETRY_DELAY', 5)),
+        max_attempts=int(os.environ.get('CONTRACT_SCHEDULER_MAX_ATTEMPTS', 5)),
+    ).init_app(app)
+
+
+def schedule_contract(app, contract):
+    scheduler = app.extensions.get('contract_scheduler')
+    if scheduler is not None:
+        scheduler.schedule(contract.id, contract.due_at)
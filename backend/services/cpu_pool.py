@@ -0,0 +1,147 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from flask import current_app, has_app_context, jsonify
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from blockchain_core.metrics import REGISTRY
+from blockchain_core.wallet import generate_keypairs
+
+cpu_pool_logger = logging.getLogger(__name__)
+
+# Tiến trình con khởi động mới thay vì fork: fork từ server sẽ kế thừa socket đang lắng nghe
+# và giữ cổng sau khi server dừng
+PROCESS_CONTEXT = multiprocessing.get_context('spawn')
+
+CPU_POOL_TASKS = REGISTRY.counter('cpu_pool_tasks_total', 'Số tác vụ CPU-bound gửi vào pool tiến trình',
+                                  ('task', 'result'))
+CPU_POOL_SECONDS = REGISTRY.histogram('cpu_pool_task_seconds', 'Thời gian chờ + chạy một tác vụ trong pool tiến trình',
+                                      ('task',))
+CPU_POOL_IN_FLIGHT = REGISTRY.gauge('cpu_pool_in_flight', 'Số tác vụ đang chạy hoặc xếp hàng trong pool tiến trình')
+
+
+class CpuPoolBusy(Exception):
+    """Pool tiến trình không nhận thêm tác vụ (hàng đợi đầy) hoặc tác vụ chờ quá timeout"""
+
+
+class CpuPool:
+    """
+    Pool tiến trình có giới hạn cho các tác vụ CPU-bound của xác thực (hash / kiểm tra mật khẩu, sinh khoá ví),
+    để chúng không chiếm luồng xử lý request và không làm nghẽn các endpoint đọc nhẹ.
+    Tối đa `workers` tác vụ chạy cùng lúc và `max_queue` tác vụ xếp hàng; vượt quá thì từ chối ngay
+    (CpuPoolBusy). Tác vụ chờ quá `timeout` giây cũng trả về CpuPoolBusy (tác vụ vẫn chạy nốt trong nền).
+    """
+
+    def __init__(self, workers=None, max_queue=32, timeout=5.0):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.workers + max_queue)
+        self._in_flight = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.extensions['cpu_pool'] = self
+        app.register_error_handler(CpuPoolBusy, _cpu_pool_busy_response)
+        return self
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Tạo lười: import backend không sinh tiến trình con
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=PROCESS_CONTEXT)
+                cpu_pool_logger.info(f"Pool tiến trình cho tác vụ CPU đã khởi động ({self.workers} tiến trình).")
+            return self._executor
+
+    def submit(self, task, fn, *args):
+        """Gửi tác vụ; trả về Future. CpuPoolBusy nếu hàng đợi đầy."""
+        if not self._slots.acquire(blocking=False):
+            CPU_POOL_TASKS.labels(task, 'rejected').inc()
+            raise CpuPoolBusy("Hệ thống đang bận xử lý xác thực, vui lòng thử lại sau.")
+        self._change_in_flight(1)
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def run(self, task, fn, *args, timeout=None):
+        """Chạy fn(*args) trong pool và đợi kết quả (tối đa `timeout` giây, mặc định của pool)"""
+        started = time.perf_counter()
+        future = self.submit(task, fn, *args)
+        try:
+            result = future.result(timeout=timeout or self.timeout)
+        except FutureTimeoutError:
+            CPU_POOL_TASKS.labels(task, 'timeout').inc()
+            raise CpuPoolBusy("Xử lý xác thực quá thời gian, vui lòng thử lại sau.")
+        CPU_POOL_TASKS.labels(task, 'ok').inc()
+        CPU_POOL_SECONDS.labels(task).observe(time.perf_counter() - started)
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _release(self):
+        self._change_in_flight(-1)
+        self._slots.release()
+
+    def _change_in_flight(self, delta):
+        with self._lock:
+            self._in_flight += delta
+            CPU_POOL_IN_FLIGHT.set(self._in_flight)
+
+
+def _cpu_pool_busy_response(error):
+    response = jsonify({"message": str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+
+def init_cpu_pool(app):
+    """Gắn pool tiến trình cho tác vụ CPU vào app (tắt bằng CPU_POOL=0: chạy ngay trên luồng request)"""
+    if os.environ.get('CPU_POOL', '1') == '0':
+        return None
+    return CpuPool(
+        workers=int(os.environ.get('CPU_POOL_WORKERS', 0)) or None,
+        max_queue=int(os.environ.get('CPU_POOL_QUEUE', 32)),
+        timeout=float(os.environ.get('CPU_POOL_TIMEOUT', 5.0)),
+    ).init_app(app)
+
+
+def get_cpu_pool(app=None):
+    if app is None:
+        if not has_app_context():
+            return None
+        app = current_app
+    return app.extensions.get('cpu_pool')
+
+
+def _run(task, fn, *args):
+    """Chạy trong pool của app hiện tại nếu có, không thì chạy ngay (script, CLI, CPU_POOL=0)"""
+    pool = get_cpu_pool()
+    if pool is None:
+        return fn(*args)
+    return pool.run(task, fn, *args)
+
+
+def hash_password(password):
+    return _run('hash_password', generate_password_hash, password)
+
+
+def verify_password(password_hash, password):
+    return _run('check_password', check_password_hash, password_hash, password)
+
+
+def new_keypairs(count=1):
+    return _run('generate_keypairs', generate_keypairs, count)
@@ -0,0 +1,167 @@
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+
+from backend.services.cpu_pool import PROCESS_CONTEXT, CpuPoolBusy, get_cpu_pool, new_keypairs
+from blockchain_core.metrics import REGISTRY, record_cache_lookup
+from blockchain_core.wallet import generate_keypairs
+
+key_pool_logger = logging.getLogger(__name__)
+
+KEY_POOL_READY = REGISTRY.gauge('wallet_key_pool_ready', 'Số cặp khoá ví đã sinh sẵn đang chờ cấp')
+
+
+class WalletKeyPool:
+    """
+    Kho cặp khoá ví sinh sẵn cho đăng ký user: giữ tối đa `size` cặp (public_key, private_key) base64.
+    Khi số cặp còn lại dưới `low_water`, luồng nền sinh thêm theo lô `batch_size` cho tới khi đầy: trong pool
+    tiến trình dùng chung của app (`cpu_pool`, services/cpu_pool.py) nếu có, không thì trong `workers` tiến trình
+    riêng. Kho rỗng thì take() sinh ngay một cặp (qua cpu_pool nếu có).
+    Khoá chỉ nằm trong bộ nhớ của tiến trình; khoá chưa cấp mất đi khi tiến trình dừng.
+    """
+
+    def __init__(self, size=200, low_water=50, workers=2, batch_size=25, cpu_pool=None):
+        self.size = size
+        self.cpu_pool = cpu_pool
+        self.low_water = low_water
+        self.workers = workers
+        self.batch_size = batch_size
+        self._ready = deque()
+        self._executor = None
+        self._thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.extensions['wallet_key_pool'] = self
+
+        @app.before_request
+        def _start_wallet_key_pool():
+            if self._thread is None:
+                self.start()
+        return self
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            if self.cpu_pool is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=PROCESS_CONTEXT)
+            self._thread = threading.Thread(target=self._run, name="wallet-key-pool", daemon=True)
+            self._thread.start()
+        key_pool_logger.info(f"Kho khoá ví đã khởi động ({self.size} cặp, "
+                             f"{'pool tiến trình dùng chung' if self.cpu_pool else f'{self.workers} tiến trình'}).")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __len__(self):
+        return len(self._ready)
+
+    def take(self):
+        """Một cặp (public_key, private_key) chưa từng cấp cho ai"""
+        try:
+            keypair = self._ready.popleft()
+            record_cache_lookup('wallet_key_pool', True)
+        except IndexError:
+            record_cache_lookup('wallet_key_pool', False)
+            keypair = new_keypairs(1)[0]
+        self._after_take()
+        return keypair
+
+    def take_many(self, count, executor=None):
+        """
+        `count` cặp khoá: lấy từ kho trước, phần còn thiếu sinh song song theo lô trên `executor`
+        (mặc định các tiến trình của kho). Dùng cho nhập user hàng loạt.
+        """
+        keypairs = []
+        while len(keypairs) < count:
+            try:
+                keypairs.append(self._ready.popleft())
+            except IndexError:
+                break
+        missing = count - len(keypairs)
+        if missing:
+            executor = executor or self._executor
+            batches = [self.batch_size] * (missing // self.batch_size)
+            if missing % self.batch_size:
+                batches.append(missing % self.batch_size)
+            if executor is None:
+                keypairs.extend(generate_keypairs(missing))
+            else:
+                for batch in executor.map(generate_keypairs, batches):
+                    keypairs.extend(batch)
+        self._after_take()
+        return keypairs
+
+    def _after_take(self):
+        KEY_POOL_READY.set(len(self._ready))
+        if len(self._ready) < self.low_water:
+            self._wake.set()
+
+    def _run(self):
+        # Lần đầu: làm đầy kho ngay
+        self._wake.set()
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            try:
+                self._refill()
+            except Exception as e:
+                key_pool_logger.error(f"Lỗi khi sinh khoá ví cho kho: {e}")
+                self._stop.wait(1.0)
+
+    def _refill(self):
+        while not self._stop.is_set():
+            missing = self.size - len(self._ready)
+            if missing <= 0:
+                return
+            if self.cpu_pool is not None:
+                # Pool dùng chung với hash mật khẩu: từng lô một, nhường chỗ khi pool đang đầy
+                try:
+                    self._ready.extend(self.cpu_pool.run('generate_keypairs', generate_keypairs,
+                                                         min(self.batch_size, missing)))
+                except CpuPoolBusy:
+                    self._stop.wait(0.5)
+                KEY_POOL_READY.set(len(self._ready))
+                continue
+            # Mỗi tiến trình một lô; kho vẫn cấp khoá trong lúc đang sinh
+            batches = [min(self.batch_size, missing - i * self.batch_size)
+                       for i in range(min(self.workers, -(-missing // self.batch_size)))]
+            for batch in self._executor.map(generate_keypairs, batches):
+                self._ready.extend(batch)
+            KEY_POOL_READY.set(len(self._ready))
+
+
+def init_wallet_key_pool(app):
+    """Gắn kho khoá ví sinh sẵn vào app (tắt bằng KEY_POOL=0: mỗi lần đăng ký sinh khoá tại chỗ)"""
+    if os.environ.get('KEY_POOL', '1') == '0':
+        return None
+    return WalletKeyPool(
+        size=int(os.environ.get('KEY_POOL_SIZE', 200)),
+        low_water=int(os.environ.get('KEY_POOL_LOW_WATER', 50)),
+        workers=int(os.environ.get('KEY_POOL_WORKERS', 2)),
+        cpu_pool=get_cpu_pool(app),
+    ).init_app(app)
+
+
+def get_wallet_key_pool(app=None):
+    return (app or current_app).extensions.get('wallet_key_pool')
+
+
+def take_wallet_keys(app=None):
+    """(public_key, private_key) cho một user mới: từ kho nếu có, không thì sinh ngay"""
+    pool = get_wallet_key_pool(app)
+    if pool is None:
+        return new_keypairs(1)[0]
+    return pool.take()
@@ -0,0 +1,286 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from backend.db.database import db
+from backend.models.ledger import LedgerBalance, LedgerBlock, LedgerCursor, LedgerTransaction
+from backend.models.transasaction_detail import TransactionDetail
+from backend.services.blockchain_client import get_blockchain_client
+from blockchain_core.metrics import REGISTRY
+
+projection_logger = logging.getLogger(__name__)
+
+LEDGER_HEIGHT = REGISTRY.gauge('ledger_projection_height', 'Block cuối cùng đã chiếu vào DB của backend')
+LEDGER_BLOCKS = REGISTRY.counter('ledger_projection_blocks_total', 'Số block được chiếu vào / gỡ khỏi DB', ('action',))
+
+CURSOR_NAME = 'main'
+BALANCE_TOLERANCE = 1e-6
+
+
+class LedgerProjection:
+    """
+    Luồng nền chiếu các block trên Node vào các bảng ledger_* của backend:
+    - đọc block mới qua GET /blocks?since=<cursor> theo trang, bắt đầu từ cursor lưu trong DB
+    - mỗi trang ghi trong một transaction: chèn hàng loạt block và giao dịch, cộng dồn số dư theo địa chỉ
+      (một upsert cho mỗi địa chỉ của cả trang) và dời cursor
+    - cursor chỉ được dời nếu vẫn bằng giá trị đã đọc, nên chạy lại (hoặc nhiều tiến trình cùng chạy)
+      không cộng số dư hai lần; block đã có thì bỏ qua
+    - chuỗi trên Node đổi (reorg): gỡ từng block ở đỉnh bằng chính các dòng đã lưu cho tới điểm chung
+    """
+
+    def __init__(self, interval=1.0, page_size=100, max_staleness=5.0):
+        self.interval = interval
+        self.page_size = page_size
+        self.max_staleness = max_staleness
+        self.app = None
+        # Lần gần nhất thấy cursor bằng đỉnh chuỗi của Node (time.monotonic)
+        self.synced_at = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['ledger_projection'] = self
+
+        @app.before_request
+        def _start_ledger_projection():
+            if self._thread is None:
+                self.start()
+        return self
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="ledger-projection", daemon=True)
+            self._thread.start()
+        projection_logger.info("Luồng chiếu sổ cái đã khởi động.")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self.app.app_context():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    projection_logger.error(f"Lỗi trong luồng chiếu sổ cái: {e}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    def run_once(self):
+        """Chiếu tới đỉnh chuỗi hiện tại của Node; trả về số block được chiếu"""
+        client = get_blockchain_client(self.app)
+        applied = 0
+        while True:
+            height, tip_hash = self.cursor()
+            data, error = client.get_blocks_since(height, self.page_size)
+            if error:
+                return applied
+            blocks = data.get('blocks', [])
+            if not blocks:
+                if data.get('tip_hash') == tip_hash:
+                    self.synced_at = time.monotonic()
+                elif height >= 0 and data.get('length', 0) - 1 <= height:
+                    # Node chuyển sang nhánh không dài hơn nhánh đã chiếu
+                    self._rewind_tip(height)
+                    continue
+                return applied
+            if height >= 0 and blocks[0].get('prev_hash') != tip_hash:
+                self._rewind_tip(height)
+                continue
+            applied += self._apply_page(height, blocks)
+            if len(blocks) < self.page_size:
+                if blocks[-1]['hash'] == data.get('tip_hash'):
+                    self.synced_at = time.monotonic()
+                return applied
+
+    def cursor(self):
+        row = db.session.get(LedgerCursor, CURSOR_NAME)
+        return (row.height, row.tip_hash) if row else (-1, None)
+
+    def _move_cursor(self, expected_height, height, tip_hash):
+        """Dời cursor nếu nó vẫn ở expected_height; False nếu tiến trình khác đã dời trước"""
+        if expected_height == -1 and db.session.get(LedgerCursor, CURSOR_NAME) is None:
+            db.session.add(LedgerCursor(name=CURSOR_NAME, height=height, tip_hash=tip_hash))
+            db.session.flush()
+            return True
+        result = db.session.execute(
+            update(LedgerCursor)
+            .where(LedgerCursor.name == CURSOR_NAME, LedgerCursor.height == expected_height)
+            .values(height=height, tip_hash=tip_hash)
+        )
+        return result.rowcount == 1
+
+    def _apply_page(self, height, blocks):
+        blocks = [block for block in blocks if block['index'] > height]
+        if not blocks:
+            return 0
+        # Dời cursor trước tiên để giữ khoá ghi của SQLite trong suốt transaction
+        if not self._move_cursor(height, blocks[-1]['index'], blocks[-1]['hash']):
+            db.session.rollback()
+            return 0
+
+        block_rows, transaction_rows = [], []
+        deltas = defaultdict(float)
+        touched_at = {}
+        for block in blocks:
+            transactions = block.get('transactions', [])
+            block_rows.append({
+                'height': block['index'],
+                'hash': block['hash'],
+                'prev_hash': block['prev_hash'],
+                'timestamp': block['timestamp'],
+                'tx_count': len(transactions),
+            })
+            for position, tx in enumerate(transactions):
+                transaction_rows.append({
+                    'block_height': block['index'],
+                    'position': position,
+                    'transaction_id': tx.get('transaction_id'),
+                    'sender': tx['sender'],
+                    'recipient': tx['recipient'],
+                    'amount': tx['amount'],
+                    'transaction_type': tx.get('transaction_type'),
+                    'timestamp': tx.get('timestamp'),
+                })
+                for address, delta in _balance_deltas(tx['sender'], tx['recipient'], tx['amount']):
+                    deltas[address] += delta
+                    touched_at[address] = block['index']
+
+        db.session.execute(sqlite_insert(LedgerBlock).on_conflict_do_nothing(), block_rows)
+        if transaction_rows:
+            db.session.execute(sqlite_insert(LedgerTransaction).on_conflict_do_nothing(), transaction_rows)
+        self._add_to_balances(deltas, touched_at)
+        db.session.commit()
+
+        LEDGER_BLOCKS.labels('applied').inc(len(blocks))
+        LEDGER_HEIGHT.set(blocks[-1]['index'])
+        projection_logger.debug(f"Đã chiếu block {blocks[0]['index']}..{blocks[-1]['index']} "
+                                f"({len(transaction_rows)} giao dịch).")
+        return len(blocks)
+
+    def _add_to_balances(self, deltas, touched_at):
+        if not deltas:
+            return
+        statement = sqlite_insert(LedgerBalance)
+        statement = statement.on_conflict_do_update(
+            index_elements=[LedgerBalance.address],
+            set_={
+                'balance': LedgerBalance.balance + statement.excluded.balance,
+                'height': statement.excluded.height,
+            }
+        )
+        db.session.execute(statement, [
+            {'address': address, 'balance': delta, 'height': touched_at[address]}
+            for address, delta in deltas.items()
+        ])
+
+    def _rewind_tip(self, height):
+        """Gỡ block ở đỉnh bản chiếu (reorg) bằng các giao dịch đã lưu của nó"""
+        previous = db.session.get(LedgerBlock, height - 1)
+        if not self._move_cursor(height, height - 1, previous.hash if previous else None):
+            db.session.rollback()
+            return
+        deltas = defaultdict(float)
+        for sender, recipient, amount in db.session.execute(
+                select(LedgerTransaction.sender, LedgerTransaction.recipient, LedgerTransaction.amount)
+                .where(LedgerTransaction.block_height == height)):
+            for address, delta in _balance_deltas(sender, recipient, amount):
+                deltas[address] -= delta
+        self._add_to_balances(deltas, dict.fromkeys(deltas, height - 1))
+        db.session.execute(delete(LedgerTransaction).where(LedgerTransaction.block_height == height))
+        db.session.execute(delete(LedgerBlock).where(LedgerBlock.height == height))
+        db.session.commit()
+
+        self.synced_at = None
+        LEDGER_BLOCKS.labels('reverted').inc()
+        LEDGER_HEIGHT.set(height - 1)
+        projection_logger.warning(f"Chuỗi trên Node đã thay đổi, gỡ block #{height} khỏi sổ cái.")
+
+    def is_fresh(self):
+        """Bản chiếu đã bắt kịp đỉnh chuỗi của Node trong vòng max_staleness giây"""
+        return self.synced_at is not None and time.monotonic() - self.synced_at <= self.max_staleness
+
+    def balance_of(self, address):
+        """(số dư, block cuối đã chiếu) theo sổ cái; địa chỉ chưa có giao dịch có số dư 0"""
+        height, _ = self.cursor()
+        row = db.session.get(LedgerBalance, address)
+        return (row.balance if row else 0), height
+
+    def reconcile(self, client=None, limit=1000):
+        """
+        Đối chiếu bản chiếu với Node và với TransactionDetail:
+        - số dư của tối đa `limit` địa chỉ trong sổ cái so với POST /balances của Node
+        - giao dịch 'confirmed' không có trong sổ cái / giao dịch 'blockchain_pending' đã có trong sổ cái
+        Số dư chỉ được so khi sổ cái đã bắt kịp Node (cùng đỉnh chuỗi).
+
+        Returns:
+            tuple: (report, error_message)
+        """
+        client = client or get_blockchain_client(self.app)
+        height, tip_hash = self.cursor()
+        recorded = db.session.query(TransactionDetail.id, TransactionDetail.status).outerjoin(
+            LedgerTransaction, LedgerTransaction.transaction_id == TransactionDetail.blockchain_tx_id
+        ).filter(TransactionDetail.blockchain_tx_id.isnot(None))
+        report = {
+            'height': height,
+            'tip_hash': tip_hash,
+            'confirmed_missing': [row.id for row in recorded.filter(
+                TransactionDetail.status == 'confirmed', LedgerTransaction.id.is_(None)).limit(limit)],
+            'pending_in_ledger': [row.id for row in recorded.filter(
+                TransactionDetail.status == 'blockchain_pending', LedgerTransaction.id.isnot(None)).limit(limit)],
+        }
+
+        tip, error = client.get_tip()
+        if error:
+            return None, error
+        report['node_height'] = tip['height']
+        if tip['tip_hash'] != tip_hash:
+            report['balances_checked'] = 0
+            report['balance_mismatches'] = []
+            return report, None
+
+        ledger_balances = dict(db.session.query(LedgerBalance.address, LedgerBalance.balance).limit(limit))
+        node_balances, error = client.get_balances(list(ledger_balances))
+        if error:
+            return None, error
+        report['balances_checked'] = len(ledger_balances)
+        report['balance_mismatches'] = [
+            {'address': address, 'ledger': balance, 'node': node_balances.get(address)}
+            for address, balance in ledger_balances.items()
+            if abs(balance - (node_balances.get(address) or 0)) > BALANCE_TOLERANCE
+        ]
+        return report, None
+
+
+def _balance_deltas(sender, recipient, amount):
+    """Thay đổi số dư của một giao dịch, cùng quy tắc với Blockchain._connect_block của Node"""
+    if recipient == sender:
+        return [(sender, -amount)]
+    return [(sender, -amount), (recipient, amount)]
+
+
+def init_ledger_projection(app):
+    """Gắn luồng chiếu sổ cái vào app (tắt bằng LEDGER_PROJECTION=0)"""
+    if os.environ.get('LEDGER_PROJECTION', '1') == '0':
+        return None
+    return LedgerProjection(
+        interval=float(os.environ.get('LEDGER_PROJECTION_INTERVAL', 1.0)),
+        page_size=int(os.environ.get('LEDGER_PROJECTION_PAGE_SIZE', 100)),
+        max_staleness=float(os.environ.get('LEDGER_MAX_STALENESS', 5.0)),
+    ).init_app(app)
+
+
+def get_ledger_projection(app):
+    return app.extensions.get('ledger_projection')
@@ -1,8 +1,17 @@
+import secrets
 import time
-from blockchain_core.smartContract import SmartContract
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import update
+
+from blockchain_core.transaction import Transaction
 from blockchain_core.wallet import Wallet
-from backend.services.blockchain_client import BlockchainClient
+from backend.services.blockchain_client import BlockchainClient, get_blockchain_client
+from backend.services.transaction_confirmer import notify_transaction_confirmer
 from backend.db.database import db
+from backend.models.smart_contract import (ACTIVE, EXECUTED, FAILED, ON_DEADLINE_EXECUTE, ON_DEADLINE_REFUND,
+                                           REFUNDED, SmartContract)
 from backend.models.user import User
 from backend.models.transasaction_detail import TransactionDetail
 
@@ -12,11 +21,18 @@ sc_logger = logging.getLogger(__name__)
 
 
 class SmartContractService:
+    """
+    Hợp đồng thông minh của backend, lưu trong bảng smart_contract (còn nguyên sau khi khởi động lại).
+    Trước hạn chót, người gửi thực thi hợp đồng qua /smart_contract/execute; tới hạn mà chưa thực thi thì
+    bộ lập lịch (services/contract_scheduler.py) tự hoàn lại hoặc tự thực thi theo `on_deadline`.
+    Trạng thái chỉ đổi khi hợp đồng còn 'active' nên một hợp đồng không bị xử lý hai lần.
+    """
+
     def __init__(self, blockchain_client: BlockchainClient):
         self.blockchain_client = blockchain_client
-        self.active_contracts = {}  # Lưu trữ các hợp đồng đang hoạt động theo ID hoặc hash
 
-    def deploy_contract(self, sender_username, receiver_username, amount, deadline_seconds, description=""):
+    def deploy_contract(self, sender_username, receiver_username, amount, deadline_seconds, description="",
+                        on_deadline=ON_DEADLINE_REFUND):
         sender_user = User.query.filter_by(username=sender_username).first()
         receiver_user = User.query.filter_by(username=receiver_username).first()
 
@@ -29,101 +45,214 @@ class SmartContractService:
         sender_pubkey = sender_wallet.get_public_key()
         receiver_pubkey = receiver_user.blockchain_public_key
 
-        current_balance = self.blockchain_client.get_balance(sender_pubkey)
-        if current_balance is None or current_balance < amount:
+        current_balance, balance_error = self.blockchain_client.get_balance(sender_pubkey)
+        if balance_error:
+            return False, f"Không thể truy vấn số dư người gửi: {balance_error}"
+        if current_balance < amount:
             sc_logger.warning(
                 f"Triển khai hợp đồng thất bại: {sender_username} không đủ số dư ({current_balance} ETH) để gửi {amount} ETH.")
             return False, "Không đủ số dư để triển khai hợp đồng."
 
         deadline = time.time() + deadline_seconds
 
-        # Mô phỏng "khóa" số tiền trên ví người gửi khi triển khai hợp đồng
-        # Trong một blockchain thực, điều này sẽ được xử lý bằng cách tạo một loại giao dịch "contract deployment"
-        # hoặc escrow contract. Ở đây, chúng ta sẽ giả định số dư bị "trừ" ngay khi hợp đồng được tạo.
-        # Thực tế, giao dịch sẽ chỉ được tạo khi hợp đồng được "thực thi" hoặc "hoàn lại".
-
-        contract_id = f"contract_{sender_username}_{receiver_username}_{int(time.time())}"
-        my_contract = SmartContract(
-            sender=sender_pubkey,
-            receiver=receiver_pubkey,
+        # Số tiền chưa bị "khóa" trên ví người gửi: giao dịch chỉ được tạo khi hợp đồng được thực thi,
+        # hoàn lại chỉ đơn giản là đóng hợp đồng.
+        contract_id = f"contract_{sender_username}_{receiver_username}_{int(time.time())}_{secrets.token_hex(4)}"
+        contract = SmartContract(
+            contract_id=contract_id,
+            sender_username=sender_username,
+            receiver_username=receiver_username,
+            sender_pubkey=sender_pubkey,
+            receiver_pubkey=receiver_pubkey,
             amount=amount,
-            deadline=deadline
+            description=description,
+            deadline=deadline,
+            due_at=deadline,
+            tx_timestamp=time.time(),
+            on_deadline=on_deadline,
         )
-        self.active_contracts[contract_id] = my_contract
+        db.session.add(contract)
+        db.session.commit()
+
+        # Import muộn: contract_scheduler dùng SmartContractService
+        from backend.services.contract_scheduler import schedule_contract
+        schedule_contract(current_app, contract)
 
-        # Ghi log chi tiết hợp đồng off-chain (có thể thêm vào TransactionDetail)
         sc_logger.info(
             f"Hợp đồng thông minh '{contract_id}' đã được triển khai bởi {sender_username} ({sender_pubkey[:10]}...): {amount} ETH đến {receiver_username} ({receiver_pubkey[:10]}...) với hạn chót {time.ctime(deadline)}.")
         return True, {"message": "Hợp đồng thông minh đã được triển khai.", "contract_id": contract_id,
-                      "deadline": time.ctime(deadline)}
+                      "deadline": time.ctime(deadline), "on_deadline": on_deadline}
 
     def execute_contract(self, contract_id):
-        contract = self.active_contracts.get(contract_id)
+        contract = SmartContract.query.filter_by(contract_id=contract_id).first()
         if not contract:
             sc_logger.warning(f"Thực thi hợp đồng thất bại: Không tìm thấy hợp đồng với ID '{contract_id}'.")
             return False, "Hợp đồng không tồn tại hoặc đã bị xóa."
 
-        if contract.executed:
+        if contract.status != ACTIVE:
             sc_logger.info(f"Hợp đồng '{contract_id}' đã được thực hiện hoặc hoàn lại rồi.")
             return True, "Hợp đồng đã thực hiện rồi."
 
-        current_time = time.time()
+        # Quá hạn thì làm đúng việc bộ lập lịch sẽ làm khi tới hạn
+        if time.time() <= contract.deadline or contract.on_deadline == ON_DEADLINE_EXECUTE:
+            data, error = self.transfer(contract)
+            if error:
+                return False, "Lỗi khi gửi giao dịch đến Node."
+            if data is None:
+                return True, "Hợp đồng đã thực hiện rồi."
+            return True, "Hợp đồng đã thực thi thành công."
+
+        if not self._claim(contract.id, REFUNDED):
+            return True, "Hợp đồng đã thực hiện rồi."
+        sc_logger.info(
+            f"Hợp đồng '{contract_id}' quá hạn: {contract.amount} ETH được hoàn lại cho {contract.sender_pubkey[:10]}...")
+        return True, "Hợp đồng đã quá hạn, tiền được hoàn lại."
+
+    def transfer(self, contract):
+        """
+        Gửi giao dịch chuyển tiền của hợp đồng tới Node và ghi TransactionDetail 'blockchain_pending'
+        (luồng xác nhận giao dịch sẽ chốt trạng thái). Hợp đồng được chuyển sang 'executed' trước khi gửi nên
+        hai luồng không gửi cùng một hợp đồng; gửi lỗi thì hợp đồng trở lại 'active'.
+        Giao dịch luôn được gửi với tx_timestamp của hợp đồng nên transaction_id không đổi giữa các lần gửi;
+        lần gửi trước lỗi (vd. hết thời gian chờ trong khi Node đã nhận) thì hỏi Node trước khi gửi lại.
+
+        Returns:
+            tuple: (response_data, error_message); (None, None) nếu hợp đồng đã được xử lý ở nơi khác
+        """
+        if not self._claim(contract.id, EXECUTED):
+            return None, None
 
-        # Tìm user gốc để lấy private key cho việc ký giao dịch
-        sender_user = User.query.filter_by(blockchain_public_key=contract.sender).first()
+        sender_user = User.query.filter_by(username=contract.sender_username).first()
         if not sender_user:
-            sc_logger.error(f"Lỗi: Không tìm thấy người dùng gốc cho Public Key {contract.sender[:10]}...")
-            return False, "Lỗi nội bộ: Không tìm thấy người gửi hợp đồng."
+            sc_logger.error(f"Lỗi: Không tìm thấy người dùng gốc cho Public Key {contract.sender_pubkey[:10]}...")
+            self._set_status(contract.id, EXECUTED, FAILED, error="Không tìm thấy người gửi hợp đồng.")
+            return None, "Lỗi nội bộ: Không tìm thấy người gửi hợp đồng."
+
+        if contract.tx_timestamp is None:
+            # Hợp đồng tạo trước khi có cột tx_timestamp
+            contract.tx_timestamp = time.time()
+            db.session.commit()
+        tx_id = self.expected_tx_id(contract)
+
+        if contract.attempts:
+            # Lần gửi trước lỗi nhưng Node có thể vẫn đã nhận giao dịch (vd. hết thời gian chờ): hỏi trước khi gửi lại
+            tx_data, tx_error = self.blockchain_client.get_transaction(tx_id)
+            if tx_error:
+                return self._release(contract, tx_error)
+            if tx_data.get('status') != 'unknown':
+                sc_logger.info(f"Giao dịch của hợp đồng '{contract.contract_id}' đã có trên Node, không gửi lại.")
+                self._record_transfer(contract, tx_id)
+                return tx_data, None
 
         sender_wallet = Wallet(sender_user.get_blockchain_private_key())
-        message_to_sign = f"{contract.receiver}{contract.amount}"
-        signature = sender_wallet.sign(message_to_sign)
-
-        if current_time <= contract.deadline:
-            # Hợp đồng được thực thi thành công
-            tx_response = self.blockchain_client.send_transaction(
-                sender_pubkey=contract.sender,
-                receiver_pubkey=contract.receiver,
-                amount=contract.amount,
-                signature=signature
-            )
-            if tx_response:
-                contract.executed = True
-                sc_logger.info(
-                    f"Hợp đồng '{contract_id}' được thực thi: {contract.amount} ETH từ {contract.sender[:10]}... đến {contract.receiver[:10]}... Giao dịch đã gửi đến Node.")
-                # Cần cập nhật trạng thái giao dịch off-chain nếu có
-                return True, "Hợp đồng đã thực thi thành công."
-            else:
-                sc_logger.error(f"Lỗi khi gửi giao dịch cho hợp đồng '{contract_id}' đến Node.")
-                return False, "Lỗi khi gửi giao dịch đến Node."
-        else:
-            # Hợp đồng quá hạn, hoàn lại tiền
-            # Trong một hệ thống thực, bạn sẽ tạo một giao dịch hoàn lại cho chính người gửi.
-            # Đối với ví dụ này, chúng ta giả định tiền sẽ "quay lại" mà không cần giao dịch blockchain riêng.
-            # Nếu bạn muốn tạo giao dịch hoàn lại:
-            # refund_tx_response = self.blockchain_client.send_transaction(
-            #     sender_pubkey=contract.receiver, # Giả định người nhận phải trả lại
-            #     receiver_pubkey=contract.sender,
-            #     amount=contract.amount,
-            #     signature=signature_from_receiver # Cần chữ ký của người nhận
-            # )
-            # Tuy nhiên, trong mô hình này, tiền chưa chuyển đi, nên chỉ là log.
-
-            # Cần một cơ chế để hoàn lại tiền hoặc hủy trạng thái giữ tiền.
-            # Hiện tại, chỉ là thông báo. Nếu bạn có UTXO model, bạn sẽ "unspend" UTXO.
-            contract.executed = True
-            sc_logger.info(
-                f"Hợp đồng '{contract_id}' quá hạn: {contract.amount} ETH được hoàn lại cho {contract.sender[:10]}...")
-            return True, "Hợp đồng đã quá hạn, tiền được hoàn lại."
+        signature = sender_wallet.sign(f"{contract.receiver_pubkey}{contract.amount}")
+        tx_data, tx_error = self.blockchain_client.send_transaction(
+            sender_pubkey=contract.sender_pubkey,
+            receiver_pubkey=contract.receiver_pubkey,
+            amount=contract.amount,
+            signature=signature,
+            timestamp=contract.tx_timestamp
+        )
+        if tx_error:
+            return self._release(contract, tx_error)
+
+        self._record_transfer(contract, tx_data.get('transaction_id'))
+        return tx_data, None
+
+    def find_sent_transfer(self, contract):
+        """
+        Hỏi Node giao dịch của hợp đồng 'active' đã được nhận chưa (lần gửi cuối có thể hết thời gian chờ sau khi
+        Node đã nhận); nếu có thì chốt hợp đồng 'executed' như khi gửi thành công.
+
+        Returns:
+            tuple: (response_data, error_message); (None, None) nếu Node không biết giao dịch
+        """
+        if contract.tx_timestamp is None:
+            return None, None
+        tx_id = self.expected_tx_id(contract)
+        tx_data, tx_error = self.blockchain_client.get_transaction(tx_id)
+        if tx_error:
+            return None, tx_error
+        if tx_data.get('status') == 'unknown' or not self._claim(contract.id, EXECUTED):
+            return None, None
+        self._record_transfer(contract, tx_id)
+        return tx_data, None
+
+    @staticmethod
+    def expected_tx_id(contract):
+        """transaction_id Node sẽ gán cho giao dịch của hợp đồng (tính như Node, từ tx_timestamp)"""
+        return Transaction(contract.sender_pubkey, contract.receiver_pubkey, contract.amount,
+                           timestamp=contract.tx_timestamp).transaction_id
+
+    def _release(self, contract, error):
+        """Gửi lỗi: đưa hợp đồng về 'active' để bộ lập lịch thử lại"""
+        sc_logger.error(f"Lỗi khi gửi giao dịch cho hợp đồng '{contract.contract_id}' đến Node: {error}")
+        self._set_status(contract.id, EXECUTED, ACTIVE, error=error[:256], settled_at=None,
+                         attempts=SmartContract.attempts + 1)
+        return None, error
+
+    def _record_transfer(self, contract, tx_id):
+        self._set_status(contract.id, EXECUTED, EXECUTED, blockchain_tx_id=tx_id, error=None)
+        db.session.add(TransactionDetail(
+            blockchain_tx_id=tx_id,
+            sender_username=contract.sender_username,
+            receiver_username=contract.receiver_username,
+            amount=contract.amount,
+            description=f"Hợp đồng {contract.contract_id}",
+            status='blockchain_pending',
+        ))
+        db.session.commit()
+
+        notify_transaction_confirmer(current_app)
+        sc_logger.info(
+            f"Hợp đồng '{contract.contract_id}' được thực thi: {contract.amount} ETH từ {contract.sender_pubkey[:10]}... đến {contract.receiver_pubkey[:10]}... Giao dịch đã gửi đến Node.")
+
+    def refund_due(self, ids, now):
+        """Hoàn lại hàng loạt các hợp đồng 'refund' trong `ids` đã tới hạn; trả về số hợp đồng được hoàn lại"""
+        refunded = db.session.execute(
+            update(SmartContract)
+            .where(SmartContract.id.in_(ids), SmartContract.status == ACTIVE,
+                   SmartContract.on_deadline == ON_DEADLINE_REFUND, SmartContract.due_at <= now)
+            .values(status=REFUNDED, settled_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        return refunded
+
+    def _claim(self, id, status):
+        """Chuyển hợp đồng từ 'active' sang `status`; False nếu luồng / tiến trình khác đã xử lý trước"""
+        return self._set_status(id, ACTIVE, status, settled_at=datetime.utcnow()) == 1
+
+    def _set_status(self, id, expected, status, **values):
+        updated = db.session.execute(
+            update(SmartContract)
+            .where(SmartContract.id == id, SmartContract.status == expected)
+            .values(status=status, **values)
+        ).rowcount
+        db.session.commit()
+        return updated
 
     def get_contract_status(self, contract_id):
-        contract = self.active_contracts.get(contract_id)
+        contract = SmartContract.query.filter_by(contract_id=contract_id).first()
         if not contract:
             return None
         return {
-            "sender": contract.sender,
-            "receiver": contract.receiver,
+            "sender": contract.sender_pubkey,
+            "receiver": contract.receiver_pubkey,
             "amount": contract.amount,
             "deadline": time.ctime(contract.deadline),
-            "executed": contract.executed
-        }
\ No newline at end of file
+            "executed": contract.status != ACTIVE,
+            "status": contract.status,
+            "on_deadline": contract.on_deadline,
+            "blockchain_tx_id": contract.blockchain_tx_id,
+            "error": contract.error,
+        }
+
+
+def get_smart_contract_service(app=None):
+    """SmartContractService dùng chung của app, dùng BlockchainClient chung"""
+    app = app or current_app._get_current_object()
+    service = app.extensions.get('smart_contract_service')
+    if service is None:
+        service = app.extensions.setdefault('smart_contract_service',
+                                            SmartContractService(get_blockchain_client(app)))
+    return service
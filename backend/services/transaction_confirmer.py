@@ -0,0 +1,210 @@
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+from backend.db.database import db
+from backend.models.transasaction_detail import TransactionDetail
+from backend.services.blockchain_client import get_blockchain_client
+from blockchain_core.metrics import REGISTRY
+
+confirmer_logger = logging.getLogger(__name__)
+
+TRANSACTIONS_SETTLED = REGISTRY.counter('transactions_settled_total',
+                                        'Số giao dịch chuyển tiền được chốt trạng thái bởi luồng xác nhận', ('status',))
+
+PENDING = 'blockchain_pending'
+CONFIRMED = 'confirmed'
+FAILED = 'failed'
+
+# SQLite giới hạn số tham số trong một câu lệnh
+UPDATE_CHUNK = 500
+
+
+class TransactionConfirmer:
+    """
+    Luồng nền chốt trạng thái các giao dịch chuyển tiền đã gửi lên Node:
+    - kích hoạt đào block khi còn giao dịch 'blockchain_pending' (thay cho việc đào ngay trong request)
+    - đọc các block mới qua GET /blocks?since=... và cập nhật hàng loạt các TransactionDetail có
+      blockchain_tx_id nằm trong block thành 'confirmed'
+    - giao dịch chờ quá `timeout` giây mà không còn trong pool của Node thì chuyển thành 'failed'
+    Luồng chỉ được khởi động ở request đầu tiên nên import backend không chạy gì.
+    """
+
+    def __init__(self, interval=1.0, timeout=600.0, page_size=500, auto_mine=True):
+        self.interval = interval
+        self.timeout = timeout
+        self.page_size = page_size
+        self.auto_mine = auto_mine
+        self.app = None
+        self.height = None
+        self.tip_hash = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['transaction_confirmer'] = self
+
+        @app.before_request
+        def _start_transaction_confirmer():
+            if self._thread is None:
+                self.start()
+        return self
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="transaction-confirmer", daemon=True)
+            self._thread.start()
+        confirmer_logger.info("Luồng xác nhận giao dịch đã khởi động.")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def notify(self):
+        """Báo có giao dịch mới được gửi để luồng xử lý ngay thay vì đợi hết interval"""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            with self.app.app_context():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    confirmer_logger.error(f"Lỗi trong luồng xác nhận giao dịch: {e}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    def run_once(self):
+        """Một vòng xử lý; trả về số giao dịch được chốt trạng thái"""
+        client = get_blockchain_client(self.app)
+        has_pending = db.session.query(TransactionDetail.query.filter_by(status=PENDING).exists()).scalar()
+        if self.height is None:
+            if not self._init_cursor(client, has_pending):
+                return 0
+        if not has_pending:
+            # Không có gì để xác nhận: chỉ theo dõi đỉnh chuỗi (rẻ) để không phải quét lại về sau
+            tip, error = client.get_tip()
+            if not error:
+                self._advance_to_tip(client, tip)
+            return 0
+
+        # Pool của Node rỗng (vd. Node khởi động lại và mất pool) thì không có gì để đào
+        pool, pool_error = client.get_pending_transactions()
+        if self.auto_mine and not pool_error and pool:
+            _, mine_error = client.mine_block()
+            if mine_error:
+                confirmer_logger.warning(f"Không thể kích hoạt đào block: {mine_error}")
+
+        settled = self._confirm_new_blocks(client)
+        if not pool_error:
+            settled += self._fail_expired(client, pool)
+        return settled
+
+    def _init_cursor(self, client, has_pending):
+        tip, error = client.get_tip()
+        if error:
+            return False
+        if has_pending:
+            # Giao dịch chờ có thể đã vào block khi backend không chạy: quét lại từ đầu (theo trang)
+            self.height, self.tip_hash = -1, None
+        else:
+            self.height, self.tip_hash = tip['height'], tip['tip_hash']
+        return True
+
+    def _advance_to_tip(self, client, tip):
+        if tip['height'] >= self.height:
+            self.height, self.tip_hash = tip['height'], tip['tip_hash']
+
+    def _confirm_new_blocks(self, client):
+        settled = 0
+        while True:
+            data, error = client.get_blocks_since(self.height, self.page_size)
+            if error:
+                return settled
+            blocks = data.get('blocks', [])
+            if not blocks:
+                if self.tip_hash is not None and data.get('tip_hash') != self.tip_hash \
+                        and data.get('length', 0) - 1 <= self.height:
+                    self._rewind()
+                    continue
+                return settled
+            if self.tip_hash is not None and blocks[0].get('prev_hash') != self.tip_hash:
+                self._rewind()
+                continue
+
+            transaction_ids = [tx.get('transaction_id') for block in blocks for tx in block.get('transactions', [])]
+            settled += self._bulk_update(transaction_ids, CONFIRMED)
+            self.height, self.tip_hash = blocks[-1]['index'], blocks[-1]['hash']
+            if len(blocks) < self.page_size:
+                return settled
+
+    def _rewind(self):
+        """Chuỗi trên Node đã đổi (reorg): quét lại từ đầu; cập nhật là idempotent nên an toàn"""
+        confirmer_logger.warning("Chuỗi trên Node đã thay đổi, quét lại các block để xác nhận giao dịch.")
+        self.height, self.tip_hash = -1, None
+
+    def _fail_expired(self, client, pool):
+        cutoff = datetime.utcnow() - timedelta(seconds=self.timeout)
+        expired = [tx_id for (tx_id,) in db.session.query(TransactionDetail.blockchain_tx_id)
+                   .filter(TransactionDetail.status == PENDING, TransactionDetail.created_at < cutoff)]
+        if not expired:
+            return 0
+        # Giao dịch vẫn còn trong pool của Node thì chưa hỏng, chỉ là chưa được đào
+        in_pool = {tx.get('transaction_id') for tx in pool}
+        confirmed, failed = [], []
+        for tx_id in expired:
+            if not tx_id or tx_id in in_pool:
+                continue
+            # Giao dịch có thể đã vào block trước khi blockchain_tx_id được commit (cursor đã đi qua block đó)
+            data, error = client.get_transaction(tx_id)
+            if error:
+                continue
+            if data.get('status') == 'confirmed':
+                confirmed.append(tx_id)
+            elif data.get('status') == 'unknown':
+                failed.append(tx_id)
+        return self._bulk_update(confirmed, CONFIRMED) + self._bulk_update(failed, FAILED)
+
+    def _bulk_update(self, transaction_ids, status):
+        transaction_ids = [tx_id for tx_id in transaction_ids if tx_id]
+        updated = 0
+        for start in range(0, len(transaction_ids), UPDATE_CHUNK):
+            updated += TransactionDetail.query.filter(
+                TransactionDetail.blockchain_tx_id.in_(transaction_ids[start:start + UPDATE_CHUNK]),
+                TransactionDetail.status == PENDING,
+            ).update({TransactionDetail.status: status}, synchronize_session=False)
+        if updated:
+            db.session.commit()
+            TRANSACTIONS_SETTLED.labels(status).inc(updated)
+            confirmer_logger.info(f"Đã chuyển {updated} giao dịch sang trạng thái '{status}'.")
+        return updated
+
+
+def init_transaction_confirmer(app):
+    """Gắn luồng xác nhận giao dịch vào app (tắt bằng TRANSACTION_CONFIRMER=0)"""
+    if os.environ.get('TRANSACTION_CONFIRMER', '1') == '0':
+        return None
+    return TransactionConfirmer(
+        interval=float(os.environ.get('TRANSACTION_CONFIRMER_INTERVAL', 1.0)),
+        timeout=float(os.environ.get('TRANSACTION_CONFIRMER_TIMEOUT', 600)),
+        auto_mine=os.environ.get('TRANSACTION_AUTO_MINE', '1') != '0',
+    ).init_app(app)
+
+
+def notify_transaction_confirmer(app):
+    confirmer = app.extensions.get('transaction_confirmer')
+    if confirmer is not None:
+        confirmer.notify()
@@ -0,0 +1,112 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from backend.db.database import db
+from backend.models.user import User
+from blockchain_core.metrics import record_cache_lookup
+
+cache_logger = logging.getLogger(__name__)
+
+# Các id cần xoá khỏi cache khi transaction của session được commit
+_PENDING_INVALIDATIONS = 'user_cache_invalidate'
+
+
+class UserCache:
+    """
+    Cache LRU có TTL các bản ghi User theo id, dùng chung giữa các request của một tiến trình.
+    Lưu giá trị các cột (không giữ object gắn với session nào); khi đọc, object được dựng lại và
+    gắn vào session hiện tại bằng merge(load=False) nên không tốn truy vấn DB.
+    Mọi UPDATE/DELETE trên User qua ORM (hồ sơ, khoá ví, thẻ tín dụng...) xoá bản ghi khỏi cache
+    lúc flush và một lần nữa sau commit. Tiến trình khác sửa User thì bản ghi cũ sống tối đa `ttl` giây,
+    vì vậy các luồng ghi lên User nên đọc lại từ DB (fresh=True).
+    """
+
+    def __init__(self, ttl=30.0, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._columns = [attr.key for attr in inspect(User).column_attrs]
+
+    def init_app(self, app):
+        app.extensions['user_cache'] = self
+        event.listen(User, 'after_update', self._on_user_changed)
+        event.listen(User, 'after_delete', self._on_user_changed)
+        event.listen(Session, 'after_commit', self._on_commit)
+        return self
+
+    def load(self, user_id, fresh=False):
+        """User theo id, gắn với db.session; None nếu không tồn tại"""
+        if not fresh:
+            values = self._get(user_id)
+            record_cache_lookup('session_user', values is not None)
+            if values is not None:
+                user = User(**values)
+                make_transient_to_detached(user)
+                return db.session.merge(user, load=False)
+
+        user = db.session.get(User, user_id, populate_existing=fresh)
+        if user is not None:
+            self._put(user_id, {column: getattr(user, column) for column in self._columns})
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, values = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return values
+
+    def _put(self, user_id, values):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _on_user_changed(self, mapper, connection, target):
+        self.invalidate(target.id)
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault(_PENDING_INVALIDATIONS, set()).add(target.id)
+
+    def _on_commit(self, session):
+        # Một request khác có thể đã nạp lại bản cũ giữa lúc flush và commit
+        for user_id in session.info.pop(_PENDING_INVALIDATIONS, ()):
+            self.invalidate(user_id)
+
+
+def init_user_cache(app):
+    """Gắn cache User vào app (tắt bằng USER_CACHE=0: mọi request đọc lại từ DB)"""
+    if os.environ.get('USER_CACHE', '1') == '0':
+        return None
+    return UserCache(
+        ttl=float(os.environ.get('USER_CACHE_TTL', 30)),
+        max_entries=int(os.environ.get('USER_CACHE_SIZE', 10000)),
+    ).init_app(app)
+
+
+def load_user(app, user_id, fresh=False):
+    cache = app.extensions.get('user_cache')
+    if cache is None:
+        return db.session.get(User, user_id, populate_existing=fresh)
+    return cache.load(user_id, fresh)
@@ -0,0 +1,259 @@
+"""
+Benchmark các hot path của blockchain_core ở nhiều kích thước chuỗi.
+
+    python -m benchmarks.bench_core --sizes 100,1000,10000 --output baseline.json
+    python -m benchmarks.bench_core --sizes 100,1000,10000 --compare baseline.json
+
+Các phép đo:
+    block.calculate_hash        theo số giao dịch trong block
+    block.mine_block            theo độ khó (--difficulties)
+    transaction.to_dict/from_dict
+    wallet.sign/verify
+    chain.is_chain_valid        theo kích thước chuỗi (số giao dịch)
+    chain.get_balance           theo kích thước chuỗi
+    chain.save_to_file/load_from_file theo kích thước chuỗi
+Kết quả in ra dạng JSON; --compare so sánh với một lần chạy trước và đánh dấu các phép đo chậm đi.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_SIZES = '100,1000,10000,100000,1000000'
+
+
+def measure(fn, repeat=5, min_time=0.2, max_time=30.0):
+    """
+    Chạy fn ít nhất `repeat` lần và ít nhất `min_time` giây (nhưng dừng khi quá `max_time`).
+    Trả về thống kê thời gian mỗi lần gọi (giây).
+    """
+    samples = []
+    started = time.perf_counter()
+    while True:
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+        elapsed = time.perf_counter() - started
+        if (len(samples) >= repeat and elapsed >= min_time) or elapsed >= max_time:
+            break
+    return {
+        'runs': len(samples),
+        'min_s': min(samples),
+        'median_s': statistics.median(samples),
+        'mean_s': statistics.mean(samples),
+        'stdev_s': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+    }
+
+
+def build_chain(tx_count, txs_per_block=100, address_count=1000, seed=0):
+    """Tạo chuỗi hợp lệ có khoảng tx_count giao dịch (độ khó 1 để đào nhanh)"""
+    from blockchain_core.blockchain import Blockchain
+    from blockchain_core.transaction import Transaction
+
+    rng = random.Random(seed)
+    funder = "BENCH_FUNDER"
+    addresses = [f"addr_{i:06d}" for i in range(address_count)]
+    chain = Blockchain(difficulty=1, initial_funder_address=funder, initial_fund_amount=10 ** 12)
+    remaining = tx_count
+    while remaining > 0:
+        batch = min(txs_per_block, remaining)
+        chain.pending_transactions = [
+            Transaction(funder, rng.choice(addresses), float(rng.randint(1, 100)), signature="DUMMY_SIGNATURE")
+            for _ in range(batch)
+        ]
+        chain.mine_pending_transactions("BENCH_MINER")
+        remaining -= batch
+    return chain, addresses
+
+
+def _sample_transactions(count):
+    from blockchain_core.transaction import Transaction
+    return [Transaction(f"sender_{i}", f"receiver_{i}", float(i + 1), signature="DUMMY_SIGNATURE")
+            for i in range(count)]
+
+
+def bench_block(results, difficulties, txs_per_block):
+    from blockchain_core.block import Block
+
+    for tx_count in sorted({1, txs_per_block, txs_per_block * 10}):
+        block = Block(1, time.time(), _sample_transactions(tx_count), "0" * 64, 1)
+        results.append(_result('block.calculate_hash', {'txs': tx_count}, measure(block.calculate_hash)))
+
+    block = Block(1, time.time(), _sample_transactions(10), "0" * 64, 1)
+    for difficulty in difficulties:
+        block.difficulty = difficulty
+        hashes = []
+
+        def mine():
+            block.timestamp = time.time()
+            block.nonce = 0
+            block.mine_block()
+            hashes.append(block.nonce + 1)
+
+        stats = measure(mine, repeat=5 if difficulty < 4 else 3, min_time=0.5)
+        stats['mean_hashes'] = statistics.mean(hashes)
+        stats['hashes_per_s'] = sum(hashes) / (stats['mean_s'] * stats['runs'])
+        results.append(_result('block.mine_block', {'difficulty': difficulty, 'txs': 10}, stats))
+
+
+def bench_transaction(results, batch=1000):
+    from blockchain_core.transaction import Transaction
+
+    transactions = _sample_transactions(batch)
+    dicts = [tx.to_dict() for tx in transactions]
+    results.append(_result('transaction.to_dict', {'batch': batch},
+                           measure(lambda: [tx.to_dict() for tx in transactions])))
+    results.append(_result('transaction.from_dict', {'batch': batch},
+                           measure(lambda: [Transaction.from_dict(d) for d in dicts])))
+
+
+def bench_wallet(results):
+    from blockchain_core.wallet import Wallet
+
+    wallet = Wallet()
+    public_key = wallet.get_public_key()
+    message = json.dumps({"sender": wallet.address, "receiver": "bench", "amount": "1.0", "timestamp": 0})
+    signature = wallet.sign(message)
+    results.append(_result('wallet.sign', {}, measure(lambda: wallet.sign(message), repeat=20)))
+    results.append(_result('wallet.verify', {}, measure(lambda: Wallet.verify(public_key, message, signature),
+                                                        repeat=20)))
+
+
+def bench_chain(results, tx_count, txs_per_block, workdir):
+    from blockchain_core.blockchain import Blockchain
+
+    build_start = time.perf_counter()
+    chain, addresses = build_chain(tx_count, txs_per_block)
+    params = {'txs': tx_count, 'blocks': len(chain.chain)}
+    results.append(_result('chain.build', params, {'runs': 1, 'mean_s': time.perf_counter() - build_start}))
+
+    results.append(_result('chain.is_chain_valid', params, measure(chain.is_chain_valid, repeat=3)))
+
+    rng = random.Random(1)
+    lookups = [rng.choice(addresses) for _ in range(1000)]
+    results.append(_result('chain.get_balance', dict(params, lookups=len(lookups)),
+                           measure(lambda: [chain.get_balance(a) for a in lookups])))
+
+    path = os.path.join(workdir, f"chain_{tx_count}.json")
+    save_stats = measure(lambda: chain.save_to_file(path), repeat=3)
+    save_stats['file_bytes'] = os.path.getsize(path)
+    results.append(_result('chain.save_to_file', params, save_stats))
+
+    loader = Blockchain(difficulty=1)
+    load_stats = measure(lambda: loader.load_from_file(path), repeat=3)
+    if len(loader.chain) != len(chain.chain):
+        raise RuntimeError(f"load_from_file trả về chuỗi sai kích thước cho {tx_count} giao dịch.")
+    results.append(_result('chain.load_from_file', params, load_stats))
+    os.remove(path)
+
+
+def _result(name, params, stats):
+    return {'name': name, 'params': params, 'stats': stats}
+
+
+def _key(result):
+    return result['name'], json.dumps(result['params'], sort_keys=True)
+
+
+def compare(current, baseline, threshold):
+    """
+    So sánh với lần chạy trước theo min_s (ít nhiễu nhất; dùng mean_s nếu không có).
+    ratio > 1 + threshold được đánh dấu là chậm đi.
+    """
+    previous = {_key(r): r for r in baseline.get('results', [])}
+    rows = []
+    for result in current['results']:
+        before = previous.get(_key(result))
+        if before is None:
+            continue
+        metric = 'min_s' if 'min_s' in result['stats'] and 'min_s' in before['stats'] else 'mean_s'
+        ratio = result['stats'][metric] / before['stats'][metric] if before['stats'][metric] else None
+        rows.append({
+            'name': result['name'],
+            'params': result['params'],
+            'baseline_s': before['stats'][metric],
+            'current_s': result['stats'][metric],
+            'ratio': ratio,
+            'regression': ratio is not None and ratio > 1 + threshold,
+        })
+    return rows
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, difficulties, txs_per_block, skip=()):
+    logging.disable(logging.CRITICAL)
+    workdir = tempfile.mkdtemp(prefix="ct099_bench_core_")
+    results = []
+    try:
+        if 'block' not in skip:
+            bench_block(results, difficulties, txs_per_block)
+        if 'transaction' not in skip:
+            bench_transaction(results)
+        if 'wallet' not in skip:
+            bench_wallet(results)
+        if 'chain' not in skip:
+            for size in sizes:
+                bench_chain(results, size, txs_per_block, workdir)
+    finally:
+        logging.disable(logging.NOTSET)
+        os.rmdir(workdir)
+    return {
+        'meta': {
+            'timestamp': time.time(),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sizes': sizes,
+            'difficulties': difficulties,
+            'txs_per_block': txs_per_block,
+        },
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='Các kích thước chuỗi (số giao dịch)')
+    parser.add_argument('--difficulties', default='1,2,3,4', help='Các độ khó cho block.mine_block')
+    parser.add_argument('--txs-per-block', type=int, default=100)
+    parser.add_argument('--skip', default='', help='Bỏ qua nhóm: block,transaction,wallet,chain')
+    parser.add_argument('--output', help='Ghi kết quả JSON vào file thay vì stdout')
+    parser.add_argument('--compare', help='File JSON của lần chạy trước để so sánh')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Ngưỡng chậm đi (0.10 = 10%%)')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    difficulties = [int(d) for d in args.difficulties.split(',') if d]
+    results = run(sizes, difficulties, args.txs_per_block, skip=set(filter(None, args.skip.split(','))))
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as f:
+            results['comparison'] = compare(results, json.load(f), args.threshold)
+        exit_code = 1 if any(row['regression'] for row in results['comparison']) else 0
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+Benchmark các truy vấn của backend trên bảng transaction_detail (SQLite) ở quy mô lớn.
+
+    python -m benchmarks.bench_db --rows 1000000 --output db.json
+    python -m benchmarks.bench_db --rows 1000000 --compare db.json
+
+Bảng được sinh một lần (người gửi/nhận theo Zipf, trạng thái chủ yếu 'confirmed'), mỗi truy vấn được đo
+hai lần: trước khi có index (chỉ có khoá chính) và sau khi tạo các index của model TransactionDetail.
+Các phép đo:
+    history.latest          50 giao dịch mới nhất của một user (gửi hoặc nhận), dạng OR và dạng UNION
+    history.next_page       trang tiếp theo theo (created_at, id) (keyset)
+    transfer.in_flight      tổng tiền đang chờ của người gửi (kiểm tra số dư khi chuyển tiền)
+    status.by_id            trạng thái một giao dịch theo id
+    confirmer.has_pending   có giao dịch 'blockchain_pending' hay không
+    confirmer.expired       giao dịch chờ quá hạn
+    confirmer.confirm_batch cập nhật 500 giao dịch theo blockchain_tx_id (rollback sau mỗi lần đo)
+    write.commit            ghi từng giao dịch một (mỗi lần một commit) với PRAGMA mặc định và PRAGMA của backend
+Kết quả kèm EXPLAIN QUERY PLAN của từng truy vấn.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, create_engine, func, or_, select, text, tuple_, union, update
+
+from backend.db.database import configure_sqlite, sqlite_pragmas
+from backend.models.transasaction_detail import TransactionDetail
+from benchmarks.bench_core import _git_revision, _result, compare, measure
+from benchmarks.chain_generator import ZipfPicker
+
+PENDING = 'blockchain_pending'
+IN_FLIGHT_STATUSES = ('db_pending', PENDING)
+PAGE_SIZE = 50
+INSERT_CHUNK = 50000
+
+table = TransactionDetail.__table__
+
+
+def create_db_engine(path, tuned=True):
+    engine = create_engine(f"sqlite:///{path}")
+    if tuned:
+        configure_sqlite(engine, sqlite_pragmas())
+    return engine
+
+
+def populate(engine, rows, users, zipf=1.1, pending_ratio=0.005, seed=0):
+    """
+    Sinh `rows` giao dịch giữa `users` user; created_at tăng theo id như khi ghi thật.
+    Trả về danh sách username theo thứ hạng hoạt động (phần tử đầu là user nhiều giao dịch nhất).
+    """
+    rng = random.Random(seed)
+    picker = ZipfPicker(users, zipf, rng)
+    usernames = [f"user{i:06d}" for i in range(users)]
+    started_at = datetime(2025, 1, 1)
+    with engine.begin() as connection:
+        for start in range(0, rows, INSERT_CHUNK):
+            batch = []
+            for i in range(start, min(rows, start + INSERT_CHUNK)):
+                sender, receiver = picker.pick(), picker.pick()
+                if receiver == sender:
+                    receiver = (receiver + 1) % users
+                draw = rng.random()
+                status = PENDING if draw < pending_ratio else 'failed' if draw < 2 * pending_ratio else 'confirmed'
+                batch.append({
+                    'blockchain_tx_id': f"{rng.getrandbits(128):032x}",
+                    'sender_username': usernames[sender],
+                    'receiver_username': usernames[receiver],
+                    'amount': round(rng.uniform(1, 50), 2),
+                    'description': f"Chuyển tiền cho {usernames[receiver]}",
+                    'status': status,
+                    'created_at': started_at + timedelta(seconds=i),
+                })
+            connection.execute(table.insert(), batch)
+    return usernames
+
+
+def build_queries(connection, usernames):
+    """Các truy vấn cần đo: (tên, tham số, câu lệnh, có phải lệnh ghi không)"""
+    heavy, typical = usernames[0], usernames[len(usernames) // 2]
+    max_id = connection.execute(select(func.max(table.c.id))).scalar()
+    pending_ids = [row[0] for row in connection.execute(
+        select(table.c.blockchain_tx_id).where(table.c.status == PENDING).limit(500))]
+    cutoff = connection.execute(select(func.max(table.c.created_at))).scalar()
+
+    # Cùng dạng truy vấn với GET /transaction/history: keyset (created_at, id), mới nhất trước
+    def history_or(username, after=None):
+        query = select(table).where(or_(table.c.sender_username == username, table.c.receiver_username == username))
+        if after is not None:
+            query = query.where(tuple_(table.c.created_at, table.c.id) < tuple_(*after))
+        return query.order_by(table.c.created_at.desc(), table.c.id.desc()).limit(PAGE_SIZE)
+
+    def history_union(username, after=None):
+        # Mỗi nhánh đọc tối đa PAGE_SIZE dòng theo thứ tự của index rồi gộp lại
+        branches = []
+        for column in (table.c.sender_username, table.c.receiver_username):
+            query = select(table).where(column == username)
+            if after is not None:
+                query = query.where(tuple_(table.c.created_at, table.c.id) < tuple_(*after))
+            branches.append(select(query.order_by(table.c.created_at.desc(), table.c.id.desc())
+                                   .limit(PAGE_SIZE).subquery()))
+        merged = union(*branches).subquery()
+        return select(merged).order_by(merged.c.created_at.desc(), merged.c.id.desc()).limit(PAGE_SIZE)
+
+    queries = []
+    for label, username in (('heavy', heavy), ('typical', typical)):
+        for form, history in (('or', history_or), ('union', history_union)):
+            params = {'user': label, 'form': form}
+            queries.append(('history.latest', params, history(username), False))
+            first_page = connection.execute(history(username)).all()
+            if first_page:
+                last = first_page[-1]
+                queries.append(('history.next_page', params, history(username, (last.created_at, last.id)), False))
+        queries.append(('transfer.in_flight', {'user': label},
+                        select(func.coalesce(func.sum(table.c.amount), 0.0)).where(
+                            table.c.sender_username == username, table.c.status.in_(IN_FLIGHT_STATUSES)), False))
+    queries.append(('status.by_id', {}, select(table).where(table.c.id == max_id // 2), False))
+    queries.append(('confirmer.has_pending', {}, select(select(table.c.id).where(table.c.status == PENDING).exists()),
+                    False))
+    queries.append(('confirmer.expired', {}, select(table.c.blockchain_tx_id).where(
+        and_(table.c.status == PENDING, table.c.created_at < cutoff)), False))
+    queries.append(('confirmer.confirm_batch', {'batch': len(pending_ids)}, update(table).where(
+        table.c.blockchain_tx_id.in_(pending_ids), table.c.status == PENDING).values(status='confirmed'), True))
+    return queries
+
+
+def query_plan(connection, statement):
+    compiled = statement.compile(connection, compile_kwargs={'literal_binds': True})
+    return [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}")]
+
+
+def bench_queries(results, engine, usernames, params, max_time):
+    with engine.connect() as connection:
+        for name, extra, statement, is_write in build_queries(connection, usernames):
+            if is_write:
+                def run(statement=statement):
+                    connection.execute(statement)
+                    connection.rollback()
+            else:
+                def run(statement=statement):
+                    connection.execute(statement).all()
+            result = _result(name, dict(params, **extra), measure(run, max_time=max_time))
+            result['plan'] = query_plan(connection, statement)
+            results.append(result)
+        connection.rollback()
+
+
+def create_indexes(engine):
+    """Tạo các index khai báo trên model (như migration) và cập nhật thống kê; trả về thời gian (giây)"""
+    started = time.perf_counter()
+    for index in table.indexes:
+        index.create(engine, checkfirst=True)
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE transaction_detail"))
+    return time.perf_counter() - started
+
+
+def bench_commits(results, workdir, commits):
+    """Ghi từng giao dịch với một commit riêng như route /transaction/transfer"""
+    for tuned in (False, True):
+        path = os.path.join(workdir, f"commits_{int(tuned)}.db")
+        engine = create_db_engine(path, tuned=tuned)
+        table.create(engine)
+        row = {'sender_username': 'user000001', 'receiver_username': 'user000002', 'amount': 1.0,
+               'status': 'db_pending', 'created_at': datetime(2025, 1, 1)}
+
+        def run():
+            for _ in range(commits):
+                with engine.begin() as connection:
+                    connection.execute(table.insert(), row)
+
+        stats = measure(run, repeat=3, min_time=0)
+        stats['per_commit_s'] = stats['min_s'] / commits
+        results.append(_result('write.commit', {'pragmas': 'backend' if tuned else 'default', 'commits': commits},
+                               stats))
+        engine.dispose()
+
+
+def run(rows, users, zipf, commits, max_time):
+    logging.disable(logging.CRITICAL)
+    workdir = tempfile.mkdtemp(prefix="ct099_bench_db_")
+    results = []
+    try:
+        engine = create_db_engine(os.path.join(workdir, "bank.db"))
+        table.create(engine)
+        # Bắt đầu không có index (chỉ khoá chính) để so sánh với sau khi chạy migration
+        for index in table.indexes:
+            index.drop(engine)
+        started = time.perf_counter()
+        usernames = populate(engine, rows, users, zipf)
+        populate_s = time.perf_counter() - started
+
+        bench_queries(results, engine, usernames, {'rows': rows, 'indexes': False}, max_time)
+        index_s = create_indexes(engine)
+        bench_queries(results, engine, usernames, {'rows': rows, 'indexes': True}, max_time)
+        engine.dispose()
+        bench_commits(results, workdir, commits)
+    finally:
+        logging.disable(logging.NOTSET)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        'meta': {
+            'timestamp': time.time(),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'rows': rows,
+            'users': users,
+            'zipf': zipf,
+            'populate_s': populate_s,
+            'create_indexes_s': index_s,
+        },
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000, help='Số dòng transaction_detail')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--zipf', type=float, default=1.1, help='Số mũ Zipf cho mức độ hoạt động (0 = đều)')
+    parser.add_argument('--commits', type=int, default=200, help='Số commit trong phép đo write.commit')
+    parser.add_argument('--max-time', type=float, default=10.0, help='Thời gian đo tối đa của mỗi truy vấn (giây)')
+    parser.add_argument('--output', help='Ghi kết quả JSON vào file thay vì stdout')
+    parser.add_argument('--compare', help='File JSON của lần chạy trước để so sánh')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Ngưỡng chậm đi (0.10 = 10%%)')
+    args = parser.parse_args()
+
+    results = run(args.rows, args.users, args.zipf, args.commits, args.max_time)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as f:
+            results['comparison'] = compare(results, json.load(f), args.threshold)
+        exit_code = 1 if any(row['regression'] for row in results['comparison']) else 0
+
+    output = json.dumps(results, indent=2, default=str)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Benchmark độ trễ request của node với các cấu hình logging khác nhau.
+
+    python -m benchmarks.bench_logging --blocks 200 --requests 500
+
+Các chế độ:
+    off           logging bị tắt hoàn toàn (logging.disable)
+    sync          FileHandler + StreamHandler ghi đồng bộ trong luồng request (cấu hình cũ)
+    queue         QueueHandler/QueueListener + RotatingFileHandler, log theo request được lấy mẫu
+    queue_full    như queue nhưng không lấy mẫu (LOG_SAMPLE_EVERY=1)
+Kết quả in ra dạng JSON.
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+
+def build_chain_file(path, blocks, txs_per_block):
+    from blockchain_core.blockchain import Blockchain
+    from blockchain_core.transaction import Transaction
+
+    chain = Blockchain(difficulty=1, initial_funder_address="BENCH_FUNDER", initial_fund_amount=10 ** 9)
+    for b in range(blocks):
+        for t in range(txs_per_block):
+            chain.add_transaction_to_pool(Transaction("BENCH_FUNDER", f"addr_{t}", 1.0, "DUMMY_SIGNATURE"))
+        chain.mine_pending_transactions("BENCH_MINER")
+    chain.save_to_file(path)
+
+
+def _summary(samples):
+    ordered = sorted(samples)
+    return {
+        'mean_ms': round(statistics.mean(ordered) * 1000, 3),
+        'p50_ms': round(ordered[len(ordered) // 2] * 1000, 3),
+        'p99_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 3),
+    }
+
+
+def _configure(mode, log_file, node, blockchain_module):
+    from blockchain_core.log_config import setup_logging, shutdown_logging
+
+    shutdown_logging()
+    logging.disable(logging.NOTSET)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+    devnull = open(os.devnull, 'w')
+    every = 1 if mode in ('sync', 'queue_full') else 100
+    node.request_log_sampler.every = every
+    blockchain_module.pool_log_sampler.every = every
+
+    if mode == 'off':
+        logging.disable(logging.CRITICAL)
+    elif mode == 'sync':
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        for handler in (logging.FileHandler(log_file, encoding='utf-8'), logging.StreamHandler(devnull)):
+            handler.setFormatter(formatter)
+            root.addHandler(handler)
+        root.setLevel(logging.INFO)
+    else:
+        with contextlib.redirect_stderr(devnull):
+            setup_logging(log_file, level='INFO')
+
+
+def run(blocks, txs_per_block, requests_per_mode, modes):
+    workdir = tempfile.mkdtemp(prefix="ct099_bench_logging_")
+    chain_file = os.path.join(workdir, "chain.json")
+    build_chain_file(chain_file, blocks, txs_per_block)
+
+    os.environ['NODE_BLOCKCHAIN_FILE'] = chain_file
+    os.environ['NODE_LOG_FILE'] = os.path.join(workdir, "node.log")
+    os.chdir(workdir)
+    with contextlib.redirect_stderr(open(os.devnull, 'w')):
+        from blockchain_node import node
+    import blockchain_core.blockchain as blockchain_module
+
+    client = node.app.test_client()
+    results = {'blocks': blocks, 'txs_per_block': txs_per_block, 'requests': requests_per_mode, 'modes': {}}
+    for mode in modes:
+        _configure(mode, os.path.join(workdir, f"{mode}.log"), node, blockchain_module)
+        timings = {'balance': [], 'transactions_new': []}
+        for i in range(requests_per_mode):
+            start = time.perf_counter()
+            client.get(f"/balance/addr_{i % txs_per_block}")
+            timings['balance'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            client.post('/transactions/new', json={'sender': "BENCH_FUNDER", 'receiver': f"addr_{i}",
+                                                   'amount': 1.0, 'signature': "DUMMY_SIGNATURE"})
+            timings['transactions_new'].append(time.perf_counter() - start)
+            node.my_node_blockchain.pending_transactions.clear()
+        results['modes'][mode] = {route: _summary(samples) for route, samples in timings.items()}
+
+    logging.disable(logging.NOTSET)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--blocks', type=int, default=100)
+    parser.add_argument('--txs-per-block', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--modes', default='off,sync,queue,queue_full')
+    parser.add_argument('--output', help='Ghi kết quả JSON vào file thay vì stdout')
+    args = parser.parse_args()
+
+    results = run(args.blocks, args.txs_per_block, args.requests, args.modes.split(','))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
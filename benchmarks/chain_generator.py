@@ -0,0 +1,234 @@
+"""
+Sinh chuỗi blockchain tổng hợp (hợp lệ) với kích thước tùy ý để benchmark, không cần đào ở độ khó của node.
+
+    python -m benchmarks.chain_generator --transactions 100000 --addresses 1000 --out-dir /tmp/ct099_data
+    python -m benchmarks.chain_generator --transactions 1000000 --addresses 10000 --zipf 1.2 \\
+        --out-dir /tmp/ct099_data --db /tmp/ct099_data/bank.db --workload 5000
+
+Đầu ra trong --out-dir:
+    node_blockchain.json   chuỗi theo định dạng của Blockchain.save_to_file (JSON là định dạng lưu trữ duy nhất)
+    users.json             username / public key / private key của từng ví, khớp với địa chỉ trên chuỗi
+    workload.json          (tuỳ chọn --workload) danh sách lệnh chuyển tiền theo cùng phân phối Zipf
+Tuỳ chọn --db ghi các user tương ứng vào bảng `user` của SQLite backend (tạo bảng nếu chưa có).
+"""
+import argparse
+import base64
+import bisect
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+
+from ecdsa import SECP256k1, SigningKey
+
+from blockchain_core.block import Block
+from blockchain_core.blockchain import Blockchain
+from blockchain_core.transaction import Transaction
+from blockchain_core.wallet import Wallet
+
+generator_logger = logging.getLogger(__name__)
+
+INITIAL_FUND_SENDER = "SYSTEM_INITIAL_FUND"
+DEFAULT_PASSWORD = "password123"
+
+
+def generate_wallets(count, rng):
+    """Tạo `count` ví có thể tái lập từ rng (private key suy ra từ số ngẫu nhiên, không dùng os.urandom)"""
+    wallets = []
+    for _ in range(count):
+        secret = SigningKey.from_secret_exponent(rng.randrange(1, SECP256k1.order), curve=SECP256k1)
+        wallets.append(Wallet(base64.b64encode(secret.to_string()).decode()))
+    return wallets
+
+
+class ZipfPicker:
+    """Chọn chỉ số 0..n-1 với xác suất tỉ lệ 1/(rank+1)^s (s=0 là phân phối đều)"""
+
+    def __init__(self, n, s, rng):
+        self.rng = rng
+        self.cum_weights = list(itertools.accumulate(1.0 / (rank + 1) ** s for rank in range(n)))
+        self.total = self.cum_weights[-1]
+
+    def pick(self):
+        return bisect.bisect(self.cum_weights, self.rng.random() * self.total)
+
+
+def generate_chain(transaction_count, wallets, txs_per_block=100, zipf=1.1, difficulty=1, seed=0,
+                   initial_balance=1000.0, block_interval=10.0, start_time=None, sign=False):
+    """
+    Sinh chuỗi có `transaction_count` giao dịch chuyển tiền giữa các ví.
+    Block đầu tiên sau Genesis cấp `initial_balance` cho mỗi ví (SYSTEM_INITIAL_FUND); sau đó người gửi
+    và người nhận được chọn theo Zipf, số tiền không vượt quá số dư hiện có nên mọi số dư luôn không âm.
+
+    Returns:
+        Blockchain: chuỗi đã kiểm tra bằng Blockchain.add_block
+    """
+    rng = random.Random(seed)
+    picker = ZipfPicker(len(wallets), zipf, rng)
+    addresses = [wallet.get_public_key() for wallet in wallets]
+    balances = [float(initial_balance)] * len(wallets)
+
+    chain = Blockchain(difficulty=difficulty, initial_funder_address=INITIAL_FUND_SENDER, initial_fund_amount=0)
+    clock = start_time if start_time is not None else chain.get_last_block().timestamp
+
+    def append_block(transactions, miner_index):
+        nonlocal clock
+        clock += block_interval
+        reward = Transaction(sender="MINING_REWARD", recipient=addresses[miner_index], amount=10,
+                             signature="MINING_REWARD_SIGNATURE", transaction_type="MINING_REWARD",
+                             timestamp=clock)
+        last = chain.get_last_block()
+        block = Block(last.index + 1, clock, [reward] + transactions, last.hash, difficulty)
+        block.hash = block.mine_block()
+        if not chain.add_block(block):
+            raise RuntimeError(f"Block tổng hợp #{block.index} không hợp lệ.")
+        balances[miner_index] += 10
+
+    for start in range(0, len(wallets), txs_per_block):
+        append_block([Transaction(INITIAL_FUND_SENDER, address, float(initial_balance), signature="DUMMY_SIGNATURE",
+                                  timestamp=clock)
+                      for address in addresses[start:start + txs_per_block]], picker.pick())
+
+    produced = 0
+    while produced < transaction_count:
+        transactions = []
+        for _ in range(min(txs_per_block, transaction_count - produced)):
+            sender = picker.pick()
+            while balances[sender] < 1:
+                # Ví gần hết tiền: chọn lại người gửi (tổng tiền luôn dương nên vòng lặp sẽ dừng)
+                sender = picker.pick()
+            receiver = picker.pick()
+            if receiver == sender:
+                receiver = (receiver + 1) % len(wallets)
+            amount = min(round(rng.uniform(1, 50), 2), math.floor(balances[sender] * 100) / 100)
+            balances[sender] -= amount
+            balances[receiver] += amount
+            tx = Transaction(addresses[sender], addresses[receiver], amount, signature="DUMMY_SIGNATURE",
+                             timestamp=clock + rng.random() * block_interval)
+            if sign:
+                tx.sign_transaction(wallets[sender])
+            transactions.append(tx)
+        produced += len(transactions)
+        append_block(transactions, picker.pick())
+        if len(chain.chain) % 1000 == 0:
+            generator_logger.info(f"Đã sinh {produced}/{transaction_count} giao dịch ({len(chain.chain)} block).")
+    return chain
+
+
+def generate_workload(count, users, zipf=1.1, seed=1, max_amount=20.0):
+    """Danh sách lệnh chuyển tiền (theo username) với người gửi/nhận chọn theo Zipf"""
+    rng = random.Random(seed)
+    picker = ZipfPicker(len(users), zipf, rng)
+    workload = []
+    for _ in range(count):
+        sender, receiver = picker.pick(), picker.pick()
+        if receiver == sender:
+            receiver = (receiver + 1) % len(users)
+        workload.append({
+            'sender': users[sender]['username'],
+            'receiver': users[receiver]['username'],
+            'receiver_id': users[receiver]['id'],
+            'amount': round(rng.uniform(1, max_amount), 2),
+        })
+    return workload
+
+
+def build_user_rows(wallets, prefix="user"):
+    return [{
+        'id': i + 1,
+        'username': f"{prefix}{i:06d}",
+        'blockchain_public_key': wallet.get_public_key(),
+        'private_key': wallet.get_private_key(),
+    } for i, wallet in enumerate(wallets)]
+
+
+def write_users_db(db_path, users, password=DEFAULT_PASSWORD):
+    """
+    Ghi user vào bảng `user` của SQLite backend (dùng chính model User để khớp schema).
+    Mọi user dùng chung một mật khẩu; hash được tính một lần vì hash mật khẩu rất chậm.
+    Cập nhật lại 'id' của từng user theo id thật trong DB.
+    """
+    from sqlalchemy import create_engine, select
+    from werkzeug.security import generate_password_hash
+
+    from backend.models.user import User
+
+    engine = create_engine(f"sqlite:///{os.path.abspath(db_path)}")
+    User.__table__.create(engine, checkfirst=True)
+    password_hash = generate_password_hash(password)
+    rows = [{
+        'username': user['username'],
+        'password_hash': password_hash,
+        'blockchain_public_key': user['blockchain_public_key'],
+        'blockchain_private_key_encrypted': base64.b64encode(user['private_key'].encode()).decode(),
+        'credit_card_balance': 0,
+        'daily_credit_count': 0,
+    } for user in users]
+    with engine.begin() as connection:
+        for start in range(0, len(rows), 10000):
+            connection.execute(User.__table__.insert(), rows[start:start + 10000])
+        ids = dict(connection.execute(select(User.__table__.c.username, User.__table__.c.id)).all())
+    engine.dispose()
+    for user in users:
+        user['id'] = ids[user['username']]
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--transactions', type=int, default=10000, help='Số giao dịch chuyển tiền')
+    parser.add_argument('--addresses', type=int, default=1000, help='Số ví / user')
+    parser.add_argument('--txs-per-block', type=int, default=100)
+    parser.add_argument('--zipf', type=float, default=1.1, help='Số mũ Zipf cho mức độ hoạt động (0 = đều)')
+    parser.add_argument('--difficulty', type=int, default=1)
+    parser.add_argument('--initial-balance', type=float, default=1000.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sign', action='store_true', help='Ký thật từng giao dịch (chậm)')
+    parser.add_argument('--out-dir', required=True)
+    parser.add_argument('--db', help='File SQLite của backend để ghi user')
+    parser.add_argument('--password', default=DEFAULT_PASSWORD, help='Mật khẩu chung của các user sinh ra')
+    parser.add_argument('--workload', type=int, default=0, help='Số lệnh chuyển tiền ghi ra workload.json')
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    wallets = generate_wallets(args.addresses, rng)
+    generator_logger.info(f"Đã tạo {len(wallets)} ví trong {time.perf_counter() - started:.1f}s.")
+
+    # Log theo từng block của blockchain_core quá nhiều khi sinh chuỗi lớn
+    logging.getLogger('blockchain_core').setLevel(logging.WARNING)
+    chain = generate_chain(args.transactions, wallets, txs_per_block=args.txs_per_block, zipf=args.zipf,
+                           difficulty=args.difficulty, seed=args.seed, initial_balance=args.initial_balance,
+                           sign=args.sign)
+    chain_file = os.path.join(args.out_dir, "node_blockchain.json")
+    if not chain.save_to_file(chain_file):
+        return 1
+
+    users = build_user_rows(wallets)
+    if args.db:
+        write_users_db(args.db, users, args.password)
+    with open(os.path.join(args.out_dir, "users.json"), 'w') as f:
+        json.dump({'password': args.password, 'users': users}, f)
+    if args.workload:
+        with open(os.path.join(args.out_dir, "workload.json"), 'w') as f:
+            json.dump(generate_workload(args.workload, users, args.zipf, seed=args.seed + 1), f)
+
+    print(json.dumps({
+        'chain_file': chain_file,
+        'blocks': len(chain.chain),
+        'transactions': sum(len(block.transactions) for block in chain.chain),
+        'addresses': len(wallets),
+        'chain_bytes': os.path.getsize(chain_file),
+        'db': args.db,
+        'seconds': round(time.perf_counter() - started, 2),
+    }, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,346 @@
+"""
+Load test end-to-end cho backend (backend.app) và node (blockchain_node.node) chạy trên máy local.
+
+    # Tự khởi động node + backend trong thư mục tạm rồi chạy tải
+    python -m benchmarks.load_test --spawn --users 50 --concurrency 16 --duration 30
+
+    # Chạy với backend / node đang chạy sẵn
+    python -m benchmarks.load_test --backend http://127.0.0.1:8000 --node http://127.0.0.1:5000 \\
+        --mix transfer=2,wallet_info=6,login=1,contract=1
+
+Các bước:
+    1. Đăng ký --users user qua POST /auth/register, đăng nhập từng user (mỗi user một session cookie).
+    2. Cấp tiền cho ví của từng user trên node (SYSTEM_INITIAL_FUND) rồi đào một block.
+    3. Chạy --concurrency luồng trong --duration giây, mỗi lượt chọn một thao tác theo --mix:
+       transfer     POST /transaction/transfer
+       wallet_info  GET  /wallet/info
+       login        POST /auth/login
+       contract     POST /smart_contract/deploy rồi POST /smart_contract/execute
+Kết quả (JSON): throughput, p50/p99, tỉ lệ lỗi và mã trạng thái theo từng endpoint.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = 'transfer=2,wallet_info=6,login=1,contract=1'
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+class Recorder:
+    """Ghi nhận độ trễ / mã trạng thái theo endpoint (an toàn giữa các luồng)"""
+
+    def __init__(self):
+        self._latencies = defaultdict(list)
+        self._statuses = defaultdict(Counter)
+        self._errors = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, latency, status, ok):
+        with self._lock:
+            self._latencies[endpoint].append(latency)
+            self._statuses[endpoint][str(status)] += 1
+            if not ok:
+                self._errors[endpoint] += 1
+
+    def call(self, endpoint, send, expected=(200, 201, 202)):
+        """Gửi request qua hàm send(), ghi nhận kết quả; trả về response (None nếu lỗi kết nối)"""
+        start = time.perf_counter()
+        try:
+            response = send()
+        except requests.exceptions.RequestException as e:
+            self.record(endpoint, time.perf_counter() - start, type(e).__name__, False)
+            return None
+        self.record(endpoint, time.perf_counter() - start, response.status_code, response.status_code in expected)
+        return response
+
+    def summary(self, duration):
+        with self._lock:
+            report = {}
+            for endpoint, latencies in sorted(self._latencies.items()):
+                ordered = sorted(latencies)
+                report[endpoint] = {
+                    'requests': len(ordered),
+                    'throughput_rps': round(len(ordered) / duration, 2) if duration else None,
+                    'p50_ms': round(_percentile(ordered, 50) * 1000, 2),
+                    'p99_ms': round(_percentile(ordered, 99) * 1000, 2),
+                    'max_ms': round(ordered[-1] * 1000, 2),
+                    'errors': self._errors[endpoint],
+                    'error_rate': round(self._errors[endpoint] / float(len(ordered)), 4),
+                    'statuses': dict(self._statuses[endpoint]),
+                }
+            return report
+
+
+class LocalStack:
+    """Khởi động một node và một backend trong thư mục tạm (không cần dịch vụ ngoài)"""
+
+    def __init__(self, node_port=5400, backend_port=8400, workdir=None, extra_env=None):
+        self.node_url = f"http://127.0.0.1:{node_port}"
+        self.backend_url = f"http://127.0.0.1:{backend_port}"
+        self.node_port = node_port
+        self.backend_port = backend_port
+        self.workdir = workdir or tempfile.mkdtemp(prefix="ct099_load_")
+        self.extra_env = extra_env or {}
+        self.processes = []
+
+    def _spawn(self, name, args, env):
+        full_env = dict(os.environ)
+        full_env.update(self.extra_env)
+        full_env.update(env)
+        full_env['PYTHONPATH'] = REPO_ROOT + os.pathsep + full_env.get('PYTHONPATH', '')
+        stdout = open(os.path.join(self.workdir, f"{name}.stdout.log"), "ab")
+        self.processes.append(subprocess.Popen([sys.executable] + args, cwd=self.workdir, env=full_env,
+                                               stdout=stdout, stderr=subprocess.STDOUT,
+                                               start_new_session=True))
+
+    def start(self, timeout=30):
+        self._spawn("node", ["-m", "blockchain_node.node", "--port", str(self.node_port)], {
+            'NODE_BLOCKCHAIN_FILE': os.path.join(self.workdir, "node_blockchain.json"),
+            'NODE_LOG_FILE': os.path.join(self.workdir, "node.log"),
+        })
+        self._spawn("backend", ["-c", "from backend.app import app; app.run(port=%d, threaded=True)"
+                                % self.backend_port], {
+            'BLOCKCHAIN_NODE_URL': self.node_url,
+            'DATABASE_FILENAME': os.path.join(self.workdir, "bank.db"),
+            'BACKEND_LOG_FILE': os.path.join(self.workdir, "backend.log"),
+        })
+        deadline = time.time() + timeout
+        for url in (f"{self.node_url}/chain", f"{self.backend_url}/"):
+            while True:
+                try:
+                    requests.get(url, timeout=1)
+                    break
+                except requests.exceptions.RequestException:
+                    if time.time() > deadline:
+                        self.stop()
+                        raise RuntimeError(f"{url} không khởi động kịp trong {timeout}s.")
+                    time.sleep(0.2)
+        return self
+
+    def stop(self):
+        # Dừng cả nhóm tiến trình: gồm các tiến trình con của pool tác vụ CPU trong backend
+        for process in self.processes:
+            os.killpg(process.pid, signal.SIGTERM)
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+        self.processes = []
+
+
+class VirtualUser:
+    def __init__(self, username, password):
+        self.username = username
+        self.password = password
+        self.session = requests.Session()
+        self.user_id = None
+        self.public_key = None
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        weights[name.strip()] = float(weight or 1)
+    unknown = set(weights) - set(OPERATIONS)
+    if unknown:
+        raise ValueError(f"Thao tác không hỗ trợ trong --mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+class LoadTest:
+    def __init__(self, backend_url, node_url, users=20, password="password123", fund_amount=10000.0,
+                 timeout=30, seed=0):
+        self.backend_url = backend_url.rstrip('/')
+        self.node_url = node_url.rstrip('/')
+        self.password = password
+        self.fund_amount = fund_amount
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        run_id = uuid.uuid4().hex[:6]
+        self.users = [VirtualUser(f"load_{run_id}_{i:05d}", password) for i in range(users)]
+        self.recorder = Recorder()
+
+    # --- Chuẩn bị ---
+    def _register_and_login(self, user):
+        self.recorder.call('POST /auth/register', lambda: user.session.post(
+            f"{self.backend_url}/auth/register", json={'username': user.username, 'password': user.password},
+            timeout=self.timeout))
+        response = self._login(user)
+        if response is None or response.status_code != 200:
+            return False
+        user.user_id = response.json().get('user_id')
+        info = user.session.get(f"{self.backend_url}/wallet/debug-user", timeout=self.timeout)
+        user.public_key = info.json().get('blockchain_public_key') if info.ok else None
+        return user.public_key is not None
+
+    def _login(self, user):
+        return self.recorder.call('POST /auth/login', lambda: user.session.post(
+            f"{self.backend_url}/auth/login", json={'username': user.username, 'password': user.password},
+            timeout=self.timeout))
+
+    def setup(self, workers=8):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            ready = list(executor.map(self._register_and_login, self.users))
+        self.users = [user for user, ok in zip(self.users, ready) if ok]
+        if len(self.users) < 2:
+            raise RuntimeError("Cần ít nhất 2 user đăng ký/đăng nhập thành công để chạy tải.")
+
+        for user in self.users:
+            requests.post(f"{self.node_url}/transactions/new", timeout=self.timeout, json={
+                'sender': "SYSTEM_INITIAL_FUND", 'receiver': user.public_key,
+                'amount': self.fund_amount, 'signature': "DUMMY_SIGNATURE"}).raise_for_status()
+        requests.get(f"{self.node_url}/mine", timeout=120).raise_for_status()
+        return {'users_ready': len(self.users), 'setup_seconds': round(time.perf_counter() - started, 2)}
+
+    # --- Các thao tác ---
+    def _pick_other(self, rng, user):
+        other = rng.choice(self.users)
+        while other is user:
+            other = rng.choice(self.users)
+        return other
+
+    def op_transfer(self, rng, user):
+        recipient = self._pick_other(rng, user)
+        self.recorder.call('POST /transaction/transfer', lambda: user.session.post(
+            f"{self.backend_url}/transaction/transfer", timeout=self.timeout,
+            json={'recipient_id': recipient.user_id, 'amount': round(rng.uniform(1, 10), 2)}))
+
+    def op_wallet_info(self, rng, user):
+        self.recorder.call('GET /wallet/info', lambda: user.session.get(
+            f"{self.backend_url}/wallet/info", timeout=self.timeout))
+
+    def op_login(self, rng, user):
+        self._login(user)
+
+    def op_contract(self, rng, user):
+        recipient = self._pick_other(rng, user)
+        response = self.recorder.call('POST /smart_contract/deploy', lambda: user.session.post(
+            f"{self.backend_url}/smart_contract/deploy", timeout=self.timeout, json={
+                'sender_username': user.username, 'receiver_username': recipient.username,
+                'amount': round(rng.uniform(1, 10), 2), 'deadline_seconds': 300}))
+        if response is not None and response.status_code == 201:
+            contract_id = response.json().get('contract_id')
+            self.recorder.call('POST /smart_contract/execute', lambda: user.session.post(
+                f"{self.backend_url}/smart_contract/execute", json={'contract_id': contract_id},
+                timeout=self.timeout))
+
+    # --- Chạy tải ---
+    def run(self, mix, concurrency=8, duration=30.0, max_requests=None):
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        deadline = time.perf_counter() + duration
+        issued = iter(range(max_requests)) if max_requests else None
+        issued_lock = threading.Lock()
+
+        def worker(worker_id):
+            rng = random.Random(self.rng.random() + worker_id)
+            while time.perf_counter() < deadline:
+                if issued is not None:
+                    with issued_lock:
+                        if next(issued, None) is None:
+                            return
+                operation = rng.choices(names, weights)[0]
+                OPERATIONS[operation](self, rng, rng.choice(self.users))
+
+        # Bỏ số liệu của bước chuẩn bị để chỉ báo cáo giai đoạn chạy tải
+        setup_report = self.recorder.summary(None)
+        self.recorder = Recorder()
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        endpoints = self.recorder.summary(elapsed)
+        total = sum(stats['requests'] for stats in endpoints.values())
+        errors = sum(stats['errors'] for stats in endpoints.values())
+        return {
+            'duration_s': round(elapsed, 2),
+            'concurrency': concurrency,
+            'mix': mix,
+            'total_requests': total,
+            'total_throughput_rps': round(total / elapsed, 2) if elapsed else None,
+            'total_error_rate': round(errors / float(total), 4) if total else None,
+            'endpoints': endpoints,
+            'setup_endpoints': setup_report,
+        }
+
+
+OPERATIONS = {
+    'transfer': LoadTest.op_transfer,
+    'wallet_info': LoadTest.op_wallet_info,
+    'login': LoadTest.op_login,
+    'contract': LoadTest.op_contract,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', default='http://127.0.0.1:8000', help='URL của backend')
+    parser.add_argument('--node', default='http://127.0.0.1:5000', help='URL của node')
+    parser.add_argument('--spawn', action='store_true', help='Tự khởi động node + backend trong thư mục tạm')
+    parser.add_argument('--node-port', type=int, default=5400, help='Cổng node khi --spawn')
+    parser.add_argument('--backend-port', type=int, default=8400, help='Cổng backend khi --spawn')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30.0, help='Thời gian chạy tải (giây)')
+    parser.add_argument('--requests', type=int, help='Dừng sau số thao tác này (kể cả khi chưa hết thời gian)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='Tỉ trọng thao tác, ví dụ transfer=2,wallet_info=6')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Ghi kết quả JSON vào file thay vì stdout')
+    parser.add_argument('--keep', action='store_true', help='Giữ thư mục làm việc khi --spawn')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='Biến môi trường cho node + backend khi --spawn (lặp lại được), vd. --env CPU_POOL=0')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    stack = None
+    if args.spawn:
+        extra_env = dict(item.split('=', 1) for item in args.env)
+        stack = LocalStack(args.node_port, args.backend_port, extra_env=extra_env).start()
+        args.backend, args.node = stack.backend_url, stack.node_url
+    try:
+        test = LoadTest(args.backend, args.node, users=args.users, seed=args.seed)
+        setup = test.setup()
+        report = test.run(mix, concurrency=args.concurrency, duration=args.duration, max_requests=args.requests)
+        report.update(setup)
+    finally:
+        if stack is not None:
+            stack.stop()
+            if not args.keep:
+                shutil.rmtree(stack.workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
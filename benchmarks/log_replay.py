@@ -0,0 +1,299 @@
+"""
+Chuyển node.log / backend.log thành trace có mốc thời gian và phát lại trace lên một cặp node/backend.
+
+    # 1. Tạo trace từ log
+    python -m benchmarks.log_replay parse --node-log node.log --backend-log backend.log --output trace.jsonl
+
+    # 2. Phát lại: tốc độ thật (1x), nhanh hơn N lần, hoặc nhanh nhất có thể
+    python -m benchmarks.log_replay replay trace.jsonl --spawn --speed 1
+    python -m benchmarks.log_replay replay trace.jsonl --spawn --speed 20 --max-gap 2
+    python -m benchmarks.log_replay replay trace.jsonl --backend http://127.0.0.1:8000 --node http://127.0.0.1:5000 \\
+        --speed max --concurrency 8
+
+Trace (JSON lines), mỗi dòng một request:
+    {"t": giây tính từ request đầu, "ts": "thời điểm trong log", "target": "node"|"backend",
+     "method": "GET", "path": "/mine", "status": 200, "body": {...} (nếu log có ghi)}
+
+Ghi chú:
+- Dòng truy cập của werkzeug ("GET /mine HTTP/1.1" 200) là nguồn chính; body của POST /transactions/new lấy từ
+  dòng "API: Nhận yêu cầu giao dịch mới: {...}" ngay trước đó. Dòng này được lấy mẫu (LOG_SAMPLE_EVERY), nên cần
+  chạy node với LOG_SAMPLE_EVERY=1 nếu muốn giữ mọi body; request thiếu body được phát lại với giao dịch giả.
+- backend.log không ghi body, nên khi phát lại, body được dựng từ một nhóm user phát lại (đăng nhập, chuyển tiền
+  giữa các user này...) và id user trong đường dẫn được ánh xạ sang id của user phát lại. /auth/logout được gửi
+  bằng bản sao session để các request phát lại sau đó (có thể chạy song song) vẫn giữ trạng thái đăng nhập.
+- Khi phát lại cả backend, các request /chain, /balance, /mine... mà backend gọi sang node đã có trong node.log;
+  mặc định các request node nằm trong --induced-window giây trước một request backend bị bỏ để không phát lại hai lần.
+- Log trải dài nhiều ngày với các quãng nghỉ dài; --max-gap nén mọi quãng nghỉ dài hơn ngưỡng này.
+"""
+import argparse
+import ast
+import json
+import re
+import shutil
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+from benchmarks.load_test import LocalStack, Recorder, VirtualUser
+
+LINE_RE = re.compile(r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - (\S+) - (\w+) - (.*)$')
+ANSI_RE = re.compile(r'\x1b\[[0-9;]*m')
+ACCESS_RE = re.compile(r'"([A-Z]+) (\S+) HTTP/1\.[01]" (\d{3})')
+NEW_TX_MARKER = "API: Nhận yêu cầu giao dịch mới: "
+FALLBACK_TRANSACTION = {'sender': "SYSTEM_INITIAL_FUND", 'receiver': "REPLAY_ADDRESS", 'amount': 1.0,
+                        'signature': "DUMMY_SIGNATURE"}
+ID_SEGMENT_RE = re.compile(r'/(\d+)(?=/|$)')
+
+
+def _parse_timestamp(value):
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S,%f').timestamp()
+
+
+def parse_log(path, target):
+    """Đọc một file log, trả về danh sách request (dict) theo thứ tự thời gian"""
+    events = []
+    pending_bodies = []
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            match = LINE_RE.match(line.rstrip('\n'))
+            if not match:
+                continue
+            timestamp, _, _, message = match.groups()
+            if NEW_TX_MARKER in message:
+                try:
+                    pending_bodies.append(ast.literal_eval(message.split(NEW_TX_MARKER, 1)[1]))
+                except (ValueError, SyntaxError):
+                    pass
+                continue
+            access = ACCESS_RE.search(ANSI_RE.sub('', message))
+            if not access:
+                continue
+            method, request_path, status = access.groups()
+            event = {'ts': timestamp, 'epoch': _parse_timestamp(timestamp), 'target': target,
+                     'method': method, 'path': request_path, 'status': int(status)}
+            if target == 'node' and method == 'POST' and request_path.startswith('/transactions/new'):
+                if pending_bodies:
+                    event['body'] = pending_bodies.pop(0)
+            events.append(event)
+    return events
+
+
+def build_trace(node_events, backend_events, induced_window=2.0):
+    """Gộp hai nguồn theo thời gian, bỏ các request node do backend gây ra, tính mốc t tương đối"""
+    if backend_events and node_events and induced_window > 0:
+        backend_times = sorted(event['epoch'] for event in backend_events)
+        kept = []
+        index = 0
+        for event in node_events:
+            while index < len(backend_times) and backend_times[index] < event['epoch']:
+                index += 1
+            # Request node kết thúc trước khi request backend bao quanh nó ghi dòng truy cập
+            if index < len(backend_times) and backend_times[index] - event['epoch'] <= induced_window:
+                continue
+            kept.append(event)
+        node_events = kept
+
+    events = sorted(node_events + backend_events, key=lambda event: event['epoch'])
+    if not events:
+        return []
+    start = events[0]['epoch']
+    trace = []
+    for event in events:
+        item = {'t': round(event.pop('epoch') - start, 3)}
+        item.update(event)
+        trace.append(item)
+    return trace
+
+
+def compress_gaps(trace, max_gap):
+    """Rút ngắn mọi quãng nghỉ dài hơn max_gap giây (giữ nguyên nhịp trong các đợt request)"""
+    if max_gap is None:
+        return trace
+    shift = 0.0
+    previous = None
+    compressed = []
+    for event in trace:
+        if previous is not None and event['t'] - previous > max_gap:
+            shift += event['t'] - previous - max_gap
+        previous = event['t']
+        compressed.append(dict(event, t=event['t'] - shift))
+    return compressed
+
+
+def route_template(target, path):
+    path = path.split('?', 1)[0]
+    if target == 'node' and path.startswith('/balance/'):
+        return '/balance/<address>'
+    return ID_SEGMENT_RE.sub('/<id>', path)
+
+
+class Replayer:
+    """Phát lại trace theo lịch (open-loop): mỗi request được gửi đúng mốc t / speed, không chờ request trước"""
+
+    def __init__(self, node_url, backend_url, users=2, password="password123", timeout=30):
+        self.node_url = node_url.rstrip('/')
+        self.backend_url = backend_url.rstrip('/')
+        self.password = password
+        self.timeout = timeout
+        run_id = uuid.uuid4().hex[:6]
+        self.run_id = run_id
+        self.users = [VirtualUser(f"replay_{run_id}_{i}", password) for i in range(max(2, users))]
+        self.recorder = Recorder()
+        self._lag = []
+        self._lag_lock = threading.Lock()
+        self._register_seq = iter(range(10 ** 9))
+
+    def setup(self):
+        """Đăng ký và đăng nhập các user phát lại (chỉ cần khi trace có request backend)"""
+        for user in self.users:
+            requests.post(f"{self.backend_url}/auth/register", timeout=self.timeout,
+                          json={'username': user.username, 'password': user.password})
+            response = user.session.post(f"{self.backend_url}/auth/login", timeout=self.timeout,
+                                         json={'username': user.username, 'password': user.password})
+            response.raise_for_status()
+            user.user_id = response.json().get('user_id')
+
+    def _backend_request(self, event):
+        user, other = self.users[0], self.users[1]
+        path = ID_SEGMENT_RE.sub(lambda m: '/%s' % self.users[(int(m.group(1)) - 1) % len(self.users)].user_id,
+                                 event['path'])
+        body = None
+        if event['method'] == 'POST':
+            body = {
+                '/auth/register': lambda: {'username': f"replay_{self.run_id}_new{next(self._register_seq)}",
+                                           'password': self.password},
+                '/auth/login': lambda: {'username': user.username, 'password': user.password},
+                '/wallet/lend': lambda: {'amount': 1000},
+                '/transaction/transfer': lambda: {'recipient_id': other.user_id, 'amount': 1},
+                '/smart_contract/deploy': lambda: {'sender_username': user.username,
+                                                   'receiver_username': other.username, 'amount': 1},
+            }.get(path, dict)()
+        session = user.session
+        if path == '/auth/logout':
+            session = requests.Session()
+            session.cookies.update(user.session.cookies)
+        return session.request(event['method'], self.backend_url + path, json=body, timeout=self.timeout)
+
+    def _node_request(self, event):
+        body = event.get('body')
+        if body is None and event['method'] == 'POST' and event['path'].startswith('/transactions/new'):
+            body = FALLBACK_TRANSACTION
+        return requests.request(event['method'], self.node_url + event['path'], json=body, timeout=self.timeout)
+
+    def _send(self, event, scheduled_at):
+        with self._lag_lock:
+            self._lag.append(time.perf_counter() - scheduled_at)
+        send = self._backend_request if event['target'] == 'backend' else self._node_request
+        endpoint = f"{event['target']} {event['method']} {route_template(event['target'], event['path'])}"
+        # Giữ nguyên phản hồi lỗi có trong log (vd. 404) thay vì tính là lỗi phát lại
+        expected = {200, 201, 202, event['status']}
+        self.recorder.call(endpoint, lambda: send(event), expected=expected)
+
+    def replay(self, trace, speed=1.0, concurrency=16):
+        """speed=None nghĩa là phát nhanh nhất có thể (chỉ giới hạn bởi concurrency)"""
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for event in trace:
+                scheduled_at = started + (event['t'] / speed if speed else 0.0)
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self._send, event, max(scheduled_at, started))
+        elapsed = time.perf_counter() - started
+        lag = sorted(self._lag)
+        endpoints = self.recorder.summary(elapsed)
+        total = sum(stats['requests'] for stats in endpoints.values())
+        errors = sum(stats['errors'] for stats in endpoints.values())
+        return {
+            'speed': speed or 'max',
+            'concurrency': concurrency,
+            'requests': total,
+            'trace_span_s': trace[-1]['t'] if trace else 0,
+            'duration_s': round(elapsed, 2),
+            'throughput_rps': round(total / elapsed, 2) if elapsed else None,
+            'error_rate': round(errors / float(total), 4) if total else None,
+            'schedule_lag_p50_ms': round(lag[len(lag) // 2] * 1000, 2) if lag else None,
+            'schedule_lag_p99_ms': round(lag[min(len(lag) - 1, int(len(lag) * 0.99))] * 1000, 2) if lag else None,
+            'endpoints': endpoints,
+        }
+
+
+def load_trace(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parse_cmd = subparsers.add_parser('parse', help='Tạo trace từ log')
+    parse_cmd.add_argument('--node-log', help='Đường dẫn node.log')
+    parse_cmd.add_argument('--backend-log', help='Đường dẫn backend.log')
+    parse_cmd.add_argument('--induced-window', type=float, default=2.0,
+                           help='Bỏ request node trong khoảng này (giây) trước một request backend; 0 để giữ tất cả')
+    parse_cmd.add_argument('--output', required=True, help='File trace (JSON lines)')
+
+    replay_cmd = subparsers.add_parser('replay', help='Phát lại trace')
+    replay_cmd.add_argument('trace', help='File trace (JSON lines)')
+    replay_cmd.add_argument('--speed', default='1', help="Hệ số tốc độ (1, 10, ...) hoặc 'max'")
+    replay_cmd.add_argument('--max-gap', type=float, default=None, help='Nén quãng nghỉ dài hơn N giây (thời gian trace)')
+    replay_cmd.add_argument('--targets', default='node,backend', help='Chỉ phát lại các target này')
+    replay_cmd.add_argument('--concurrency', type=int, default=16)
+    replay_cmd.add_argument('--users', type=int, default=2, help='Số user phát lại cho request backend')
+    replay_cmd.add_argument('--backend', default='http://127.0.0.1:8000')
+    replay_cmd.add_argument('--node', default='http://127.0.0.1:5000')
+    replay_cmd.add_argument('--spawn', action='store_true', help='Tự khởi động node + backend trong thư mục tạm')
+    replay_cmd.add_argument('--node-port', type=int, default=5400)
+    replay_cmd.add_argument('--backend-port', type=int, default=8400)
+    replay_cmd.add_argument('--output', help='Ghi kết quả JSON vào file thay vì stdout')
+    args = parser.parse_args()
+
+    if args.command == 'parse':
+        node_events = parse_log(args.node_log, 'node') if args.node_log else []
+        backend_events = parse_log(args.backend_log, 'backend') if args.backend_log else []
+        trace = build_trace(node_events, backend_events, args.induced_window)
+        with open(args.output, 'w') as f:
+            for event in trace:
+                f.write(json.dumps(event, ensure_ascii=False) + '\n')
+        print(json.dumps({'output': args.output, 'requests': len(trace),
+                          'node': sum(1 for e in trace if e['target'] == 'node'),
+                          'backend': sum(1 for e in trace if e['target'] == 'backend'),
+                          'span_s': trace[-1]['t'] if trace else 0}, indent=2))
+        return 0
+
+    targets = set(args.targets.split(','))
+    trace = compress_gaps([event for event in load_trace(args.trace) if event['target'] in targets], args.max_gap)
+    speed = None if args.speed == 'max' else float(args.speed)
+
+    stack = None
+    if args.spawn:
+        stack = LocalStack(args.node_port, args.backend_port).start()
+        args.backend, args.node = stack.backend_url, stack.node_url
+    try:
+        replayer = Replayer(args.node, args.backend, users=args.users)
+        if 'backend' in targets and any(event['target'] == 'backend' for event in trace):
+            replayer.setup()
+        report = replayer.replay(trace, speed=speed, concurrency=args.concurrency)
+        report['max_gap_s'] = args.max_gap
+    finally:
+        if stack is not None:
+            stack.stop()
+            shutil.rmtree(stack.workdir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
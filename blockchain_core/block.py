@@ -3,9 +3,15 @@ import json
 import hashlib
 import base64
 import logging # <-- Import logging
+from blockchain_core.metrics import REGISTRY
 
 logger = logging.getLogger(__name__) # <-- Lấy logger cho module này
 
+MINING_HASHES = REGISTRY.counter('mining_hashes_total', 'Tổng số hash đã thử khi đào block')
+BLOCK_MINING_SECONDS = REGISTRY.histogram('block_mining_seconds', 'Thời gian đào một block',
+                                          buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0))
+MINING_HASH_RATE = REGISTRY.gauge('mining_hash_rate', 'Tốc độ băm khi đào block gần nhất (hash/giây)')
+
 class Block:
     def __init__(self, index, timestamp, transactions, prev_hash, difficulty, nonce=0):
         self.index = index
@@ -24,15 +30,22 @@ class Block:
     def mine_block(self):
         prefix = '0' * self.difficulty
         logger.info(f"Bắt đầu đào block #{self.index} với độ khó {self.difficulty} (prefix: '{prefix}')...")
+        start_time, start_nonce = time.perf_counter(), self.nonce
         while True:
             hash_attempt = self.calculate_hash()
             if hash_attempt.startswith(prefix):
+                elapsed = time.perf_counter() - start_time
+                hashes = self.nonce - start_nonce + 1
+                MINING_HASHES.inc(hashes)
+                BLOCK_MINING_SECONDS.observe(elapsed)
+                if elapsed > 0:
+                    MINING_HASH_RATE.set(hashes / elapsed)
                 logger.info(f"Đã đào thành công block #{self.index} với nonce {self.nonce}, hash: {hash_attempt[:10]}...")
                 return hash_attempt
             self.nonce += 1
             # logger.debug(f"Thử hash: {hash_attempt} (nonce: {self.nonce})") # Quá nhiều log cho DEBUG
             if self.nonce % 100000 == 0: # Log tiến độ đào
-                logger.debug(f"Đang đào block #{self.index}, đã thử {self.nonce} nonce...")
+                logger.debug("Đang đào block #%s, đã thử %s nonce...", self.index, self.nonce)
 
 
     def to_dict(self):
@@ -46,6 +59,18 @@ class Block:
             "hash": self.hash
         }
 
+    def to_header_dict(self):
+        """Header gọn của block (không kèm danh sách giao dịch) dùng cho đồng bộ delta"""
+        return {
+            "index": self.index,
+            "timestamp": self.timestamp,
+            "prev_hash": self.prev_hash,
+            "hash": self.hash,
+            "nonce": self.nonce,
+            "difficulty": self.difficulty,
+            "tx_count": len(self.transactions)
+        }
+
     @staticmethod
     def from_dict(data):
         from blockchain_core.transaction import Transaction
@@ -63,5 +88,5 @@ class Block:
             nonce=data["nonce"]
         )
         block.hash = data["hash"]
-        logger.debug(f"Block #{block.index} được khởi tạo với hash: {block.hash[:10]}...")
+        logger.debug("Block #%s được khởi tạo với hash: %.10s...", block.index, block.hash)
         return block
\ No newline at end of file
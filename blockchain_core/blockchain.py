@@ -1,20 +1,148 @@
+import os
 import time
 import json
 import hashlib
 import logging  # <-- Import logging
 from blockchain_core.block import Block
+from blockchain_core.log_config import LogSampler
+from blockchain_core.metrics import REGISTRY
 from blockchain_core.transaction import Transaction
 
 logger = logging.getLogger(__name__)  # <-- Lấy logger cho module này
+# Log theo từng giao dịch vào pool được lấy mẫu để không làm chậm hot path
+pool_log_sampler = LogSampler()
+
+CHAIN_SAVE_SECONDS = REGISTRY.histogram('chain_save_seconds', 'Thời gian save_to_file')
+CHAIN_LOAD_SECONDS = REGISTRY.histogram('chain_load_seconds', 'Thời gian load_from_file (gồm kiểm tra chuỗi)')
+CHAIN_SAVE_BYTES = REGISTRY.gauge('chain_save_bytes', 'Kích thước file chuỗi ở lần lưu gần nhất')
+CHAIN_LOAD_BYTES = REGISTRY.gauge('chain_load_bytes', 'Kích thước file chuỗi ở lần tải gần nhất')
+CHAIN_REORGS = REGISTRY.counter('chain_reorgs_total', 'Số lần nhánh chính bị reorg (có gỡ block)')
 
 
 class Blockchain:
-    def __init__(self, difficulty=2, initial_funder_address=None, initial_fund_amount=1000000):
+    def __init__(self, difficulty=2, initial_funder_address=None, initial_fund_amount=1000000, max_reorg_depth=100):
         self.difficulty = difficulty
+        # Số block ở đỉnh còn giữ dữ liệu undo: reorg sâu hơn bị từ chối, nhánh phụ cũ hơn bị bỏ khỏi cây
+        self.max_reorg_depth = max_reorg_depth
         self.pending_transactions = []
+        # transaction_id của các giao dịch trong pool, để nhận ra giao dịch gửi lại (retry/replay) trong O(1)
+        self._pending_ids = set()
         self.initial_funder_address = initial_funder_address
         self.initial_fund_amount = initial_fund_amount
-        self.chain = [self.create_genesis_block()]
+        self._reset_tree([self.create_genesis_block()])
+
+    # --- Cây block: lưu mọi nhánh theo hash, self.chain là nhánh tốt nhất (nhiều công nhất) ---
+    def _reset_tree(self, chain):
+        """Khởi tạo lại cây block và các chỉ mục số dư / giao dịch từ một chuỗi đã kiểm tra"""
+        self.chain = []
+        self.blocks_by_hash = {}
+        self.cumulative_work = {}
+        self.balances = {}
+        self.tx_index = {}
+        self.undo_data = {}
+        # index -> hash của các block nhánh phụ, để tỉa nhánh phụ không phải duyệt cả cây
+        self.side_blocks = {}
+        parent_work = 0
+        for block in chain:
+            self.blocks_by_hash[block.hash] = block
+            parent_work = self.cumulative_work[block.hash] = parent_work + self.block_work(block.difficulty)
+            # Chuỗi tải lại không có nhánh phụ nên không cần tỉa
+            self._connect_block(block, prune=False)
+
+    def _connect_block(self, block, prune=True):
+        """Nối block vào đỉnh nhánh chính, cập nhật chỉ mục và lưu dữ liệu undo (số dư trước block)"""
+        previous_balances = {}
+        for tx in block.transactions:
+            deltas = [(tx.sender, -tx.amount)]
+            if tx.receiver != tx.sender:  # sender == receiver chỉ bị trừ, giống cách tính số dư theo chuỗi
+                deltas.append((tx.receiver, tx.amount))
+            for address, delta in deltas:
+                if address not in previous_balances:
+                    previous_balances[address] = self.balances.get(address)
+                self.balances[address] = self.balances.get(address, 0) + delta
+            self.tx_index[tx.transaction_id] = block.hash
+        self.undo_data[block.hash] = previous_balances
+        self.chain.append(block)
+
+        # Block đã sâu hơn max_reorg_depth không bao giờ bị gỡ nữa: bỏ dữ liệu undo của nó
+        stale_index = block.index - self.max_reorg_depth
+        if stale_index >= 0:
+            self.undo_data.pop(self.chain[stale_index].hash, None)
+            if prune and self.side_blocks and stale_index % self.max_reorg_depth == 0:
+                self._prune_side_branches(stale_index)
+
+    def _prune_side_branches(self, below_index):
+        """
+        Bỏ các block nhánh phụ có index <= below_index (không thể thành nhánh chính được nữa) cùng các block
+        nối tiếp chúng, để block nào còn trong cây cũng đi ngược được về nhánh chính
+        """
+        stale = set()
+        for index in sorted(self.side_blocks):
+            hashes = self.side_blocks[index]
+            for block_hash in list(hashes):
+                if index <= below_index or self.blocks_by_hash[block_hash].prev_hash in stale:
+                    stale.add(block_hash)
+                    hashes.discard(block_hash)
+                    del self.blocks_by_hash[block_hash]
+                    self.cumulative_work.pop(block_hash, None)
+            if not hashes:
+                del self.side_blocks[index]
+        if stale:
+            logger.info(f"Đã bỏ {len(stale)} block nhánh phụ cũ hơn block #{below_index}.")
+
+    def _disconnect_tip(self):
+        """Gỡ block ở đỉnh nhánh chính, khôi phục số dư và chỉ mục giao dịch từ dữ liệu undo"""
+        block = self.chain.pop()
+        for address, previous in self.undo_data.pop(block.hash).items():
+            if previous is None:
+                self.balances.pop(address, None)
+            else:
+                self.balances[address] = previous
+        for tx in block.transactions:
+            if self.tx_index.get(tx.transaction_id) == block.hash:
+                del self.tx_index[tx.transaction_id]
+        return block
+
+    def _add_side_block(self, block):
+        self.side_blocks.setdefault(block.index, set()).add(block.hash)
+
+    def _remove_side_block(self, block):
+        hashes = self.side_blocks.get(block.index)
+        if hashes is not None:
+            hashes.discard(block.hash)
+            if not hashes:
+                del self.side_blocks[block.index]
+
+    def _is_on_main_chain(self, block):
+        return block.index < len(self.chain) and self.chain[block.index].hash == block.hash
+
+    def _reorganize(self, new_tip):
+        """Chuyển nhánh chính sang new_tip: chỉ gỡ/nối các block giữa điểm phân nhánh và đỉnh mới"""
+        branch = []
+        block = new_tip
+        while not self._is_on_main_chain(block):
+            branch.append(block)
+            block = self.blocks_by_hash[block.prev_hash]
+        fork_index = block.index
+        branch.reverse()
+        if any(tip.hash not in self.undo_data for tip in self.chain[fork_index + 1:]):
+            logger.warning(f"Từ chối reorg từ điểm phân nhánh #{fork_index}: sâu hơn {self.max_reorg_depth} block.")
+            return None
+
+        removed = []
+        while len(self.chain) > fork_index + 1:
+            removed.append(self._disconnect_tip())
+            self._add_side_block(removed[-1])
+        for block in branch:
+            self._remove_side_block(block)
+            self._connect_block(block)
+        self._reconcile_pending_transactions(removed, branch)
+
+        if removed:
+            CHAIN_REORGS.inc()
+            logger.info(
+                f"Reorg: gỡ {len(removed)} block, nối {len(branch)} block từ điểm phân nhánh #{fork_index}. Đỉnh mới: {new_tip.hash[:10]}...")
+        return fork_index
 
     def create_genesis_block(self):
         """Tạo Block đầu tiên (Genesis Block) của chuỗi"""
@@ -40,14 +168,53 @@ class Blockchain:
     def get_last_block(self):
         return self.chain[-1]
 
+    def get_block_by_hash(self, block_hash):
+        """Tìm block theo hash trong cây block (gồm cả các nhánh phụ)"""
+        return self.blocks_by_hash.get(block_hash)
+
+    def get_transaction_block(self, transaction_id):
+        """Trả về block trên nhánh chính chứa giao dịch, hoặc None nếu giao dịch chưa được xác nhận"""
+        block_hash = self.tx_index.get(transaction_id)
+        return self.blocks_by_hash.get(block_hash) if block_hash else None
+
+    def has_transaction(self, transaction_id):
+        """Giao dịch đã nằm trong pool hoặc trong một block của nhánh chính"""
+        return transaction_id in self._pending_ids or transaction_id in self.tx_index
+
+    def get_pending_transaction(self, transaction_id):
+        if transaction_id not in self._pending_ids:
+            return None
+        for tx in self.pending_transactions:
+            if tx.transaction_id == transaction_id:
+                return tx
+        return None
+
+    def get_blocks_since(self, height, limit=None):
+        """
+        Trả về các block có index > height (dùng cho đồng bộ delta).
+
+        Args:
+            height: Chiều cao block mà phía gọi đã có (-1 để lấy từ Genesis)
+            limit: Số block tối đa trả về (None = không giới hạn)
+        """
+        start = max(height + 1, 0)
+        end = len(self.chain) if limit is None else min(start + limit, len(self.chain))
+        return self.chain[start:end]
+
     def add_transaction_to_pool(self, transaction):
         # Allow SYSTEM_INITIAL_FUND transaction to bypass full validation for simulation purposes
         if transaction.sender != "SYSTEM_INITIAL_FUND" and not transaction.is_valid():
             logger.warning(f"Giao dịch không hợp lệ từ {transaction.sender[:10]}... không được thêm vào pool.")
             return False
+        # transaction_id do người gửi quyết định (qua timestamp): gửi lại cùng giao dịch không được trừ tiền hai lần
+        if self.has_transaction(transaction.transaction_id):
+            logger.warning(f"Giao dịch {transaction.transaction_id[:10]}... đã có trong pool hoặc trong chuỗi, bỏ qua.")
+            return False
         self.pending_transactions.append(transaction)
-        logger.info(
-            f"Giao dịch từ {transaction.sender[:10]}... đến {transaction.receiver[:10]}... với số tiền {transaction.amount} đã được thêm vào pool. (Hiện có {len(self.pending_transactions)} giao dịch chờ xử lý)")
+        self._pending_ids.add(transaction.transaction_id)
+        if pool_log_sampler.should_log():
+            logger.info("Giao dịch từ %.10s... đến %.10s... với số tiền %s đã được thêm vào pool. (Hiện có %s giao dịch chờ xử lý)",
+                        transaction.sender, transaction.receiver, transaction.amount, len(self.pending_transactions))
         return True
 
     def mine_pending_transactions(self, miner_address):
@@ -66,6 +233,7 @@ class Blockchain:
         block_transactions = [mining_reward_transaction] + list(self.pending_transactions)
         # Clear pending transactions after they are included in a block
         self.pending_transactions = []
+        self._pending_ids = set()
 
         new_block = Block(
             len(self.chain),
@@ -76,65 +244,160 @@ class Blockchain:
         )
         # ĐÀO BLOCK VÀ GÁN HASH
         new_block.hash = new_block.mine_block()
-        self.chain.append(new_block)
+        self.blocks_by_hash[new_block.hash] = new_block
+        self.cumulative_work[new_block.hash] = (self.cumulative_work[new_block.prev_hash]
+                                                + self.block_work(new_block.difficulty))
+        self._connect_block(new_block)
 
         logger.info(
             f"Block mới #{new_block.index} đã được đào bởi {miner_address[:10]}... với hash: {new_block.hash[:10]}... Chứa {len(block_transactions)} giao dịch.")
         return new_block
 
+    @staticmethod
+    def block_work(difficulty):
+        """Số lần băm kỳ vọng để tìm được hash có `difficulty` chữ số hex '0' ở đầu"""
+        return 16 ** difficulty
+
+    def get_chain_work(self, start_index=0):
+        """Tổng công (work) của các block từ start_index đến đỉnh chuỗi"""
+        total = self.cumulative_work[self.get_last_block().hash]
+        if start_index <= 0:
+            return total
+        return total - self.cumulative_work[self.chain[start_index - 1].hash]
+
+    def is_block_valid(self, current_block, previous_block):
+        """Kiểm tra một block so với block đứng trước nó (hash, prev_hash, PoW, giao dịch)"""
+        if current_block.hash != current_block.calculate_hash():
+            logger.error(
+                f"Hash không hợp lệ tại block {current_block.index}. Expected: {current_block.calculate_hash()[:10]}..., Got: {current_block.hash[:10]}...")
+            return False
+
+        if current_block.prev_hash != previous_block.hash:
+            logger.error(
+                f"Prev_hash không khớp tại block {current_block.index}. Expected: {previous_block.hash[:10]}..., Got: {current_block.prev_hash[:10]}...")
+            return False
+
+        if current_block.index != previous_block.index + 1:
+            logger.error(
+                f"Index không liên tiếp tại block {current_block.index} (block trước: {previous_block.index}).")
+            return False
+
+        # Độ khó không nằm trong hash nên block tự khai độ khó thấp hơn độ khó của node thì bị từ chối,
+        # nếu không nhánh gồm các block gần như không tốn công vẫn có thể được chọn là nhánh nặng nhất
+        if current_block.difficulty < self.difficulty:
+            logger.error(
+                f"Độ khó {current_block.difficulty} tại block {current_block.index} thấp hơn độ khó yêu cầu {self.difficulty}.")
+            return False
+
+        # Check proof-of-work (hash starts with correct prefix)
+        prefix = '0' * current_block.difficulty
+        if not current_block.hash.startswith(prefix):
+            logger.error(
+                f"Proof-of-Work không hợp lệ tại block {current_block.index}. Hash không bắt đầu với '{prefix}'.")
+            return False
+
+        for tx in current_block.transactions:
+            # Special handling for initial funding transaction during validation within block
+            if tx.sender == "SYSTEM_INITIAL_FUND":
+                logger.debug("Bỏ qua xác thực giao dịch cấp quỹ ban đầu trong block %s.", current_block.index)
+                continue
+            if not tx.is_valid():
+                logger.error(f"Giao dịch không hợp lệ trong block {current_block.index}: {tx.to_dict()}")
+                return False
+        return True
+
     def is_chain_valid(self):
         logger.info("Bắt đầu kiểm tra tính hợp lệ của chuỗi...")
         for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i - 1]
-
-            if current_block.hash != current_block.calculate_hash():
-                logger.error(
-                    f"Hash không hợp lệ tại block {current_block.index}. Expected: {current_block.calculate_hash()[:10]}..., Got: {current_block.hash[:10]}...")
+            if not self.is_block_valid(self.chain[i], self.chain[i - 1]):
                 return False
+        logger.info("Kiểm tra chuỗi thành công: Blockchain hợp lệ.")
+        return True
 
-            if current_block.prev_hash != previous_block.hash:
-                logger.error(
-                    f"Prev_hash không khớp tại block {current_block.index}. Expected: {previous_block.hash[:10]}..., Got: {current_block.prev_hash[:10]}...")
-                return False
+    def replace_chain_suffix(self, fork_index, new_blocks):
+        """
+        Đưa nhánh `new_blocks` (nối sau block `fork_index`) vào cây block; nhánh chính chỉ chuyển sang
+        nhánh mới nếu nhánh này nặng hơn. Chỉ các block mới (phần phân nhánh) được kiểm tra.
+
+        Returns:
+            bool: True nếu đỉnh chuỗi đã chuyển sang đỉnh của nhánh mới
+        """
+        if fork_index < 0 or fork_index >= len(self.chain) or not new_blocks:
+            logger.warning(f"Không thể thay chuỗi: điểm phân nhánh {fork_index} không hợp lệ hoặc không có block mới.")
+            return False
+        if new_blocks[0].prev_hash != self.chain[fork_index].hash:
+            logger.warning(f"Nhánh mới không nối vào block #{fork_index} của chuỗi hiện tại.")
+            return False
 
-            # Check proof-of-work (hash starts with correct prefix)
-            prefix = '0' * current_block.difficulty
-            if not current_block.hash.startswith(prefix):
-                logger.error(
-                    f"Proof-of-Work không hợp lệ tại block {current_block.index}. Hash không bắt đầu với '{prefix}'.")
+        for block in new_blocks:
+            if block.hash not in self.blocks_by_hash and not self.add_block(block):
+                logger.warning(f"Nhánh mới bị từ chối: block {block.index} không hợp lệ.")
                 return False
 
-            for tx in current_block.transactions:
-                # Special handling for initial funding transaction during validation within block
-                if tx.sender == "SYSTEM_INITIAL_FUND":
-                    logger.debug(f"Bỏ qua xác thực giao dịch cấp quỹ ban đầu trong block {current_block.index}.")
-                    continue
-                if not tx.is_valid():
-                    logger.error(f"Giao dịch không hợp lệ trong block {current_block.index}: {tx.to_dict()}")
-                    return False
-        logger.info("Kiểm tra chuỗi thành công: Blockchain hợp lệ.")
+        replaced = self.get_last_block().hash == new_blocks[-1].hash
+        if not replaced:
+            logger.info("Nhánh mới không nặng hơn chuỗi hiện tại, được giữ làm nhánh phụ.")
+        return replaced
+
+    def add_block(self, block):
+        """
+        Thêm một block (đã đào) vào cây block. Block được lưu theo hash kể cả khi thuộc nhánh phụ;
+        nếu nhánh chứa nó có tổng công lớn hơn đỉnh hiện tại thì nhánh chính được reorg sang.
+
+        Returns:
+            bool: True nếu block hợp lệ và đã được lưu vào cây
+        """
+        if block.hash in self.blocks_by_hash:
+            return False
+        parent = self.blocks_by_hash.get(block.prev_hash)
+        if parent is None:
+            logger.warning(f"Block #{block.index} có block cha chưa biết ({str(block.prev_hash)[:10]}...), bỏ qua.")
+            return False
+        if not self.is_block_valid(block, parent):
+            logger.warning(f"Block #{block.index} nhận từ peer không hợp lệ.")
+            return False
+
+        self.blocks_by_hash[block.hash] = block
+        self.cumulative_work[block.hash] = self.cumulative_work[parent.hash] + self.block_work(block.difficulty)
+
+        # Block mới luôn vào nhánh phụ trước; reorg chuyển các block của nhánh thắng sang nhánh chính
+        self._add_side_block(block)
+
+        if self.cumulative_work[block.hash] > self.cumulative_work[self.get_last_block().hash] \
+                and self._reorganize(block) is not None:
+            logger.info(f"Đỉnh chuỗi mới: block #{block.index} ({block.hash[:10]}...).")
+        else:
+            logger.info(f"Block #{block.index} ({block.hash[:10]}...) được lưu vào nhánh phụ.")
         return True
 
+    def _reconcile_pending_transactions(self, removed_blocks, added_blocks):
+        """Đưa giao dịch của các block bị loại về lại pool và bỏ các giao dịch đã nằm trong block mới"""
+        confirmed_ids = {tx.transaction_id for block in added_blocks for tx in block.transactions}
+        pending = [tx for block in removed_blocks for tx in block.transactions
+                   if tx.transaction_type != "MINING_REWARD" and tx.transaction_id not in confirmed_ids]
+        pending.extend(self.pending_transactions)
+
+        self.pending_transactions = []
+        self._pending_ids = set()
+        for tx in pending:
+            if tx.transaction_id in confirmed_ids or tx.transaction_id in self._pending_ids:
+                continue
+            self._pending_ids.add(tx.transaction_id)
+            self.pending_transactions.append(tx)
+
     def get_balance(self, address):
-        balance = 0
-        for block in self.chain:
-            for tx in block.transactions:
-                if tx.sender == address:
-                    balance -= tx.amount
-                elif tx.receiver == address:  # Use elif to avoid double counting if sender == receiver
-                    balance += tx.amount
-                elif tx.sender == "SYSTEM_INITIAL_FUND" and tx.receiver == address:  # Special case for initial funding
-                    balance += tx.amount
-        logger.debug(f"Số dư cho địa chỉ {address[:10]}... là: {balance}")
+        # Chỉ mục số dư được cập nhật khi nối/gỡ block nên không cần duyệt lại toàn bộ chuỗi
+        balance = self.balances.get(address, 0)
+        logger.debug("Số dư cho địa chỉ %.10s... là: %s", address, balance)
         return balance
 
     def save_to_file(self, filename):
         chain_data = [blk.to_dict() for blk in self.chain]
         chain_hash = self.calculate_chain_hash(chain_data)
         try:
-            with open(filename, "w") as f:
+            with CHAIN_SAVE_SECONDS.time(), open(filename, "w") as f:
                 json.dump({"chain_data": chain_data, "chain_hash": chain_hash}, f, indent=4)
+                CHAIN_SAVE_BYTES.set(f.tell())
             logger.info(f"Blockchain đã lưu vào '{filename}'.")
             return True
         except Exception as e:
@@ -146,9 +409,14 @@ class Blockchain:
         return hashlib.sha256(content.encode()).hexdigest()
 
     def load_from_file(self, filename):
+        with CHAIN_LOAD_SECONDS.time():
+            return self._load_from_file(filename)
+
+    def _load_from_file(self, filename):
         try:
             with open(filename, "r") as f:
                 data = json.load(f)
+            CHAIN_LOAD_BYTES.set(os.path.getsize(filename))
         except FileNotFoundError:
             logger.error(f"Không tìm thấy file blockchain '{filename}'.")
             return False
@@ -187,7 +455,7 @@ class Blockchain:
 
             loaded_chain.append(block)
 
-        self.chain = loaded_chain
+        self._reset_tree(loaded_chain)
         logger.info(f"Đã tải blockchain từ '{filename}' và kiểm tra thành công.")
         # Re-check the full chain validity after loading
         if not self.is_chain_valid():
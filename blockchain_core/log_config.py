@@ -0,0 +1,78 @@
+import atexit
+import itertools
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener = None
+
+
+def setup_logging(log_file, level=None, max_bytes=None, backup_count=None, console=True):
+    """
+    Cấu hình logging bất đồng bộ cho tiến trình (node hoặc backend):
+    các luồng xử lý request chỉ đẩy bản ghi vào hàng đợi (QueueHandler), một luồng nền (QueueListener)
+    ghi ra file có xoay vòng theo dung lượng (RotatingFileHandler) và console.
+
+    Các giá trị mặc định đọc từ biến môi trường:
+        LOG_LEVEL (INFO), LOG_MAX_BYTES (5MB), LOG_BACKUP_COUNT (3)
+
+    Returns:
+        QueueListener: listener đang chạy (được dừng tự động khi tiến trình thoát)
+    """
+    global _listener
+
+    level = level or os.environ.get('LOG_LEVEL', 'INFO').upper()
+    max_bytes = max_bytes if max_bytes is not None else int(os.environ.get('LOG_MAX_BYTES', 5 * 1024 * 1024))
+    backup_count = backup_count if backup_count is not None else int(os.environ.get('LOG_BACKUP_COUNT', 3))
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [RotatingFileHandler(log_file, mode='a', maxBytes=max_bytes, backupCount=backup_count,
+                                    encoding='utf-8')]
+    if console:
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    if _listener is not None:
+        _listener.stop()
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Dừng luồng ghi log và xả hết các bản ghi còn trong hàng đợi"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+class LogSampler:
+    """
+    Lấy mẫu log cho các log theo từng phần tử trên hot path: chỉ 1/every lần gọi should_log() trả về True.
+    Đặt every=1 để ghi tất cả. Mặc định đọc từ biến môi trường LOG_SAMPLE_EVERY.
+    """
+
+    def __init__(self, every=None):
+        self.every = max(1, every if every is not None else int(os.environ.get('LOG_SAMPLE_EVERY', 100)))
+        self._counter = itertools.count()
+
+    def should_log(self):
+        return next(self._counter) % self.every == 0
@@ -0,0 +1,338 @@
+import cProfile
+import hmac
+import io
+import itertools
+import logging
+import math
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+profiling_logger = logging.getLogger(__name__)
+
+TOKEN_HEADER = 'X-Profiling-Token'
+# Chu kỳ lấy mẫu nhỏ nhất: nhỏ hơn (hoặc 0) thì luồng lấy mẫu quay liên tục và chiếm trọn một lõi CPU
+MIN_SAMPLER_INTERVAL = 0.001
+
+
+class _RouteCapture:
+    """cProfile cho N request kế tiếp của một route, gộp vào một file pstats"""
+
+    def __init__(self, capture_id, route, count, path):
+        self.capture_id = capture_id
+        self.route = route
+        self.remaining = count
+        self.requested = count
+        self.recorded = 0
+        self.path = path
+        self.stats = None
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def to_dict(self):
+        return {
+            'id': self.capture_id,
+            'route': self.route,
+            'requested': self.requested,
+            'captured': self.recorded,
+            'done': self.finished_at is not None,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class SamplingProfiler:
+    """
+    Profiler lấy mẫu: một luồng nền đọc stack của mọi luồng khác mỗi `interval` giây
+    và đếm số lần mỗi stack xuất hiện (định dạng "folded" dùng được cho flamegraph).
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = None
+        # Luồng lấy mẫu thêm key vào samples trong lúc request đọc kết quả
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self.samples = Counter()
+        self.sample_count = 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stacks.append(';'.join(reversed(stack)))
+            with self._lock:
+                self.samples.update(stacks)
+                self.sample_count += 1
+
+    def snapshot(self):
+        """Bản sao các mẫu hiện có, đọc được an toàn khi luồng lấy mẫu đang chạy"""
+        with self._lock:
+            return Counter(self.samples)
+
+    def folded(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.snapshot().most_common())
+
+    def top_frames(self, limit=20):
+        """Các frame xuất hiện nhiều nhất ở đỉnh stack (tự tốn thời gian)"""
+        leaves = Counter()
+        for stack, count in self.snapshot().items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return [{'frame': frame, 'samples': count} for frame, count in leaves.most_common(limit)]
+
+
+class RequestProfiler:
+    """
+    Bề mặt profiling theo yêu cầu cho một Flask app, gồm:
+    - cProfile cho N request kế tiếp của một route (tải về dạng file pstats)
+    - bật/tắt profiler lấy mẫu
+    - tracemalloc snapshot và so sánh với snapshot trước đó
+    Mọi endpoint nằm dưới /debug/profile và yêu cầu header X-Profiling-Token.
+    """
+
+    def __init__(self, token, output_dir=None):
+        self.token = token
+        self.output_dir = output_dir or tempfile.mkdtemp(prefix="ct099_profiles_")
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.captures = {}
+        self.sampler = SamplingProfiler()
+        self._armed = {}  # route -> _RouteCapture đang chờ request
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    # --- cProfile theo route ---
+    def arm(self, route, count):
+        with self._lock:
+            capture_id = next(self._ids)
+            path = os.path.join(self.output_dir, f"capture_{capture_id}.pstats")
+            capture = self.captures[capture_id] = _RouteCapture(capture_id, route, count, path)
+            previous = self._armed.get(route)
+            if previous is not None:
+                # Capture cũ bị thay: chốt lại số request đã nhận
+                previous.requested -= previous.remaining
+                previous.remaining = 0
+                self._finish_if_complete(previous)
+            self._armed[route] = capture
+        profiling_logger.info(f"Profiling: sẽ ghi cProfile cho {count} request kế tiếp của {route}.")
+        return capture
+
+    def _claim(self, route):
+        """Nhận một lượt capture cho request hiện tại (nếu route đang được theo dõi)"""
+        with self._lock:
+            capture = self._armed.get(route)
+            if capture is None:
+                return None
+            capture.remaining -= 1
+            if capture.remaining <= 0:
+                del self._armed[route]
+            return capture
+
+    def _record(self, capture, profile):
+        with self._lock:
+            if capture.stats is None:
+                capture.stats = pstats.Stats(profile)
+            else:
+                capture.stats.add(profile)
+            capture.recorded += 1
+            self._finish_if_complete(capture)
+
+    def _skip(self, capture):
+        """Bỏ một lượt đã nhận nhưng không đo được"""
+        with self._lock:
+            capture.requested -= 1
+            self._finish_if_complete(capture)
+
+    def _finish_if_complete(self, capture):
+        if capture.finished_at is not None or capture.remaining > 0 or capture.recorded < capture.requested:
+            return
+        if capture.stats is not None:
+            capture.stats.dump_stats(capture.path)
+        capture.finished_at = time.time()
+        profiling_logger.info(f"Profiling: capture #{capture.capture_id} ({capture.route}) đã xong.")
+
+    # --- tracemalloc ---
+    def take_snapshot(self, limit=20):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(int(os.environ.get('PROFILING_TRACEMALLOC_FRAMES', 1)))
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        previous, self._snapshot = self._snapshot, snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        result = {'traced_bytes': current, 'peak_bytes': peak}
+        if previous is None:
+            result['top'] = [{'location': str(stat.traceback), 'size': stat.size, 'count': stat.count}
+                             for stat in snapshot.statistics('lineno')[:limit]]
+        else:
+            result['diff'] = [{'location': str(stat.traceback), 'size_diff': stat.size_diff,
+                               'count_diff': stat.count_diff, 'size': stat.size}
+                              for stat in snapshot.compare_to(previous, 'lineno')[:limit]]
+        return result
+
+    def stop_tracemalloc(self):
+        self._snapshot = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    # --- Gắn vào Flask ---
+    def init_app(self, app):
+        from flask import Blueprint, abort, g, jsonify, request, send_file
+
+        profiler = self
+
+        @app.before_request
+        def _start_route_profile():
+            if not profiler._armed or request.url_rule is None:
+                return
+            capture = profiler._claim(request.url_rule.rule)
+            if capture is None:
+                return
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Đã có profiler khác đang chạy trên luồng này
+                profiler._skip(capture)
+                return
+            g._profiling = (capture, profile)
+
+        @app.teardown_request
+        def _stop_route_profile(exc):
+            current = g.pop('_profiling', None)
+            if current is not None:
+                capture, profile = current
+                profile.disable()
+                profiler._record(capture, profile)
+
+        bp = Blueprint('profiling', __name__, url_prefix='/debug/profile')
+
+        @bp.before_request
+        def _check_token():
+            supplied = request.headers.get(TOKEN_HEADER, '')
+            if not hmac.compare_digest(supplied.encode(), profiler.token.encode()):
+                abort(403)
+
+        @bp.route('/captures', methods=['POST'])
+        def create_capture():
+            data = request.get_json(silent=True) or {}
+            route = data.get('route')
+            if not route:
+                return jsonify({"error": "Thiếu 'route' (ví dụ: /mine)."}), 400
+            try:
+                count = max(1, int(data.get('count', 1)))
+            except (TypeError, ValueError):
+                return jsonify({"error": "'count' phải là số nguyên."}), 400
+            return jsonify(profiler.arm(route, count).to_dict()), 201
+
+        @bp.route('/captures', methods=['GET'])
+        def list_captures():
+            return jsonify([capture.to_dict() for capture in profiler.captures.values()]), 200
+
+        @bp.route('/captures/<int:capture_id>', methods=['GET'])
+        def get_capture(capture_id):
+            capture = profiler.captures.get(capture_id)
+            if capture is None:
+                return jsonify({"error": "Không tìm thấy capture."}), 404
+            if request.args.get('format') == 'text':
+                if capture.stats is None:
+                    return jsonify({"error": "Capture chưa có dữ liệu."}), 409
+                out = io.StringIO()
+                pstats.Stats(capture.path if capture.finished_at else capture.stats, stream=out) \
+                    .sort_stats('cumulative').print_stats(request.args.get('limit', 40, type=int))
+                return out.getvalue(), 200, {'Content-Type': 'text/plain; charset=utf-8'}
+            if capture.finished_at is None or capture.stats is None:
+                return jsonify(capture.to_dict()), 202
+            return send_file(capture.path, as_attachment=True, download_name=os.path.basename(capture.path),
+                             mimetype='application/octet-stream')
+
+        @bp.route('/sampler', methods=['POST'])
+        def toggle_sampler():
+            data = request.get_json(silent=True) or {}
+            action = data.get('action')
+            if action == 'start':
+                try:
+                    interval = float(data.get('interval', profiler.sampler.interval))
+                except (TypeError, ValueError):
+                    interval = None
+                if interval is None or not math.isfinite(interval) or interval < MIN_SAMPLER_INTERVAL:
+                    return jsonify({"error": f"'interval' phải là số giây >= {MIN_SAMPLER_INTERVAL}."}), 400
+                profiler.sampler.interval = interval
+                profiler.sampler.start()
+            elif action == 'stop':
+                profiler.sampler.stop()
+            else:
+                return jsonify({"error": "'action' phải là 'start' hoặc 'stop'."}), 400
+            return jsonify({'running': profiler.sampler.running, 'samples': profiler.sampler.sample_count}), 200
+
+        @bp.route('/sampler', methods=['GET'])
+        def get_sampler():
+            if request.args.get('format') == 'folded':
+                return profiler.sampler.folded(), 200, {'Content-Type': 'text/plain; charset=utf-8'}
+            return jsonify({
+                'running': profiler.sampler.running,
+                'interval': profiler.sampler.interval,
+                'samples': profiler.sampler.sample_count,
+                'top_frames': profiler.sampler.top_frames(request.args.get('limit', 20, type=int)),
+            }), 200
+
+        @bp.route('/tracemalloc/snapshot', methods=['POST'])
+        def tracemalloc_snapshot():
+            return jsonify(profiler.take_snapshot(request.args.get('limit', 20, type=int))), 200
+
+        @bp.route('/tracemalloc/stop', methods=['POST'])
+        def tracemalloc_stop():
+            profiler.stop_tracemalloc()
+            return jsonify({"message": "Đã dừng tracemalloc."}), 200
+
+        app.register_blueprint(bp)
+        return self
+
+
+def install_profiling(app, token=None, output_dir=None):
+    """
+    Bật profiling theo yêu cầu cho app nếu có token (tham số hoặc biến môi trường PROFILING_TOKEN).
+    Không có token thì không gắn hook hay endpoint nào, request không tốn thêm chi phí.
+
+    Returns:
+        RequestProfiler | None
+    """
+    token = token or os.environ.get('PROFILING_TOKEN')
+    if not token:
+        return None
+    output_dir = output_dir or os.environ.get('PROFILING_DIR')
+    profiler = RequestProfiler(token, output_dir).init_app(app)
+    profiling_logger.warning("Profiling đang bật tại /debug/profile (yêu cầu header %s).", TOKEN_HEADER)
+    return profiler
@@ -44,8 +44,10 @@ class Transaction:
         # Tạo transaction ID duy nhất
         self.transaction_id = self._generate_transaction_id()
 
-        logger.debug(
-            f"Giao dịch được tạo: {self.sender[:10] if self.sender and self.sender != 'SYSTEM' else 'SYSTEM'}... -> {self.recipient[:10] if self.recipient else 'Unknown'}... Amount: {self.amount}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Giao dịch được tạo: %.10s... -> %.10s... Amount: %s",
+                         self.sender if self.sender and self.sender != 'SYSTEM' else 'SYSTEM',
+                         self.recipient or 'Unknown', self.amount)
 
     def _generate_transaction_id(self):
         """Tạo ID giao dịch từ hash của các thông tin"""
@@ -124,7 +126,7 @@ class Transaction:
         # Ký message
         self.signature = wallet.sign(msg)
 
-        logger.debug(f"Đã ký giao dịch: {self.sender[:10] if self.sender else 'Unknown'}...")
+        logger.debug("Đã ký giao dịch: %.10s...", self.sender or 'Unknown')
         return self.signature
 
     def get_hash(self):
@@ -21,7 +21,7 @@ class Wallet:
         self.public_key_pem = self.public_key.to_pem().decode()
         self.address = self.get_address()
 
-        logger.debug(f"Địa chỉ ví: {self.address[:10]}...")
+        logger.debug("Địa chỉ ví: %.10s...", self.address)
 
     def get_private_key(self):
         return base64.b64encode(self.private_key.to_string()).decode()
@@ -33,15 +33,15 @@ class Wallet:
         if isinstance(message, str):
             message = message.encode('utf-8')
         signature = base64.b64encode(self.private_key.sign(message)).decode()
-        logger.debug(f"Đã ký tin nhắn với ví {self.address[:10]}... Chữ ký: {signature[:10]}...")
+        logger.debug("Đã ký tin nhắn với ví %.10s... Chữ ký: %.10s...", self.address, signature)
         return signature
 
     @staticmethod
     def verify(public_key_str, message, signature_str):
         try:
-            logger.debug(f"Verify - Public key: {public_key_str[:20]}...")
-            logger.debug(f"Verify - Message: {str(message)[:50]}...")
-            logger.debug(f"Verify - Signature: {signature_str[:20]}...")
+            logger.debug("Verify - Public key: %.20s...", public_key_str)
+            logger.debug("Verify - Message: %.50s...", message)
+            logger.debug("Verify - Signature: %.20s...", signature_str)
 
             vk = VerifyingKey.from_string(base64.b64decode(public_key_str), curve=SECP256k1)
 
@@ -49,7 +49,7 @@ class Wallet:
                 message = message.encode('utf-8')
 
             is_valid = vk.verify(base64.b64decode(signature_str), message)
-            logger.debug(f"Verify result: {is_valid}")
+            logger.debug("Verify result: %s", is_valid)
 
             if not is_valid:
                 logger.warning(f"Xác minh chữ ký thất bại cho Public Key {public_key_str[:10]}...")
@@ -66,7 +66,7 @@ class Wallet:
         ripemd160 = hashlib.new('ripemd160')
         ripemd160.update(sha256_hash)
         address = ripemd160.hexdigest()
-        logger.debug(f"Địa chỉ RIPEMD160: {address[:10]}...")
+        logger.debug("Địa chỉ RIPEMD160: %.10s...", address)
         return address
 
     def save_to_file(self, filename):
@@ -106,3 +106,16 @@ class Wallet:
             "public_key": self.get_public_key(),
             "private_key": self.get_private_key(),
         }
+
+
+def generate_keypairs(count=1):
+    """
+    Sinh `count` cặp khoá SECP256k1 dạng base64 (public_key, private_key), giống Wallet().get_public_key() /
+    get_private_key() nhưng không tính PEM và địa chỉ. Hàm cấp module để chạy được trong tiến trình con.
+    """
+    keypairs = []
+    for _ in range(count):
+        private_key = SigningKey.generate(curve=SECP256k1)
+        keypairs.append((base64.b64encode(private_key.get_verifying_key().to_string()).decode(),
+                         base64.b64encode(private_key.to_string()).decode()))
+    return keypairs
@@ -0,0 +1,265 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from blockchain_core.blockchain import Blockchain
+
+cluster_logger = logging.getLogger(__name__)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLUSTER_FUNDER_ADDRESS = "CLUSTER_FUNDER"
+
+
+class LocalCluster:
+    """
+    Chạy N tiến trình blockchain_node.node trên các cổng liên tiếp của máy local.
+    Mỗi node có thư mục làm việc riêng (file chuỗi, node.log) và cùng một Genesis Block.
+    """
+
+    def __init__(self, size=3, base_port=5100, workdir=None, difficulty=2, extra_env=None):
+        self.size = size
+        self.base_port = base_port
+        self.workdir = workdir or tempfile.mkdtemp(prefix="ct099_cluster_")
+        self.difficulty = difficulty
+        self.extra_env = extra_env or {}
+        self.processes = []
+
+    @property
+    def urls(self):
+        return [f"http://127.0.0.1:{self.base_port + i}" for i in range(self.size)]
+
+    def _create_seed_chain(self):
+        seed_file = os.path.join(self.workdir, "seed_chain.json")
+        seed = Blockchain(difficulty=self.difficulty, initial_funder_address=CLUSTER_FUNDER_ADDRESS,
+                          initial_fund_amount=1000000)
+        seed.save_to_file(seed_file)
+        return seed_file
+
+    def start(self, timeout=30):
+        seed_file = self._create_seed_chain()
+        for i, url in enumerate(self.urls):
+            node_dir = os.path.join(self.workdir, f"node{i}")
+            os.makedirs(node_dir, exist_ok=True)
+            chain_file = os.path.join(node_dir, "node_blockchain.json")
+            shutil.copyfile(seed_file, chain_file)
+
+            env = dict(os.environ)
+            env.update(self.extra_env)
+            env['NODE_BLOCKCHAIN_FILE'] = chain_file
+            env['PYTHONPATH'] = REPO_ROOT + os.pathsep + env.get('PYTHONPATH', '')
+            peers = ",".join(u for u in self.urls if u != url)
+            stdout = open(os.path.join(node_dir, "stdout.log"), "ab")
+            process = subprocess.Popen(
+                [sys.executable, "-m", "blockchain_node.node", "--port", str(self.base_port + i), "--peers", peers],
+                cwd=node_dir, env=env, stdout=stdout, stderr=subprocess.STDOUT
+            )
+            self.processes.append(process)
+            cluster_logger.info(f"Đã khởi động node {i} tại {url} (pid {process.pid}).")
+
+        deadline = time.time() + timeout
+        for url in self.urls:
+            while True:
+                try:
+                    requests.get(f"{url}/headers", params={'since': 0}, timeout=1).raise_for_status()
+                    break
+                except requests.exceptions.RequestException:
+                    if time.time() > deadline:
+                        self.stop()
+                        raise RuntimeError(f"Node {url} không khởi động kịp trong {timeout}s.")
+                    time.sleep(0.2)
+        return self
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.processes = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    # --- Các thao tác tiện ích trên từng node ---
+    @staticmethod
+    def submit_transaction(url, receiver, amount=1.0, sender="SYSTEM_INITIAL_FUND"):
+        response = requests.post(f"{url}/transactions/new", timeout=10, json={
+            "sender": sender,
+            "receiver": receiver,
+            "amount": amount,
+            "signature": "DUMMY_SIGNATURE"
+        })
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def mine(url):
+        response = requests.get(f"{url}/mine", timeout=60)
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def tip(url):
+        data = requests.get(f"{url}/headers", params={'since': 0, 'limit': 1}, timeout=10).json()
+        return data['length'], data['tip_hash']
+
+    @staticmethod
+    def pending_ids(url):
+        response = requests.get(f"{url}/transactions/pending", timeout=10)
+        return {tx['transaction_id'] for tx in response.json()}
+
+    @staticmethod
+    def gossip_stats(url):
+        return requests.get(f"{url}/gossip/stats", timeout=10).json()
+
+    @staticmethod
+    def resolve(url):
+        response = requests.get(f"{url}/nodes/resolve", timeout=60)
+        response.raise_for_status()
+        return response.json()
+
+
+def run_consensus_scenario(cluster, blocks_on_leader=5):
+    """
+    Kịch bản kiểm tra đồng thuận: node 0 đào nhiều block, node 1 đào một nhánh ngắn cạnh tranh,
+    sau đó mọi node gọi /nodes/resolve và phải hội tụ về cùng một đỉnh chuỗi.
+    """
+    leader, rival = cluster.urls[0], cluster.urls[1]
+    for i in range(blocks_on_leader):
+        cluster.submit_transaction(leader, receiver=f"addr_leader_{i}")
+        cluster.mine(leader)
+    cluster.submit_transaction(rival, receiver="addr_rival")
+    cluster.mine(rival)
+
+    results = {}
+    for url in cluster.urls[1:]:
+        results[url] = cluster.resolve(url)
+
+    tips = {url: cluster.tip(url) for url in cluster.urls}
+    converged = len(set(tips.values())) == 1
+    return converged, tips, results
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def run_propagation_scenario(cluster, tx_count=50, poll_interval=0.01, timeout=30):
+    """
+    Đo độ trễ lan truyền và băng thông gossip: gửi tx_count giao dịch vào node 0, đo thời gian tới khi
+    mỗi node khác thấy chúng trong pending pool; sau đó đào một block ở node 0 và đo thời gian tới khi
+    các node khác có cùng đỉnh chuỗi.
+    """
+    origin, others = cluster.urls[0], cluster.urls[1:]
+    before = {url: cluster.gossip_stats(url) for url in cluster.urls}
+
+    # Gửi giao dịch ở luồng riêng để việc đo ở các node khác bắt đầu ngay từ giao dịch đầu tiên
+    submitted = {}
+
+    def submit_all():
+        for i in range(tx_count):
+            sent_at = time.perf_counter()
+            tx_id = cluster.submit_transaction(origin, receiver=f"addr_prop_{i}")['transaction_id']
+            submitted[tx_id] = sent_at
+
+    submitter = threading.Thread(target=submit_all)
+    submitter.start()
+
+    tx_latencies = []
+    deadline = time.time() + timeout
+    delivered = {url: set() for url in others}
+    while time.time() < deadline:
+        done = not submitter.is_alive()
+        for url in others:
+            arrived = (cluster.pending_ids(url) & set(submitted)) - delivered[url]
+            now = time.perf_counter()
+            tx_latencies.extend(now - submitted[tx_id] for tx_id in arrived)
+            delivered[url] |= arrived
+        if done and all(len(ids) == tx_count for ids in delivered.values()):
+            break
+        time.sleep(poll_interval)
+    submitter.join()
+
+    mined_at = time.perf_counter()
+    block_hash = cluster.mine(origin)['hash']
+    block_latencies = {}
+    while len(block_latencies) < len(others) and time.time() < deadline:
+        for url in others:
+            if url not in block_latencies and cluster.tip(url)[1] == block_hash:
+                block_latencies[url] = time.perf_counter() - mined_at
+        time.sleep(poll_interval)
+
+    after = {url: cluster.gossip_stats(url) for url in cluster.urls}
+    bytes_sent = sum(after[u]['bytes_sent'] - before[u]['bytes_sent'] for u in cluster.urls)
+    return {
+        'nodes': cluster.size,
+        'transactions': tx_count,
+        'tx_delivered': len(tx_latencies),
+        'tx_expected': tx_count * len(others),
+        'tx_latency_p50_ms': _ms(_percentile(tx_latencies, 50)),
+        'tx_latency_p99_ms': _ms(_percentile(tx_latencies, 99)),
+        'block_delivered': len(block_latencies),
+        'block_latency_max_ms': _ms(max(block_latencies.values()) if block_latencies else None),
+        'gossip_bytes_sent': bytes_sent,
+        'gossip_bytes_per_tx_per_node': round(bytes_sent / float(tx_count * len(others)), 1),
+        'dropped': sum(after[u]['dropped'] - before[u]['dropped'] for u in cluster.urls),
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Chạy cụm node blockchain cục bộ để kiểm tra đồng bộ")
+    parser.add_argument('--nodes', type=int, default=3, help='Số node trong cụm (>= 2)')
+    parser.add_argument('--base-port', type=int, default=5100, help='Cổng của node đầu tiên')
+    parser.add_argument('--scenario', choices=['consensus', 'propagation'], default='consensus')
+    parser.add_argument('--blocks', type=int, default=5, help='Số block node 0 đào trước khi đồng bộ')
+    parser.add_argument('--transactions', type=int, default=50, help='Số giao dịch cho kịch bản propagation')
+    parser.add_argument('--keep', action='store_true', help='Giữ thư mục làm việc sau khi chạy')
+    args = parser.parse_args()
+
+    # Kịch bản consensus cần các nhánh cạnh tranh thật sự nên tắt gossip
+    extra_env = {'GOSSIP_ENABLED': '0'} if args.scenario == 'consensus' else {}
+    cluster = LocalCluster(size=max(args.nodes, 2), base_port=args.base_port, extra_env=extra_env)
+    try:
+        with cluster:
+            if args.scenario == 'propagation':
+                report = run_propagation_scenario(cluster, tx_count=args.transactions)
+                print(json.dumps(report, indent=2))
+                return 0 if report['tx_delivered'] == report['tx_expected'] else 1
+            converged, tips, _ = run_consensus_scenario(cluster, blocks_on_leader=args.blocks)
+    finally:
+        if not args.keep:
+            shutil.rmtree(cluster.workdir, ignore_errors=True)
+
+    for url, (length, tip_hash) in tips.items():
+        print(f"{url}: length={length} tip={tip_hash[:16]}")
+    print("HỘI TỤ" if converged else "KHÔNG HỘI TỤ")
+    return 0 if converged else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+    # python -m blockchain_node.cluster --nodes 3 --base-port 5100
+    # python -m blockchain_node.cluster --nodes 5 --scenario propagation --transactions 200
@@ -0,0 +1,217 @@
+import json
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from blockchain_core.metrics import record_cache_lookup
+
+gossip_logger = logging.getLogger(__name__)
+
+
+class SeenSet:
+    """Tập id đã thấy (giao dịch/block) có giới hạn kích thước, loại bỏ id cũ nhất khi đầy"""
+
+    def __init__(self, capacity=100000):
+        self.capacity = capacity
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, item_id):
+        """Thêm id; trả về True nếu id chưa từng thấy"""
+        with self._lock:
+            if item_id in self._items:
+                return False
+            self._items[item_id] = True
+            if len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+            return True
+
+    def __contains__(self, item_id):
+        with self._lock:
+            return item_id in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+
+class GossipRelay:
+    """
+    Lan truyền giao dịch và block giữa các peer theo hai bước:
+    1. Gửi theo lô thông báo (inv) gồm id giao dịch / hash block tới peer qua POST /gossip/inv.
+    2. Peer trả lời danh sách id còn thiếu, chỉ khi đó mới gửi dữ liệu đầy đủ qua POST /gossip/data.
+    Mỗi peer có một hàng đợi gửi giới hạn; khi đầy, thông báo cũ nhất bị bỏ.
+    """
+
+    def __init__(self, peers, get_transaction, get_block, self_url=None, queue_size=1000,
+                 batch_size=100, flush_interval=0.05, timeout=5, seen_capacity=100000):
+        self.peers = peers
+        self.get_transaction = get_transaction
+        self.get_block = get_block
+        self.self_url = self_url
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.seen_transactions = SeenSet(seen_capacity)
+        self.seen_blocks = SeenSet(seen_capacity)
+
+        self._queues = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+        self._session = requests.Session()
+        self.stats = {
+            'inv_sent': 0, 'inv_received': 0,
+            'tx_sent': 0, 'tx_received': 0,
+            'blocks_sent': 0, 'blocks_received': 0,
+            'bytes_sent': 0, 'bytes_received': 0,
+            'dropped': 0, 'send_errors': 0,
+        }
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    # --- Phía gửi ---
+    def _enqueue(self, kind, item_id, exclude=None):
+        with self._lock:
+            for peer in list(self.peers):
+                if peer == exclude or peer == self.self_url:
+                    continue
+                queue = self._queues.get(peer)
+                if queue is None:
+                    queue = self._queues[peer] = deque(maxlen=self.queue_size)
+                if len(queue) == queue.maxlen:
+                    self.stats['dropped'] += 1
+                queue.append((kind, item_id))
+
+    def announce_transaction(self, transaction_id, exclude=None):
+        self.seen_transactions.add(transaction_id)
+        self._enqueue('tx', transaction_id, exclude)
+
+    def announce_block(self, block_hash, exclude=None):
+        self.seen_blocks.add(block_hash)
+        self._enqueue('block', block_hash, exclude)
+
+    def _post(self, peer, path, payload):
+        body = json.dumps(payload).encode('utf-8')
+        response = self._session.post(f"{peer}{path}", data=body, timeout=self.timeout,
+                                      headers={'Content-Type': 'application/json'})
+        response.raise_for_status()
+        self._count('bytes_sent', len(body))
+        self._count('bytes_received', len(response.content))
+        return response.json()
+
+    def _flush_peer(self, peer, batch):
+        txs = list(dict.fromkeys(item_id for kind, item_id in batch if kind == 'tx'))
+        blocks = list(dict.fromkeys(item_id for kind, item_id in batch if kind == 'block'))
+        try:
+            wanted = self._post(peer, '/gossip/inv', {'origin': self.self_url, 'txs': txs, 'blocks': blocks})
+            self._count('inv_sent', len(txs) + len(blocks))
+
+            tx_data = [tx.to_dict() for tx in map(self.get_transaction, wanted.get('want_txs', [])) if tx]
+            block_data = [blk.to_dict() for blk in map(self.get_block, wanted.get('want_blocks', [])) if blk]
+            if tx_data or block_data:
+                self._post(peer, '/gossip/data', {'origin': self.self_url, 'txs': tx_data, 'blocks': block_data})
+                self._count('tx_sent', len(tx_data))
+                self._count('blocks_sent', len(block_data))
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self._count('send_errors')
+            gossip_logger.warning(f"Lỗi khi lan truyền tới peer {peer}: {e}")
+
+    def flush(self):
+        """Gửi một lô thông báo tới mọi peer đang có hàng đợi (song song giữa các peer)"""
+        batches = {}
+        with self._lock:
+            for peer, queue in self._queues.items():
+                batch = [queue.popleft() for _ in range(min(self.batch_size, len(queue)))]
+                if batch:
+                    batches[peer] = batch
+        futures = [self._executor.submit(self._flush_peer, peer, batch) for peer, batch in batches.items()]
+        for future in futures:
+            future.result()
+        return len(batches)
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self.flush():
+                self._stop.wait(self.flush_interval)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="gossip")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="gossip-relay", daemon=True)
+        self._thread.start()
+        gossip_logger.info(f"Gossip relay đã khởi động (batch={self.batch_size}, queue={self.queue_size}).")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self._executor:
+            self._executor.shutdown(wait=False)
+
+    # --- Phía nhận ---
+    def handle_inv(self, payload, has_block, content_length=0):
+        """Trả về các id mà node này chưa có để peer gửi dữ liệu đầy đủ"""
+        self._count('bytes_received', content_length)
+        tx_ids = payload.get('txs', [])
+        block_hashes = payload.get('blocks', [])
+        self._count('inv_received', len(tx_ids) + len(block_hashes))
+        want_txs = []
+        for tx_id in tx_ids:
+            seen = tx_id in self.seen_transactions
+            record_cache_lookup('gossip_seen_transactions', seen)
+            if not seen:
+                want_txs.append(tx_id)
+        return {
+            'want_txs': want_txs,
+            'want_blocks': [h for h in block_hashes if h not in self.seen_blocks and not has_block(h)],
+        }
+
+    def handle_data(self, payload, accept_transaction, accept_block, content_length=0):
+        """
+        Nhận dữ liệu đầy đủ từ peer, bỏ qua phần đã thấy, rồi tiếp tục lan truyền phần được chấp nhận
+        tới các peer khác (trừ peer gửi). Các callback accept_* trả về id/hash nếu chấp nhận, None nếu không.
+
+        Returns:
+            dict: số giao dịch / block được chấp nhận
+        """
+        self._count('bytes_received', content_length)
+        origin = payload.get('origin')
+        accepted = {'txs': 0, 'blocks': 0}
+
+        for tx_data in payload.get('txs', []):
+            self._count('tx_received')
+            tx_id = tx_data.get('transaction_id')
+            if tx_id in self.seen_transactions:
+                continue
+            accepted_id = accept_transaction(tx_data)
+            if accepted_id:
+                self.announce_transaction(accepted_id, exclude=origin)
+                accepted['txs'] += 1
+
+        for block_data in payload.get('blocks', []):
+            self._count('blocks_received')
+            block_hash = block_data.get('hash')
+            if block_hash in self.seen_blocks:
+                continue
+            accepted_hash = accept_block(block_data, origin)
+            if accepted_hash:
+                self.announce_block(accepted_hash, exclude=origin)
+                accepted['blocks'] += 1
+        return accepted
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['queued'] = {peer: len(queue) for peer, queue in self._queues.items()}
+        stats['seen_transactions'] = len(self.seen_transactions)
+        stats['seen_blocks'] = len(self.seen_blocks)
+        return stats
@@ -1,32 +1,42 @@
 import time
 import json
 import logging
+import threading
 from flask import Flask, request, jsonify
 import os
+from blockchain_core.block import Block
 from blockchain_core.blockchain import Blockchain
+from blockchain_core.log_config import LogSampler, setup_logging
+from blockchain_core.metrics import REGISTRY, install_flask_metrics
+from blockchain_core.profiling import install_profiling
 from blockchain_core.transaction import Transaction
+from blockchain_node.gossip import GossipRelay
+from blockchain_node.peer_sync import PeerSync, normalize_peer_url
 
 
 # --- Cấu hình Logging cho Node ---
-LOG_FILE_NODE = "node.log"  # Log file vẫn có thể nằm ở thư mục gốc của dự án
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_FILE_NODE, mode='a', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+LOG_FILE_NODE = os.environ.get('NODE_LOG_FILE', "node.log")  # Log file vẫn có thể nằm ở thư mục gốc của dự án
+# Ghi log qua hàng đợi + luồng nền, file xoay vòng theo dung lượng (xem blockchain_core/log_config.py)
+setup_logging(LOG_FILE_NODE)
 node_logger = logging.getLogger(__name__)
+# Log theo từng request trên các endpoint nóng (/balance, /transactions/new) được lấy mẫu
+request_log_sampler = LogSampler()
 node_logger.info("Khởi động Blockchain Node...")
 
 # --- Cài đặt Node ---
 app = Flask(__name__)
+# Độ trễ theo route + GET /metrics (Prometheus)
+install_flask_metrics(app)
+# Profiling theo yêu cầu tại /debug/profile, chỉ bật khi có PROFILING_TOKEN
+install_profiling(app)
 
 # Set độ khó cho blockchain
 DIFFICULTY = 2
+# Reorg sâu hơn số block này bị từ chối; dữ liệu undo và nhánh phụ cũ hơn được giải phóng khỏi bộ nhớ
+MAX_REORG_DEPTH = int(os.environ.get('NODE_MAX_REORG_DEPTH', 100))
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-NODE_BLOCKCHAIN_FILE = os.path.join(BASE_DIR, "node_blockchain.json")
+# Cho phép chạy nhiều node trên cùng máy, mỗi node dùng một file chuỗi riêng
+NODE_BLOCKCHAIN_FILE = os.environ.get('NODE_BLOCKCHAIN_FILE') or os.path.join(BASE_DIR, "node_blockchain.json")
 
 # Giả sử địa chỉ ví của người dừng ang đăng nhập
 SYSTEM_INITIAL_FUND_RECIPIENT_ADDRESS = "9wuLehM6ANln0o3TfH/Up/Za7Ienp6IuJdXKmBfgxNQrfaZMLYq2oBgxoQI8tDrPFF/2GhVNCAhAHRz/XBKZ3w=="
@@ -47,7 +57,8 @@ loaded_successfully = False
 temp_blockchain_instance_for_loading = Blockchain(
     difficulty=DIFFICULTY,
     initial_funder_address="DUMMY_ADDRESS", # Địa chỉ giả
-    initial_fund_amount=0 # Số tiền giả
+    initial_fund_amount=0, # Số tiền giả
+    max_reorg_depth=MAX_REORG_DEPTH
 )
 
 if os.path.exists(NODE_BLOCKCHAIN_FILE):
@@ -70,7 +81,8 @@ if not loaded_successfully:
     my_node_blockchain = Blockchain(
         difficulty=DIFFICULTY,
         initial_funder_address=SYSTEM_INITIAL_FUND_RECIPIENT_ADDRESS,
-        initial_fund_amount=INITIAL_FUND_AMOUNT
+        initial_fund_amount=INITIAL_FUND_AMOUNT,
+        max_reorg_depth=MAX_REORG_DEPTH
     )
     # Lưu Genesis Block mới tạo ngay lập tức
     node_logger.info("Lưu Genesis Block mới tạo vào file.")
@@ -79,6 +91,45 @@ if not loaded_successfully:
 # --- P2P Network (Mô phỏng đơn giản) ---
 PEERS = set()
 
+# Khoá bảo vệ chuỗi khi các request (mine, giao dịch mới, đồng bộ) chạy song song
+chain_lock = threading.RLock()
+peer_sync = PeerSync(my_node_blockchain, chain_lock)
+
+# Lan truyền giao dịch / block tới PEERS (được khởi động khi chạy node)
+gossip = GossipRelay(
+    PEERS,
+    get_transaction=my_node_blockchain.get_pending_transaction,
+    get_block=my_node_blockchain.get_block_by_hash,
+    queue_size=int(os.environ.get('GOSSIP_QUEUE_SIZE', 1000)),
+    batch_size=int(os.environ.get('GOSSIP_BATCH_SIZE', 100)),
+    flush_interval=float(os.environ.get('GOSSIP_FLUSH_INTERVAL', 0.05))
+)
+
+# Gauge dạng callback: chỉ được đọc khi /metrics được gọi
+REGISTRY.gauge('node_chain_height', 'Số block trên nhánh chính', fn=lambda: len(my_node_blockchain.chain))
+REGISTRY.gauge('node_mempool_size', 'Số giao dịch đang chờ trong pool',
+               fn=lambda: len(my_node_blockchain.pending_transactions))
+REGISTRY.gauge('node_known_blocks', 'Số block đã biết (gồm cả nhánh phụ)',
+               fn=lambda: len(my_node_blockchain.blocks_by_hash))
+REGISTRY.gauge('node_peers', 'Số peer đã đăng ký', fn=lambda: len(PEERS))
+REGISTRY.gauge('gossip_queued', 'Tổng số thông báo gossip đang chờ gửi',
+               fn=lambda: sum(gossip.get_stats()['queued'].values()))
+
+
+def _sync_with_peers(peers):
+    """Đồng bộ với peer và lưu/lan truyền đỉnh mới nếu chuỗi bị thay"""
+    result = peer_sync.sync(peers)
+    if result['replaced']:
+        with chain_lock:
+            my_node_blockchain.save_to_file(NODE_BLOCKCHAIN_FILE)
+            new_blocks = my_node_blockchain.chain[result['fork_index'] + 1:]
+        for block in new_blocks:
+            _mark_block_transactions_seen(block)
+        # Chuỗi có thể đã đổi (vd. reorg khác) giữa lúc đồng bộ và lúc lấy khoá
+        if new_blocks:
+            gossip.announce_block(new_blocks[-1].hash)
+    return result
+
 # --- API Endpoints cho Node (giữ nguyên) ---
 @app.route('/chain', methods=['GET'])
 def get_chain():
@@ -93,24 +144,65 @@ def get_chain():
     return jsonify(response), 200
 
 
-@app.route('/mine', methods=['GET'])
-def mine_block_api():
-    miner_address = "NODE_MINER_ADDRESS_123456"
+def _parse_since_args():
+    """Đọc tham số ?since=H&limit=N cho các endpoint đồng bộ delta"""
+    since = request.args.get('since', default=-1, type=int)
+    limit = request.args.get('limit', default=None, type=int)
+    if since < -1 or (limit is not None and limit <= 0):
+        return None, None, (jsonify({'message': "Tham số 'since' hoặc 'limit' không hợp lệ."}), 400)
+    return since, limit, None
 
-    if not my_node_blockchain.pending_transactions:
-        node_logger.info("Không có giao dịch nào đang chờ xử lý để đào.")
-        response = {
-            "message": "Không có giao dịch nào đang chờ xử lý.",
-            "chain_length": len(my_node_blockchain.chain)
-        }
-        return jsonify(response), 200
 
+@app.route('/headers', methods=['GET'])
+def get_headers():
+    since, limit, error = _parse_since_args()
+    if error:
+        return error
+    blocks = my_node_blockchain.get_blocks_since(since, limit)
     last_block = my_node_blockchain.get_last_block()
+    response = {
+        'since': since,
+        'length': len(my_node_blockchain.chain),
+        'tip_hash': last_block.hash,
+        'headers': [block.to_header_dict() for block in blocks]
+    }
+    return jsonify(response), 200
+
+
+@app.route('/blocks', methods=['GET'])
+def get_blocks():
+    since, limit, error = _parse_since_args()
+    if error:
+        return error
+    blocks = my_node_blockchain.get_blocks_since(since, limit)
+    last_block = my_node_blockchain.get_last_block()
+    response = {
+        'since': since,
+        'length': len(my_node_blockchain.chain),
+        'tip_hash': last_block.hash,
+        'blocks': [block.to_dict() for block in blocks]
+    }
+    return jsonify(response), 200
+
+
+@app.route('/mine', methods=['GET'])
+def mine_block_api():
+    miner_address = "NODE_MINER_ADDRESS_123456"
 
-    mined_block = my_node_blockchain.mine_pending_transactions(miner_address)
+    with chain_lock:
+        # Kiểm tra trong khoá: hai request /mine đồng thời không được cùng đào một pool
+        if not my_node_blockchain.pending_transactions:
+            node_logger.info("Không có giao dịch nào đang chờ xử lý để đào.")
+            response = {
+                "message": "Không có giao dịch nào đang chờ xử lý.",
+                "chain_length": len(my_node_blockchain.chain)
+            }
+            return jsonify(response), 200
+        mined_block = my_node_blockchain.mine_pending_transactions(miner_address)
+        saved = bool(mined_block) and my_node_blockchain.save_to_file(NODE_BLOCKCHAIN_FILE)
 
     if mined_block:
-        if my_node_blockchain.save_to_file(NODE_BLOCKCHAIN_FILE): # KIỂM TRA GIÁ TRỊ TRẢ VỀ
+        if saved: # KIỂM TRA GIÁ TRỊ TRẢ VỀ
             response = {
                 'message': "Block mới đã được đào và lưu!",
                 'index': mined_block.index,
@@ -119,6 +211,8 @@ def mine_block_api():
                 'hash': mined_block.hash,
             }
             node_logger.info(f"API: Đã đào block #{mined_block.index}. Hash: {mined_block.hash[:10]}...")
+            _mark_block_transactions_seen(mined_block)
+            gossip.announce_block(mined_block.hash)
             return jsonify(response), 200
         else:
             node_logger.error("API: Đã đào block nhưng lỗi khi lưu blockchain vào file!")
@@ -129,33 +223,99 @@ def mine_block_api():
 
 
 
-@app.route('/transactions/new', methods=['POST'])
-def new_transaction():
-    values = request.get_json()
-    node_logger.info(f"API: Nhận yêu cầu giao dịch mới: {values}")
+TRANSACTION_REQUIRED_FIELDS = ['sender', 'receiver', 'amount', 'signature']
+MAX_TRANSACTION_BATCH = int(os.environ.get('NODE_MAX_TRANSACTION_BATCH', 5000))
 
-    required_fields = ['sender', 'receiver', 'amount', 'signature']
-    if not all(field in values for field in required_fields):
-        node_logger.warning(f"API: Thiếu trường trong yêu cầu giao dịch: {required_fields}")
-        return jsonify({'message': 'Missing values'}), 400
 
-    transaction = Transaction(
+def _transaction_from_values(values):
+    """Tạo Transaction từ body request; trả về None nếu thiếu trường"""
+    if not isinstance(values, dict) or not all(field in values for field in TRANSACTION_REQUIRED_FIELDS):
+        return None
+    return Transaction(
         values['sender'],
         values['receiver'],
         values['amount'],
-        values['signature']
+        values['signature'],
+        # Người gửi chọn timestamp thì biết trước transaction_id (đối chiếu được khi không nhận được phản hồi)
+        timestamp=values.get('timestamp')
     )
 
-    if my_node_blockchain.add_transaction_to_pool(transaction):
-        # LƯU FILE NGAY LẬP TỨC
-        my_node_blockchain.save_to_file(NODE_BLOCKCHAIN_FILE)
 
-        response = {'message': f'Giao dịch sẽ được thêm vào Block {my_node_blockchain.get_last_block().index + 1}'}
+@app.route('/transactions/new', methods=['POST'])
+def new_transaction():
+    values = request.get_json()
+    if request_log_sampler.should_log():
+        node_logger.info("API: Nhận yêu cầu giao dịch mới: %s", values)
+
+    transaction = _transaction_from_values(values)
+    if transaction is None:
+        node_logger.warning(f"API: Thiếu trường trong yêu cầu giao dịch: {TRANSACTION_REQUIRED_FIELDS}")
+        return jsonify({'message': 'Missing values'}), 400
+
+    with chain_lock:
+        duplicate = my_node_blockchain.has_transaction(transaction.transaction_id)
+        added = not duplicate and my_node_blockchain.add_transaction_to_pool(transaction)
+        if added:
+            # LƯU FILE NGAY LẬP TỨC
+            my_node_blockchain.save_to_file(NODE_BLOCKCHAIN_FILE)
+
+    if added:
+        gossip.announce_transaction(transaction.transaction_id)
+        response = {
+            'message': f'Giao dịch sẽ được thêm vào Block {my_node_blockchain.get_last_block().index + 1}',
+            'transaction_id': transaction.transaction_id
+        }
         return jsonify(response), 201
+    elif duplicate:
+        return jsonify({'message': 'Giao dịch đã tồn tại.', 'transaction_id': transaction.transaction_id}), 409
     else:
         return jsonify({'message': 'Giao dịch không hợp lệ.'}), 400
 
 
+@app.route('/transactions/batch', methods=['POST'])
+def new_transactions_batch():
+    """
+    Nhận nhiều giao dịch vào pool trong một lần gọi (một lần khoá, một lần lưu file).
+    Từng giao dịch được kiểm tra như /transactions/new; kết quả trả về theo đúng thứ tự đầu vào.
+    Giao dịch có transaction_id đã nằm trong pool hoặc trong chuỗi (gửi lại lô) có status 'duplicate'.
+    """
+    values = request.get_json(silent=True) or {}
+    items = values.get('transactions')
+    if not isinstance(items, list) or not items:
+        return jsonify({'message': "Thiếu 'transactions' (danh sách giao dịch)."}), 400
+    if len(items) > MAX_TRANSACTION_BATCH:
+        return jsonify({'message': f"Tối đa {MAX_TRANSACTION_BATCH} giao dịch mỗi lần gọi."}), 413
+
+    results = []
+    accepted = []
+    duplicates = 0
+    with chain_lock:
+        for index, item in enumerate(items):
+            transaction = _transaction_from_values(item)
+            if transaction is None:
+                results.append({'index': index, 'status': 'rejected', 'error': 'Missing values'})
+            elif my_node_blockchain.has_transaction(transaction.transaction_id):
+                duplicates += 1
+                results.append({'index': index, 'status': 'duplicate', 'transaction_id': transaction.transaction_id})
+            elif my_node_blockchain.add_transaction_to_pool(transaction):
+                accepted.append(transaction)
+                results.append({'index': index, 'status': 'accepted', 'transaction_id': transaction.transaction_id})
+            else:
+                results.append({'index': index, 'status': 'rejected', 'error': 'Giao dịch không hợp lệ.'})
+        if accepted:
+            my_node_blockchain.save_to_file(NODE_BLOCKCHAIN_FILE)
+
+    for transaction in accepted:
+        gossip.announce_transaction(transaction.transaction_id)
+    node_logger.info(f"API: Nhận lô {len(items)} giao dịch: {len(accepted)} được chấp nhận.")
+    return jsonify({
+        'accepted': len(accepted),
+        'duplicate': duplicates,
+        'rejected': len(items) - len(accepted) - duplicates,
+        'results': results
+    }), 200
+
+
 @app.route('/transactions/pending', methods=['GET'])
 def get_pending_transactions():
     node_logger.info("API: Yêu cầu lấy các giao dịch đang chờ xử lý.")
@@ -163,32 +323,51 @@ def get_pending_transactions():
     return jsonify(pending_txs), 200
 
 
-from urllib.parse import unquote_plus
+@app.route('/transactions/<transaction_id>', methods=['GET'])
+def get_transaction_status(transaction_id):
+    """Trạng thái một giao dịch: 'confirmed' (kèm block trên nhánh chính), 'pending' (trong pool) hoặc 404"""
+    with chain_lock:
+        block = my_node_blockchain.get_transaction_block(transaction_id)
+        in_pool = block is None and my_node_blockchain.get_pending_transaction(transaction_id) is not None
+        tip = my_node_blockchain.get_last_block()
+    response = {'transaction_id': transaction_id, 'height': tip.index, 'tip_hash': tip.hash}
+    if block is not None:
+        response.update(status='confirmed', block_index=block.index, block_hash=block.hash)
+    elif in_pool:
+        response['status'] = 'pending'
+    else:
+        response['status'] = 'unknown'
+        return jsonify(response), 404
+    return jsonify(response), 200
 
 
-@app.route('/balance/<path:address>', methods=['GET'])
-def get_balance(address):
-    node_logger.info(f"Raw address received: {address}")
-    decoded_address = unquote_plus(address)
-    node_logger.info(f"Decoded address: {decoded_address}")
+from urllib.parse import unquote
+
 
-    # Debug: In ra tất cả các transaction
-    for i, block in enumerate(my_node_blockchain.chain):
-        node_logger.info(f"Block {i} has {len(block.transactions)} transactions")
-        for j, tx in enumerate(block.transactions):
-            node_logger.info(f"  Transaction {j}: {tx.sender} -> {tx.receiver}, amount: {tx.amount}")
+@app.route('/tip', methods=['GET'])
+def get_tip():
+    """Đỉnh chuỗi hiện tại; client dùng để biết cache (vd. số dư) còn hợp lệ hay không"""
+    tip = my_node_blockchain.get_last_block()
+    return jsonify({'length': len(my_node_blockchain.chain), 'height': tip.index, 'tip_hash': tip.hash}), 200
 
-    # Decode URL encoding
-    decoded_address = unquote_plus(address)
-    node_logger.info(f"API: Yêu cầu số dư cho địa chỉ: {decoded_address}")
+
+@app.route('/balance/<path:address>', methods=['GET'])
+def get_balance(address):
+    # Decode URL encoding (không dùng unquote_plus: địa chỉ base64 có thể chứa '+')
+    decoded_address = unquote(address)
 
     try:
-        balance = my_node_blockchain.get_balance(decoded_address)
+        with chain_lock:
+            balance = my_node_blockchain.get_balance(decoded_address)
+            tip = my_node_blockchain.get_last_block()
         response = {
             'address': decoded_address,
-            'balance': balance
+            'balance': balance,
+            'height': tip.index,
+            'tip_hash': tip.hash
         }
-        node_logger.info(f"API: Số dư cho {decoded_address}: {balance}")
+        if request_log_sampler.should_log():
+            node_logger.info("API: Số dư cho %s: %s", decoded_address, balance)
         return jsonify(response), 200
     except Exception as e:
         node_logger.error(f"API: Lỗi khi lấy số dư cho {decoded_address}: {str(e)}")
@@ -198,6 +377,25 @@ def get_balance(address):
         }), 500
 
 
+MAX_BALANCE_BATCH = int(os.environ.get('NODE_MAX_BALANCE_BATCH', 1000))
+
+
+@app.route('/balances', methods=['POST'])
+def get_balances():
+    """Số dư của nhiều địa chỉ trong một lần gọi, đọc cùng một đỉnh chuỗi"""
+    values = request.get_json(silent=True) or {}
+    addresses = values.get('addresses')
+    if not isinstance(addresses, list) or not all(isinstance(address, str) for address in addresses):
+        return jsonify({'message': "Thiếu 'addresses' (danh sách địa chỉ)."}), 400
+    if len(addresses) > MAX_BALANCE_BATCH:
+        return jsonify({'message': f"Tối đa {MAX_BALANCE_BATCH} địa chỉ mỗi lần gọi."}), 413
+
+    with chain_lock:
+        balances = {address: my_node_blockchain.get_balance(address) for address in addresses}
+        tip = my_node_blockchain.get_last_block()
+    return jsonify({'balances': balances, 'height': tip.index, 'tip_hash': tip.hash}), 200
+
+
 @app.route('/nodes/register', methods=['POST'])
 def register_node():
     values = request.get_json()
@@ -206,7 +404,7 @@ def register_node():
         return "Error: Please supply a valid list of nodes", 400
 
     for node in nodes:
-        PEERS.add(node)
+        PEERS.add(normalize_peer_url(node))
         node_logger.info(f"API: Đã thêm node mới: {node}")
 
     response = {
@@ -218,33 +416,112 @@ def register_node():
 
 @app.route('/nodes/resolve', methods=['GET'])
 def consensus():
-    node_logger.info("API: Kích hoạt giải quyết xung đột (đồng thuận).")
-    replaced = False
+    node_logger.info(f"API: Kích hoạt giải quyết xung đột (đồng thuận) với {len(PEERS)} peer.")
+    result = _sync_with_peers(PEERS)
 
-    if my_node_blockchain.is_chain_valid():
-        response = {
-            'message': 'Chuỗi của node này đã được xác nhận và là hợp lệ.',
-            'chain': [block.to_dict() for block in my_node_blockchain.chain]
-        }
+    with chain_lock:
+        length = len(my_node_blockchain.chain)
+        tip_hash = my_node_blockchain.get_last_block().hash
+
+    if result['replaced']:
+        message = (f"Chuỗi của node này đã được thay bằng chuỗi nặng hơn từ {result['peer']} "
+                   f"(phân nhánh tại #{result['fork_index']}, {result['new_blocks']} block mới).")
+        node_logger.info(f"API: {message}")
     else:
-        response = {
-            'message': 'Chuỗi của node này không hợp lệ, cần được thay thế (chưa triển khai tự động).',
-            'chain': [block.to_dict() for block in my_node_blockchain.chain]
-        }
-        node_logger.warning("API: Chuỗi hiện tại của Node không hợp lệ!")
+        message = 'Chuỗi của node này là chuỗi nặng nhất, giữ nguyên.'
 
+    response = {
+        'message': message,
+        'replaced': result['replaced'],
+        'length': length,
+        'tip_hash': tip_hash,
+        'peer_errors': result['errors']
+    }
     return jsonify(response), 200
 
+def _mark_block_transactions_seen(block):
+    """Tránh việc giao dịch đã vào block bị gossip đưa lại vào pool"""
+    for tx in block.transactions:
+        gossip.seen_transactions.add(tx.transaction_id)
+
+
+def _accept_gossip_transaction(tx_data):
+    transaction = Transaction.from_dict(tx_data)
+    with chain_lock:
+        # Giao dịch đã trong pool hoặc đã vào chuỗi (kể cả khi đã rơi khỏi SeenSet hay node vừa khởi động lại)
+        # bị add_transaction_to_pool từ chối, nên gossip không đưa nó vào pool để đào lần nữa
+        if not my_node_blockchain.add_transaction_to_pool(transaction):
+            return None
+    return transaction.transaction_id
+
+
+def _accept_gossip_block(block_data, origin):
+    block = Block.from_dict(block_data)
+    with chain_lock:
+        if my_node_blockchain.get_block_by_hash(block.hash):
+            return None
+        if my_node_blockchain.get_block_by_hash(block.prev_hash):
+            # Block cha đã có trong cây (nhánh chính hoặc nhánh phụ): cây block tự reorg nếu nhánh nặng hơn
+            old_tip = my_node_blockchain.get_last_block().hash
+            if not my_node_blockchain.add_block(block):
+                return None
+            if my_node_blockchain.get_last_block().hash != old_tip:
+                my_node_blockchain.save_to_file(NODE_BLOCKCHAIN_FILE)
+            _mark_block_transactions_seen(block)
+            return block.hash
+
+    # Thiếu block cha: đồng bộ headers-first với peer gửi
+    if origin:
+        node_logger.info(f"Gossip: block #{block.index} có block cha chưa biết, đồng bộ với {origin}.")
+        threading.Thread(target=_sync_with_peers, args=([origin],), daemon=True).start()
+    return None
+
+
+@app.route('/gossip/inv', methods=['POST'])
+def gossip_inv():
+    values = request.get_json() or {}
+    wanted = gossip.handle_inv(
+        values,
+        has_block=lambda block_hash: my_node_blockchain.get_block_by_hash(block_hash) is not None,
+        content_length=request.content_length or 0
+    )
+    return jsonify(wanted), 200
+
+
+@app.route('/gossip/data', methods=['POST'])
+def gossip_data():
+    values = request.get_json() or {}
+    try:
+        accepted = gossip.handle_data(values, _accept_gossip_transaction, _accept_gossip_block,
+                                      content_length=request.content_length or 0)
+    except (KeyError, TypeError) as e:
+        node_logger.warning(f"Gossip: dữ liệu không hợp lệ từ {values.get('origin')}: {e}")
+        return jsonify({'message': 'Dữ liệu gossip không hợp lệ.'}), 400
+    return jsonify(accepted), 200
+
+
+@app.route('/gossip/stats', methods=['GET'])
+def gossip_stats():
+    return jsonify(gossip.get_stats()), 200
+
+
 # --- Chạy Node ---
 if __name__ == '__main__':
     from argparse import ArgumentParser
 
     parser = ArgumentParser()
     parser.add_argument('-p', '--port', default=5000, type=int, help='Cổng để chạy node')
+    parser.add_argument('--peers', default='', help='Danh sách peer, phân tách bằng dấu phẩy (vd: 127.0.0.1:5001,127.0.0.1:5002)')
     args = parser.parse_args()
     port = args.port
 
+    for peer in filter(None, args.peers.split(',')):
+        PEERS.add(normalize_peer_url(peer))
+
     node_logger.info(f"Node sẽ chạy trên http://127.0.0.1:{port}")
+    gossip.self_url = f"http://127.0.0.1:{port}"
+    if os.environ.get('GOSSIP_ENABLED', '1') != '0':
+        gossip.start()
 
     try:
         # Chạy server Flask. Lệnh này sẽ chặn luồng chính cho đến khi server tắt.
@@ -257,5 +534,6 @@ if __name__ == '__main__':
             # Thêm log để xác nhận số lượng block đang được lưu
             node_logger.info(f"Đang lưu chuỗi với {len(my_node_blockchain.chain)} block vào file.")
             my_node_blockchain.save_to_file(NODE_BLOCKCHAIN_FILE)
+        gossip.stop()
 
     # python -m blockchain_node.node --port 5000
\ No newline at end of file
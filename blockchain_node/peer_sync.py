@@ -0,0 +1,202 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from blockchain_core.block import Block
+
+sync_logger = logging.getLogger(__name__)
+
+
+def normalize_peer_url(node):
+    """Chuẩn hoá địa chỉ peer về dạng http://host:port (không có '/' ở cuối)"""
+    node = node.strip().rstrip('/')
+    if not node.startswith(('http://', 'https://')):
+        node = f"http://{node}"
+    return node
+
+
+class PeerSync:
+    """
+    Đồng bộ chuỗi theo kiểu headers-first với các peer:
+    1. Tải headers từ tất cả peer song song, kiểm tra liên kết và PoW của từng header.
+    2. Chọn nhánh có tổng công (work) lớn nhất.
+    3. Tải body của phần phân nhánh theo lô, song song từ nhiều peer cùng có nhánh đó.
+    4. Chỉ kiểm tra phần đuôi phân nhánh rồi thay vào chuỗi cục bộ.
+    """
+
+    def __init__(self, blockchain, lock, max_workers=8, batch_size=50, timeout=5, reorg_window=100):
+        self.blockchain = blockchain
+        self.lock = lock
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.timeout = timeout
+        # Số block lùi lại khi hỏi headers; fork sâu hơn sẽ tải lại headers từ Genesis
+        self.reorg_window = reorg_window
+
+    def _get_json(self, peer, path, params):
+        response = requests.get(f"{peer}{path}", params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _fetch_peer_headers(self, peer, local_hashes):
+        """Tải headers của một peer, bắt đầu từ cửa sổ gần đỉnh; lùi về Genesis nếu không nối được"""
+        since = max(len(local_hashes) - 1 - self.reorg_window, -1)
+        data = self._get_json(peer, '/headers', {'since': since})
+        headers = data.get('headers', [])
+        if since >= 0 and headers and headers[0]['prev_hash'] != local_hashes[since]:
+            data = self._get_json(peer, '/headers', {'since': -1})
+            headers = data.get('headers', [])
+            since = -1
+        return since, headers
+
+    def _evaluate_headers(self, peer, since, headers, local_hashes):
+        """
+        Kiểm tra chuỗi headers và tìm điểm phân nhánh so với chuỗi cục bộ.
+
+        Returns:
+            dict | None: thông tin nhánh ứng viên (fork_index, headers mới, work) hoặc None nếu không hợp lệ
+        """
+        prev_hash = local_hashes[since] if since >= 0 else None
+        expected_index = since + 1
+        for header in headers:
+            if header['index'] != expected_index:
+                sync_logger.warning(f"Peer {peer}: header index không liên tiếp tại {header['index']}.")
+                return None
+            if prev_hash is not None and header['prev_hash'] != prev_hash:
+                sync_logger.warning(f"Peer {peer}: header #{header['index']} không nối với header trước.")
+                return None
+            if header['difficulty'] < self.blockchain.difficulty:
+                sync_logger.warning(f"Peer {peer}: header #{header['index']} có độ khó thấp hơn độ khó yêu cầu.")
+                return None
+            if not header['hash'] or not header['hash'].startswith('0' * header['difficulty']):
+                sync_logger.warning(f"Peer {peer}: header #{header['index']} không đáp ứng PoW.")
+                return None
+            prev_hash = header['hash']
+            expected_index += 1
+
+        fork_index = since
+        for header in headers:
+            idx = header['index']
+            if idx < len(local_hashes) and local_hashes[idx] == header['hash']:
+                fork_index = idx
+            else:
+                break
+
+        if fork_index < 0:
+            sync_logger.warning(f"Peer {peer}: Genesis Block khác với node này, bỏ qua.")
+            return None
+
+        new_headers = [h for h in headers if h['index'] > fork_index]
+        work = sum(self.blockchain.block_work(h['difficulty']) for h in new_headers)
+        return {
+            'peer': peer,
+            'fork_index': fork_index,
+            'headers': new_headers,
+            'tip_hash': headers[-1]['hash'] if headers else local_hashes[since],
+            'work': work,
+        }
+
+    def _fetch_body_batch(self, peer, since, limit, expected_hashes):
+        data = self._get_json(peer, '/blocks', {'since': since, 'limit': limit})
+        blocks = [Block.from_dict(b) for b in data.get('blocks', [])]
+        if [b.hash for b in blocks] != expected_hashes:
+            raise ValueError(f"Peer {peer} trả về block không khớp headers (since={since}).")
+        return blocks
+
+    def _fetch_bodies(self, candidate, source_peers, executor):
+        """Tải body cho các headers đã chọn theo lô, phân bổ vòng tròn giữa các peer có cùng nhánh"""
+        headers = candidate['headers']
+        batches = []
+        for start in range(0, len(headers), self.batch_size):
+            batch = headers[start:start + self.batch_size]
+            batches.append((batch[0]['index'] - 1, [h['hash'] for h in batch]))
+
+        results = {}
+        pending = list(enumerate(batches))
+        for attempt in range(len(source_peers)):
+            if not pending:
+                break
+            futures = {}
+            for i, (since, hashes) in pending:
+                peer = source_peers[(i + attempt) % len(source_peers)]
+                futures[executor.submit(self._fetch_body_batch, peer, since, len(hashes), hashes)] = (i, since, hashes)
+            pending = []
+            for future in as_completed(futures):
+                i, since, hashes = futures[future]
+                try:
+                    results[i] = future.result()
+                except (requests.exceptions.RequestException, ValueError, KeyError, TypeError) as e:
+                    sync_logger.warning(f"Lỗi khi tải lô block since={since}: {e}")
+                    pending.append((i, (since, hashes)))
+
+        if pending:
+            return None
+        return [block for i in range(len(batches)) for block in results[i]]
+
+    def sync(self, peers):
+        """
+        Chạy một vòng đồng thuận với danh sách peer.
+
+        Returns:
+            dict: kết quả đồng bộ ('replaced', 'peer', 'fork_index', 'new_blocks', 'errors')
+        """
+        result = {'replaced': False, 'peer': None, 'fork_index': None, 'new_blocks': 0, 'errors': {}}
+        peers = list(peers)
+        if not peers:
+            return result
+
+        with self.lock:
+            local_hashes = [block.hash for block in self.blockchain.chain]
+            # Chép công tích luỹ của nhánh chính trong khoá: reorg/tỉa nhánh chạy song song sửa dict gốc
+            local_work = [self.blockchain.cumulative_work[block_hash] for block_hash in local_hashes]
+            local_tip_work = local_work[-1]
+
+        candidates = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._fetch_peer_headers, peer, local_hashes): peer for peer in peers}
+            for future in as_completed(futures):
+                peer = futures[future]
+                try:
+                    since, headers = future.result()
+                except (requests.exceptions.RequestException, ValueError, KeyError, TypeError) as e:
+                    sync_logger.warning(f"Không lấy được headers từ peer {peer}: {e}")
+                    result['errors'][peer] = str(e)
+                    continue
+                candidate = self._evaluate_headers(peer, since, headers, local_hashes)
+                if candidate and candidate['headers']:
+                    candidates[peer] = candidate
+
+            best = None
+            for candidate in candidates.values():
+                fork_work = local_work[candidate['fork_index']]
+                candidate['gain'] = candidate['work'] - (local_tip_work - fork_work)
+                if candidate['gain'] > 0 and (best is None or candidate['gain'] > best['gain']):
+                    best = candidate
+
+            if best is None:
+                sync_logger.info("Không có peer nào có chuỗi nặng hơn chuỗi cục bộ.")
+                return result
+
+            source_peers = [best['peer']] + [c['peer'] for c in candidates.values()
+                                             if c['peer'] != best['peer'] and c['tip_hash'] == best['tip_hash']
+                                             and c['fork_index'] <= best['fork_index']]
+            sync_logger.info(
+                f"Chọn nhánh của {best['peer']}: phân nhánh tại #{best['fork_index']}, {len(best['headers'])} block mới, tải từ {len(source_peers)} peer.")
+            new_blocks = self._fetch_bodies(best, source_peers, executor)
+
+        if new_blocks is None:
+            sync_logger.error("Không tải đủ body block cho nhánh được chọn.")
+            result['errors'][best['peer']] = "Không tải đủ body block."
+            return result
+
+        with self.lock:
+            fork_index = best['fork_index']
+            if fork_index >= len(self.blockchain.chain) or self.blockchain.chain[fork_index].hash != local_hashes[fork_index]:
+                sync_logger.warning("Chuỗi cục bộ đã thay đổi trong lúc đồng bộ, bỏ qua kết quả vòng này.")
+                return result
+            replaced = self.blockchain.replace_chain_suffix(fork_index, new_blocks)
+
+        result.update({'replaced': replaced, 'peer': best['peer'], 'fork_index': best['fork_index'],
+                       'new_blocks': len(new_blocks) if replaced else 0})
+        return result